@@ -0,0 +1,80 @@
+"""
+Input-size admission limits.
+
+Before a call takes an executor slot, its cost is estimated from the raw arguments: their
+total size in characters and, for tools that compare every item with every other item,
+the number of similarity pairs. Calls over either budget are rejected straight away
+instead of running until they time out or exhaust memory.
+
+The estimates only count separators (newlines, sentence punctuation), so they are cheap
+and approximate; a registered corpus counts as its number of documents.
+"""
+from typing import Callable, Dict, Optional
+import os
+import re
+
+from corpus_registry import default_registry, is_corpus_ref
+
+MAX_INPUT_CHARS = int(os.environ.get("RAG_EVAL_MAX_INPUT_CHARS", "20000000"))
+MAX_PAIRS = int(os.environ.get("RAG_EVAL_MAX_PAIRS", "200000000"))
+
+_SENTENCE_END = re.compile(r"[.?!]")
+
+
+def items(text) -> int:
+    """Approximate number of documents or generations in a raw list argument."""
+    if is_corpus_ref(text):
+        corpus = default_registry.peek(text)
+        return len(corpus.documents) if corpus is not None else 0
+    if isinstance(text, list):
+        return len(text)
+    text = str(text)
+    if text.lstrip().startswith("["):
+        return max(text.count('",'), text.count("',")) + 1
+    return text.count("\n") + 1
+
+
+def sentences(text) -> int:
+    """Approximate number of sentences in a raw text argument."""
+    if is_corpus_ref(text):
+        return items(text)
+    return len(_SENTENCE_END.findall(str(text))) + 1
+
+
+def pairwise(param: str) -> Callable[[Dict], int]:
+    """Cost of comparing every item of argument `param` with every other item."""
+    def cost(arguments: Dict) -> int:
+        n = items(arguments[param])
+        return n * (n - 1) // 2
+    return cost
+
+
+def sentence_pairs(generation: str, sources: str) -> Callable[[Dict], int]:
+    """Cost of comparing every generation sentence with every source sentence."""
+    def cost(arguments: Dict) -> int:
+        return sentences(arguments[generation]) * sentences(arguments[sources])
+    return cost
+
+
+def check(tool: Dict, arguments: Dict, max_chars: int = MAX_INPUT_CHARS, max_pairs: int = MAX_PAIRS) -> Optional[Dict]:
+    """
+    Check a call against the input budgets.
+
+    Args:
+        tool (Dict): A registry entry from `tool_registry.TOOLS`; its optional 'cost' estimates similarity pairs.
+        arguments (Dict): The call's arguments by name.
+        max_chars (int): Budget for the total size of string arguments; 0 disables it.
+        max_pairs (int): Budget for estimated similarity pairs; 0 disables it.
+
+    Returns:
+        Optional[Dict]: None if the call is admitted, otherwise an error dict.
+    """
+    chars = sum(len(value) for value in arguments.values() if isinstance(value, str))
+    if max_chars and chars > max_chars:
+        return {"error": f"{tool['name']} input is {chars} characters, over the limit of {max_chars}.",
+                "rejected": True}
+    pairs = tool["cost"](arguments) if "cost" in tool else 0
+    if max_pairs and pairs > max_pairs:
+        return {"error": f"{tool['name']} would compare about {pairs} pairs, over the limit of {max_pairs}.",
+                "rejected": True}
+    return None
@@ -1,52 +1,240 @@
-import gradio as gr
-from retriever_eval_tools import (
-    bm25_relevance_scorer,
-    semantic_relevance_scorer,
-    redundancy_checker,
-    exact_match_checker,
-    ranking_consistency_checker,
-    document_novelty_scorer,
-    topic_diversity_evaluator,
-)
-
-from generator_eval_tools import (
-    repetition_checker,
-    semantic_diversity_checker,
-    length_consistency_checker,
-)
-
-from system_eval_tools import (
-    relevance_evaluator,
-    coverage_evaluator,
-)
-
-with gr.Blocks() as demo:
-    with gr.Tab("Retriever Eval"):
-        gr.Markdown("## Retriever Evaluation Tools")
-        gr.Interface(bm25_relevance_scorer, [gr.Textbox(label="Query"), gr.Textbox(label="Documents")], gr.JSON()).render()
-        gr.Interface(semantic_relevance_scorer, [gr.Textbox(label="Query"), gr.Textbox(label="Documents")], gr.JSON()).render()
-        gr.Interface(redundancy_checker, [gr.Textbox(label="Unused"), gr.Textbox(label="Documents")], gr.JSON()).render()
-        gr.Interface(exact_match_checker, [gr.Textbox(label="Query"), gr.Textbox(label="Documents")], gr.JSON()).render()
-        gr.Interface(ranking_consistency_checker, [
-            gr.Textbox(label="Original Query"),
-            gr.Textbox(label="Paraphrased Query"),
-            gr.Textbox(label="Documents")
-        ], gr.JSON()).render()
-        gr.Interface(document_novelty_scorer, [gr.Textbox(label="Documents")], gr.JSON()).render()
-        gr.Interface(topic_diversity_evaluator, [
-            gr.Textbox(label="Documents"),
-            gr.Number(label="Number of Clusters", value=3)
-        ], gr.JSON()).render()
-
-    with gr.Tab("Generator Eval"):
-        gr.Markdown("## Generator Evaluation Tools")
-        gr.Interface(repetition_checker, [gr.Textbox(label="Unused"), gr.Textbox(label="Generations")], gr.JSON()).render()
-        gr.Interface(semantic_diversity_checker, [gr.Textbox(label="Unused"), gr.Textbox(label="Generations")], gr.JSON()).render()
-        gr.Interface(length_consistency_checker, [gr.Textbox(label="Unused"), gr.Textbox(label="Generations")], gr.JSON()).render()
-
-    with gr.Tab("System Eval"):
-        gr.Markdown("## System Evaluation Tools")
-        gr.Interface(relevance_evaluator, [gr.Textbox(label="Query"), gr.Textbox(label="Generations")], gr.JSON()).render()
-        gr.Interface(coverage_evaluator, [gr.Textbox(label="Unused"), gr.Textbox(label="Generations")], gr.JSON()).render()
-
-demo.launch(share=True, mcp_server=True)
+import asyncio
+import contextlib
+import functools
+import inspect
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import warmup
+from warmup import phase
+
+# Startup phases are timed (see `warmup.phases` and the server_status tool). Tool modules
+# import no model code; models load in the background once the tools are registered.
+with phase("import_gradio"):
+    import gradio as gr
+
+with phase("import_tools"):
+    import admission
+    from deadlines import Deadline, call_in_scope, with_deadline
+    from metrics import instrument, observe, start_metrics_server
+    from result_cache import cached
+    from tool_registry import TOOLS
+    import monitoring
+    import workers
+
+warmup.start()
+
+if workers.PROCESS_WORKERS:
+    # Workers are forked once the models are loaded, so they share the weights copy-on-write,
+    # and before any request is handled. Startup therefore waits for the models in this mode.
+    with phase("start_workers"):
+        warmup.default_warmup().join()
+        workers.default_pool.start()
+
+# After the fork: the monitor's threads belong to the server process only.
+monitoring.start()
+
+# Model-bound tools (sentence-transformer forward passes) share a small executor so
+# that at most MODEL_WORKERS encodes run at once. Lexical tools get their own pool,
+# so a slow hallucination check never holds up an exact-match lookup.
+MODEL_WORKERS = int(os.environ.get("RAG_EVAL_MODEL_WORKERS", "2"))
+FAST_WORKERS = int(os.environ.get("RAG_EVAL_FAST_WORKERS", "8"))
+QUEUE_SIZE = int(os.environ.get("RAG_EVAL_QUEUE_SIZE", "256"))
+METRICS_PORT = int(os.environ.get("RAG_EVAL_METRICS_PORT", "9100"))
+
+model_executor = ThreadPoolExecutor(max_workers=MODEL_WORKERS, thread_name_prefix="rag-eval-model")
+fast_executor = ThreadPoolExecutor(max_workers=FAST_WORKERS, thread_name_prefix="rag-eval-fast")
+
+
+def offload(tool: Dict, fn: Callable) -> Callable:
+    """
+    Wrap a registered tool so it runs on its executor under its concurrency limits.
+
+    At most `concurrency_limit` calls of the tool run at once; up to `max_queue` more
+    wait for a slot. Calls beyond that, and calls over the input-size budgets in
+    `admission`, are rejected immediately with an error dict rather than piling up
+    behind a slow tool.
+
+    Model-bound tools first wait up to RAG_EVAL_WARMUP_WAIT_S for the models they need
+    to finish loading in the background, and answer with a "warming" status otherwise.
+
+    Each call runs under a cancellation token (a `deadlines.Deadline` without a time
+    limit). It is cancelled when the client disconnects or the request is cancelled,
+    and the tool then stops at its next deadline check instead of finishing unseen.
+
+    Args:
+        tool (Dict): A registry entry from `tool_registry.TOOLS`.
+        fn (Callable): The tool function to run (possibly already wrapped).
+
+    Returns:
+        Callable: An async function with the same signature and docstring as `fn`.
+    """
+    executor = model_executor if tool["model_bound"] else fast_executor
+    sig = inspect.signature(fn)
+    slots = asyncio.Semaphore(tool["concurrency_limit"])
+    waiting = 0
+
+    async def admit() -> bool:
+        nonlocal waiting
+        if slots.locked() and waiting >= tool["max_queue"]:
+            return False
+        waiting += 1
+        started = time.perf_counter()
+        try:
+            await slots.acquire()
+        finally:
+            waiting -= 1
+        observe("rag_eval_tool_queue_seconds", {"tool": tool["name"]}, time.perf_counter() - started)
+        return True
+
+    busy = {"error": f"{tool['name']} is at capacity, please retry shortly.", "retry": True}
+    models = tool.get("models", warmup.MODELS) if tool["model_bound"] else ()
+
+    async def warm() -> bool:
+        return not models or await warmup.default_warmup().wait_async(models)
+
+    def warming() -> Dict:
+        return {"error": f"{tool['name']} is waiting for its models to load, please retry shortly.",
+                "status": "warming", "retry": True, "warmup": warmup.default_warmup().status()}
+
+    def rejected(args, kwargs) -> Optional[Dict]:
+        bound = sig.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return admission.check(tool, bound.arguments)
+
+    if inspect.isgeneratorfunction(fn):
+        # Streaming tools: pull each update on the executor and forward it as soon as it is ready.
+        # If the client goes away, closing the generator stops the remaining work.
+        @functools.wraps(fn)
+        async def stream_wrapper(*args, **kwargs):
+            error = rejected(args, kwargs)
+            if error is not None:
+                yield error
+                return
+            if not await warm():
+                yield warming()
+                return
+            if not await admit():
+                yield busy
+                return
+            loop = asyncio.get_running_loop()
+            updates = fn(*args, **kwargs)
+            finished = object()
+            token = Deadline()
+            try:
+                while True:
+                    update = await loop.run_in_executor(executor, call_in_scope, token, next, updates, finished)
+                    if update is finished:
+                        break
+                    yield update
+            finally:
+                token.cancel()
+                # Cancelling the token stops a step that is still running at its next deadline check.
+                # Closing raises ValueError while that `next` is running; the generator is then
+                # simply never resumed.
+                with contextlib.suppress(ValueError):
+                    updates.close()
+                slots.release()
+
+        return stream_wrapper
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        error = rejected(args, kwargs)
+        if error is not None:
+            return error
+        if not await warm():
+            return warming()
+        if not await admit():
+            return busy
+        token = Deadline()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, functools.partial(call_in_scope, token, fn, *args, **kwargs))
+        except asyncio.CancelledError:
+            token.cancel()
+            raise
+        finally:
+            slots.release()
+
+    return wrapper
+
+
+def build_inputs(tool: Dict, fn: Callable) -> List[gr.components.Component]:
+    """
+    Build one input component per parameter of the wrapped tool, typed from its signature.
+
+    Args:
+        tool (Dict): A registry entry from `tool_registry.TOOLS`.
+        fn (Callable): The wrapped tool; wrappers may append option parameters.
+
+    Returns:
+        List[gr.components.Component]: Textboxes for strings, Numbers for ints/floats,
+        Checkboxes for bools. Labels come from the registry, falling back to the parameter name.
+    """
+    components = []
+    params = inspect.signature(fn).parameters.values()
+    for i, param in enumerate(params):
+        label = tool["labels"][i] if i < len(tool["labels"]) else param.name.replace("_", " ").capitalize()
+        default = None if param.default is inspect.Parameter.empty else param.default
+        if param.annotation is bool:
+            components.append(gr.Checkbox(label=label, value=bool(default)))
+        elif param.annotation in (int, float):
+            components.append(gr.Number(label=label, value=default, precision=0 if param.annotation is int else None))
+        else:
+            components.append(gr.Textbox(label=label, value=default))
+    return components
+
+
+def pad_examples(examples: Optional[List[List]], fn: Callable) -> Optional[List[List]]:
+    """Fill in defaults for parameters that the registry examples leave out."""
+    if not examples:
+        return examples
+    defaults = [
+        None if p.default is inspect.Parameter.empty else p.default
+        for p in inspect.signature(fn).parameters.values()
+    ]
+    return [list(example) + defaults[len(example):] for example in examples]
+
+
+def build_interface(tool: Dict) -> gr.Interface:
+    """
+    Build the Gradio interface for a registered tool.
+
+    Args:
+        tool (Dict): A registry entry from `tool_registry.TOOLS`.
+
+    Returns:
+        gr.Interface: The tool's interface, exposed to MCP clients under the tool name.
+    """
+    # Instrumentation runs inside the executor thread, so encoder timings are attributed to the tool.
+    # The deadline sits inside it, so a timed-out call still reports its duration. With worker
+    # processes, the executor thread waits on the worker and the call is still timed here.
+    fn = offload(tool, instrument(tool["name"], workers.dispatch(tool, with_deadline(tool["fn"]))))
+    if tool.get("cache", True):
+        # The cache sits in front of the executor: hits and coalesced calls never take a slot.
+        fn = cached(tool["name"], fn)
+    return gr.Interface(
+        fn=fn,
+        inputs=build_inputs(tool, fn),
+        outputs=gr.JSON(),
+        examples=pad_examples(tool.get("examples"), fn),
+        api_name=tool["name"],
+        # Concurrency is enforced by `offload`, per tool, so Gradio hands calls straight through.
+        concurrency_limit=None,
+    )
+
+
+with phase("build_interfaces"):
+    demo = gr.TabbedInterface(
+        [build_interface(tool) for tool in TOOLS],
+        [tool["tab"] for tool in TOOLS],
+    )
+    demo.queue(max_size=QUEUE_SIZE, default_concurrency_limit=None)
+
+if __name__ == "__main__":
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
+    demo.launch(mcp_server=True, share=os.environ.get("RAG_EVAL_SHARE", "1") == "1")
@@ -0,0 +1,426 @@
+from typing import Dict, List, Optional, Union
+import json
+
+from corpus_registry import is_corpus_ref
+from deadlines import DeadlineExceeded, check
+from profiling import profiled
+from responses import current_options, decode, rounded, shaped
+from run_store import default_store, new_run_id, row_hash, scoring_config
+from embeddings import MINILM, MPNET, prefetch, shared_encodings
+from retriever_eval_tools import (
+    parse_documents,
+    bm25_relevance_scorer,
+    semantic_relevance_scorer,
+    redundancy_checker,
+    exact_match_checker,
+)
+from generator_eval_tools import (
+    parse_outputs,
+    repetition_checker,
+    semantic_diversity_checker,
+    length_consistency_checker,
+)
+from system_eval_tools import (
+    parse_generations,
+    split_sentences,
+    relevance_evaluator,
+    coverage_evaluator,
+    hallucination_detector,
+)
+
+
+def _mean(values: List[float]) -> float:
+    return sum(values) / len(values) if values else 0.0
+
+
+def _source_documents(row: Dict) -> List[str]:
+    # A registered corpus brings its own embeddings, so there is nothing to prefetch.
+    return [] if is_corpus_ref(row["documents"]) else parse_documents(row["documents"])
+
+
+def _full(result: Dict) -> bool:
+    return result.get("format", "full") == "full"
+
+
+def _scores(result: Dict) -> List[float]:
+    if _full(result):
+        return [d["score"] for d in result["results"]]
+    return decode(result["scores"]).tolist()
+
+
+def _redundant_pairs(result: Dict) -> float:
+    if _full(result):
+        return float(len(result["results"])) if isinstance(result["results"], list) else 0.0
+    return float(len(decode(result["pairs"]["i"])))
+
+
+def _match_rate(result: Dict) -> float:
+    if _full(result):
+        return _mean([1.0 if d["exact_match"] else 0.0 for d in result["results"]])
+    return _mean([1.0 if match else 0.0 for match in decode(result["exact_match"]).tolist()])
+
+
+def _repetitive_rate(result: Dict) -> float:
+    if _full(result):
+        return _mean([0.0 if d["repeated_phrases"] == "None" else 1.0 for d in result["results"]])
+    return _mean([1.0 if phrases else 0.0 for phrases in result["repeated_phrases"]])
+
+
+def _hallucination_rate(result: Dict) -> float:
+    if _full(result):
+        scores = result["debug_scores"]
+        return _mean([1.0 if s["hallucinated"] else 0.0 for s in scores])
+    return len(decode(result["hallucinated"])) / result["sentences"]
+
+
+# Metrics the batch evaluator can run on a {query, documents, generation} row.
+#
+#   args:    Builds the tool's positional arguments from a row.
+#   encodes: Lists the (model, texts) the tool will encode, so the whole dataset can be
+#            encoded up front in one batch per model.
+#   summary: (name, fn) reducing the tool's output, in any response format, to the single
+#            number that is aggregated.
+METRICS: Dict[str, Dict] = {
+    "bm25_relevance_scorer": {
+        "fn": bm25_relevance_scorer,
+        "args": lambda row: (row["query"], row["documents"]),
+        "encodes": lambda row: [],
+        "summary": ("mean_score", lambda r: _mean(_scores(r))),
+    },
+    "semantic_relevance_scorer": {
+        "fn": semantic_relevance_scorer,
+        "args": lambda row: (row["query"], row["documents"]),
+        "encodes": lambda row: [(MINILM, [row["query"]] + _source_documents(row))],
+        "summary": ("mean_score", lambda r: _mean(_scores(r))),
+    },
+    "redundancy_checker": {
+        "fn": redundancy_checker,
+        "args": lambda row: ("_", row["documents"]),
+        "encodes": lambda row: [(MINILM, _source_documents(row))],
+        "summary": ("redundant_pairs", _redundant_pairs),
+    },
+    "exact_match_checker": {
+        "fn": exact_match_checker,
+        "args": lambda row: (row["query"], row["documents"]),
+        "encodes": lambda row: [],
+        "summary": ("match_rate", _match_rate),
+    },
+    "repetition_checker": {
+        "fn": repetition_checker,
+        "args": lambda row: ("_", row["generation"]),
+        "encodes": lambda row: [],
+        "summary": ("repetitive_rate", _repetitive_rate),
+    },
+    "semantic_diversity_checker": {
+        "fn": semantic_diversity_checker,
+        "args": lambda row: ("_", row["generation"]),
+        "encodes": lambda row: [(MINILM, parse_outputs(row["generation"]))],
+        "summary": ("average_similarity", lambda r: r["average_similarity"]),
+    },
+    "length_consistency_checker": {
+        "fn": length_consistency_checker,
+        "args": lambda row: ("_", row["generation"]),
+        "encodes": lambda row: [],
+        "summary": ("std_deviation", lambda r: r["std_deviation"]),
+    },
+    "relevance_evaluator": {
+        "fn": relevance_evaluator,
+        "args": lambda row: (row["query"], row["generation"]),
+        "encodes": lambda row: [(MINILM, [row["query"]] + parse_generations(row["generation"]))],
+        "summary": ("average_relevance", lambda r: r["average_relevance"]),
+    },
+    "coverage_evaluator": {
+        "fn": coverage_evaluator,
+        "args": lambda row: ("_", row["generation"]),
+        "encodes": lambda row: [(MINILM, parse_generations(row["generation"]))],
+        "summary": ("average_pairwise_similarity", lambda r: r["average_pairwise_similarity"]),
+    },
+    "hallucination_detector": {
+        "fn": hallucination_detector,
+        "args": lambda row: (row["generation"], row["documents"]),
+        "encodes": lambda row: [(MPNET, split_sentences(row["generation"])
+                                 + split_sentences(" ".join(_source_documents(row))))],
+        "summary": ("hallucination_rate", _hallucination_rate),
+    },
+}
+
+
+_FIELDS = ("query", "documents", "generation")
+
+
+def parse_dataset(dataset: str) -> List[Dict]:
+    """
+    Parse a JSONL dataset into rows with 'query', 'documents' and 'generation' fields.
+
+    'documents' may be a JSON list, a raw documents string or a corpus id; 'generation' may be a
+    string or a list of generations. Missing fields default to empty. A row whose fields have the
+    wrong types keeps its raw fields and gets an 'error'; `evaluate_rows` reports it for that row.
+
+    Args:
+        dataset (str): One JSON object per line.
+
+    Returns:
+        List[Dict]: Normalized rows.
+
+    Raises:
+        ValueError: If a line is not a JSON object.
+    """
+    rows = []
+    for line_no, line in enumerate(dataset.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Line {line_no} is not valid JSON: {e.msg}")
+        if not isinstance(record, dict):
+            raise ValueError(f"Line {line_no} must be a JSON object.")
+        try:
+            rows.append(parse_record(record))
+        except ValueError as e:
+            rows.append({**{field: record.get(field) for field in _FIELDS}, "error": f"Line {line_no}: {e}"})
+    return rows
+
+
+def _text_field(record: Dict, name: str, allow_list: bool) -> Union[str, List[str]]:
+    value = record.get(name)
+    if value is None or isinstance(value, str):
+        return value or ""
+    if allow_list and isinstance(value, list) and all(isinstance(v, str) for v in value):
+        return value
+    expected = "a string or a list of strings" if allow_list else "a string"
+    raise ValueError(f"'{name}' must be {expected}, not {type(value).__name__}.")
+
+
+def parse_record(record: Dict) -> Dict:
+    """
+    Normalize one {query, documents, generation} record into a row; see `parse_dataset`.
+
+    Args:
+        record (Dict): A decoded JSON object; other fields are ignored.
+
+    Returns:
+        Dict: A row with 'query', 'documents' and 'generation' fields.
+
+    Raises:
+        ValueError: If 'query' is not a string, or 'documents' or 'generation' is neither a
+            string nor a list of strings.
+    """
+    generation = _text_field(record, "generation", allow_list=True)
+    if isinstance(generation, list):
+        generation = "\n".join(generation)
+    return {
+        "query": _text_field(record, "query", allow_list=False),
+        "documents": _text_field(record, "documents", allow_list=True) or "",
+        "generation": generation,
+    }
+
+
+def parse_metrics(metrics: str) -> List[str]:
+    """
+    Parse a comma-separated list of metric names; an empty string selects every metric.
+
+    Args:
+        metrics (str): Comma-separated metric names, e.g. "bm25_relevance_scorer,hallucination_detector".
+
+    Returns:
+        List[str]: Metric names in the order given.
+    """
+    names = [m.strip() for m in metrics.split(",") if m.strip()]
+    if not names:
+        return list(METRICS)
+    unknown = [m for m in names if m not in METRICS]
+    if unknown:
+        raise ValueError(f"Unknown metrics: {', '.join(unknown)}. Available: {', '.join(METRICS)}")
+    return names
+
+
+def evaluate_rows(rows: List[Dict], metric_names: List[str], completed: Optional[List[Dict]] = None) -> List[Dict]:
+    """
+    Run the selected metrics over every row, encoding each distinct text only once.
+
+    All texts the selected metrics will encode are collected first and encoded in one
+    batch per model; the tool calls that follow are then pure memo hits. Each metric
+    responds in the response format of the surrounding call (full by default).
+
+    Args:
+        rows (List[Dict]): Rows as returned by `parse_dataset`.
+        metric_names (List[str]): Names of entries in `METRICS`.
+        completed (Optional[List[Dict]]): List to append each finished row's outputs to; when
+            the call's deadline passes, `DeadlineExceeded` propagates and this list holds the
+            rows finished before it.
+
+    Returns:
+        List[Dict]: One dict per row mapping metric name to the tool's output; a row with an
+        'error' from `parse_dataset` gets that error from every metric.
+
+    Raises:
+        DeadlineExceeded: If the call's deadline passes; a row a metric only partly scored is dropped.
+    """
+    results = completed if completed is not None else []
+    with shared_encodings():
+        texts_by_model: Dict[str, List[str]] = {}
+        for row in rows:
+            if "error" in row:
+                continue
+            for name in metric_names:
+                for model_name, texts in METRICS[name]["encodes"](row):
+                    texts_by_model.setdefault(model_name, []).extend(texts)
+        for model_name, texts in texts_by_model.items():
+            prefetch(texts, model_name)
+
+        response_format, precision = current_options()
+        for row in rows:
+            # Lexical metrics never check the deadline themselves, so it is checked between rows too.
+            check()
+            if "error" in row:
+                # Rejected by `parse_dataset`: as deterministic as a tool's own validation error.
+                results.append({name: {"error": row["error"]} for name in metric_names})
+                continue
+            row_result = {}
+            for name in metric_names:
+                metric = METRICS[name]
+                try:
+                    row_result[name] = metric["fn"](*metric["args"](row), response_format=response_format, precision=precision)
+                except DeadlineExceeded:
+                    raise
+                except Exception as e:
+                    # One malformed row must not sink a 20k-row run. Marked internal: unlike a
+                    # tool's own validation error, it is not a reusable answer for this input.
+                    row_result[name] = {"error": f"{type(e).__name__}: {e}", "internal": True}
+                if row_result[name].get("truncated"):
+                    raise DeadlineExceeded(f"{name} was cut short by the deadline.")
+            results.append(row_result)
+    return results
+
+
+def summary_values(results: List[Dict], metric_names: List[str]) -> Dict[str, tuple]:
+    """
+    Reduce every row's output of each metric to its summary value.
+
+    Args:
+        results (List[Dict]): Per-row outputs from `evaluate_rows`.
+        metric_names (List[str]): The metrics that were run.
+
+    Returns:
+        Dict[str, tuple]: Per metric, (summary name, one value per row with None where the metric failed).
+    """
+    values = {}
+    for name in metric_names:
+        summary_name, summary_fn = METRICS[name]["summary"]
+        # Errors and outputs cut short by a deadline have no summary value.
+        values[name] = (summary_name, [
+            None if "error" in row_result[name] or row_result[name].get("truncated") else float(summary_fn(row_result[name]))
+            for row_result in results
+        ])
+    return values
+
+
+def summarize(results: List[Dict], metric_names: List[str], values: Optional[Dict[str, tuple]] = None) -> Dict:
+    """
+    Aggregate each metric's per-row summary value over the dataset.
+
+    Args:
+        results (List[Dict]): Per-row outputs from `evaluate_rows`.
+        metric_names (List[str]): The metrics that were run.
+        values (Optional[Dict[str, tuple]]): Precomputed `summary_values`, if already at hand.
+
+    Returns:
+        Dict: Per metric, the summary name with its mean, min, max, row count and error count.
+    """
+    values = values or summary_values(results, metric_names)
+    aggregates = {}
+    for name in metric_names:
+        summary_name, column = values[name]
+        errors = sum(1 for v in column if v is None)
+        values_ok = [v for v in column if v is not None]
+        aggregates[name] = {
+            "summary": summary_name,
+            "mean": rounded(_mean(values_ok)),
+            "min": rounded(min(values_ok)) if values_ok else None,
+            "max": rounded(max(values_ok)) if values_ok else None,
+            "count": len(values_ok),
+            "errors": errors,
+        }
+    return aggregates
+
+
+@profiled
+@shaped
+def batch_evaluator(dataset: str, metrics: str = "", run_id: str = "") -> Dict:
+    """
+    Run a set of retriever, generator and system metrics over a whole JSONL dataset in one call.
+
+    Each line of the dataset is a JSON object with 'query', 'documents' and 'generation' fields.
+    Every distinct text is encoded once and shared by all semantic metrics
+    (semantic relevance, redundancy, relevance evaluation, hallucination detection, ...).
+
+    The run is saved in the run store: rows evaluated before with the same metrics and settings
+    are not evaluated again, and `compare_runs` diffs the aggregates of two runs.
+
+    Args:
+        dataset (str): JSONL rows of {"query": ..., "documents": ..., "generation": ...}.
+        metrics (str): Comma-separated metric names to run. Empty runs every metric.
+        run_id (str): Id to store the run under, e.g. a system version. Empty generates one;
+                      reusing an id replaces that run.
+
+    Returns:
+        Dict: A dictionary containing:
+            - 'tool': The name of the tool ("Batch Evaluator").
+            - 'run_id': Id of the stored run (absent if the run store is disabled).
+            - 'rows': Number of rows evaluated.
+            - 'reused_rows': Rows whose outputs came from the run store.
+            - 'metrics': The metrics that were run.
+            - 'aggregates': Per-metric summary statistics over all rows.
+            - 'results': Per-row outputs of every metric, in the requested response format.
+        If the call's deadline passes part-way, 'truncated' is set, only the 'processed' rows are
+        aggregated and returned, and the run is not stored.
+    """
+    try:
+        rows = parse_dataset(dataset)
+        metric_names = parse_metrics(metrics)
+    except ValueError as e:
+        return {"error": str(e)}
+    if not rows:
+        return {"error": "Dataset must contain at least one row."}
+
+    store = default_store()
+    results = [None] * len(rows)
+    reused = set()
+    if store is not None:
+        config = scoring_config(*current_options())
+        hashes = [row_hash(row) for row in rows]
+        stored = store.lookup(hashes, metric_names, config)
+        reused = {i for i, h in enumerate(hashes) if all((h, name) in stored for name in metric_names)}
+        for i in reused:
+            results[i] = {name: stored[(hashes[i], name)] for name in metric_names}
+
+    pending = [i for i in range(len(rows)) if i not in reused]
+    completed: List[Dict] = []
+    truncated = False
+    try:
+        evaluate_rows([rows[i] for i in pending], metric_names, completed)
+    except DeadlineExceeded:
+        truncated = True
+    for i, row_result in zip(pending, completed):
+        results[i] = row_result
+    # With a deadline, only the rows evaluated (or reused) before it are aggregated and returned.
+    done = [i for i, row_result in enumerate(results) if row_result is not None]
+    done_results = [results[i] for i in done]
+    values = summary_values(done_results, metric_names)
+
+    response = {"tool": "Batch Evaluator"}
+    if store is not None and not truncated:
+        response["run_id"] = run_id.strip() or new_run_id()
+        store.record(response["run_id"], hashes, results, values, config, reused)
+    response.update({
+        "rows": len(rows),
+        "reused_rows": len(reused),
+        "metrics": metric_names,
+        "aggregates": summarize(done_results, metric_names, values),
+        "results": [{"row": i, **results[i]} for i in done],
+    })
+    if truncated:
+        # A partial run is not stored: its aggregates would describe only part of the dataset.
+        response.update({"truncated": True, "processed": len(done)})
+    return response
@@ -0,0 +1,273 @@
+"""
+Scaling benchmarks for every registered evaluation tool.
+
+Generates deterministic synthetic corpora and generation sets at several sizes and runs
+each tool in `tool_registry.TOOLS` on them, recording latency percentiles, throughput,
+peak RSS and how latency grows with input size. Everything runs offline on CPU: by default
+the "hashing" encoder backend stands in for the sentence-transformers, so the numbers
+measure this repo's code (parsing, tokenization, similarity math, post-processing),
+not model inference. Pass --encoder sentence-transformers to include the real models.
+
+    python benchmark_eval_tools.py --sizes 10,100,1000 --output bench.json
+    python benchmark_eval_tools.py --output new.json --baseline bench.json --threshold 0.2
+
+Each (tool, size) case runs in a fresh process with a timeout, so an O(n^2) path shows up
+as a timeout or a scaling exponent near 2 instead of hanging the run. With --baseline, the
+exit status is 1 if any case got slower than the threshold allows.
+"""
+from typing import Callable, Dict, List
+import argparse
+import inspect
+import json
+import math
+import multiprocessing
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000]
+
+WORDS = (
+    "rain water vapor cloud sun earth orbit model score protocol agent tool output rank query "
+    "document retrieval answer source evidence claim fact physics light bulb energy network "
+    "request service deploy version cache index token vector memory latency throughput city "
+    "river mountain history science paris france berlin germany madrid spain einstein edison"
+).split()
+
+
+def _sentence(rng: random.Random, n_words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n_words)).capitalize()
+
+
+def make_documents(rng: random.Random, n: int) -> List[str]:
+    """n short documents; about one in ten is a near-duplicate of an earlier one."""
+    docs = []
+    for i in range(n):
+        if docs and rng.random() < 0.1:
+            docs.append(rng.choice(docs) + " " + rng.choice(WORDS))
+        else:
+            docs.append(_sentence(rng, rng.randint(8, 30)) + ".")
+    return docs
+
+
+def make_generations(rng: random.Random, n: int) -> List[str]:
+    return [_sentence(rng, rng.randint(10, 40)) + "." for _ in range(n)]
+
+
+def _query(rng: random.Random) -> str:
+    return _sentence(rng, 5)
+
+
+def _labeled_run(rng: random.Random, n: int, depth: int = 100) -> tuple:
+    """Rankings of `depth` documents and five graded labels for each of n queries, as JSON."""
+    pool = max(10 * depth, n)
+    rankings = {f"q{i}": [f"d{rng.randrange(pool)}" for _ in range(depth)] for i in range(n)}
+    qrels = {f"q{i}": {f"d{rng.randrange(pool)}": rng.randint(1, 3) for _ in range(5)} for i in range(n)}
+    return json.dumps(rankings), json.dumps(qrels)
+
+
+# Builds a tool's positional arguments for size n. Tools without an entry are skipped.
+INPUTS: Dict[str, Callable[[random.Random, int], tuple]] = {
+    "bm25_relevance_scorer": lambda rng, n: (_query(rng), "\n".join(make_documents(rng, n))),
+    "semantic_relevance_scorer": lambda rng, n: (_query(rng), "\n".join(make_documents(rng, n))),
+    "hybrid_relevance_scorer": lambda rng, n: (_query(rng), "\n".join(make_documents(rng, n))),
+    "redundancy_checker": lambda rng, n: ("_", "\n".join(make_documents(rng, n))),
+    "redundancy_checker_stream": lambda rng, n: ("_", "\n".join(make_documents(rng, n))),
+    "retrieval_metrics_evaluator": _labeled_run,
+    "exact_match_checker": lambda rng, n: (rng.choice(WORDS), "\n".join(make_documents(rng, n))),
+    "repetition_checker": lambda rng, n: ("_", "\n".join(make_generations(rng, n))),
+    "semantic_diversity_checker": lambda rng, n: ("_", "\n".join(make_generations(rng, n))),
+    "length_consistency_checker": lambda rng, n: ("_", "\n".join(make_generations(rng, n))),
+    "relevance_evaluator": lambda rng, n: (_query(rng), "\n".join(make_generations(rng, n))),
+    "coverage_evaluator": lambda rng, n: ("_", "\n".join(make_generations(rng, n))),
+    "hallucination_detector": lambda rng, n: (" ".join(make_generations(rng, n)), "\n".join(make_documents(rng, n))),
+    "batch_hallucination_detector": lambda rng, n: (
+        json.dumps([" ".join(make_generations(rng, 3)) for _ in range(max(n // 3, 1))]), "\n".join(make_documents(rng, n))),
+    "hallucination_detector_stream": lambda rng, n: (" ".join(make_generations(rng, n)), "\n".join(make_documents(rng, n))),
+    "batch_evaluator": lambda rng, n: ("\n".join(
+        json.dumps({"query": _query(rng), "documents": make_documents(rng, 5), "generation": " ".join(make_generations(rng, 3))})
+        for _ in range(n)
+    ), ""),
+}
+
+
+def _max_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round((rss if sys.platform == "darwin" else rss * 1024) / 2 ** 20, 1)
+
+
+def _percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else float("nan")
+
+
+def _run_case(tool_name: str, size: int, repeats: int, budget_s: float, encoder: str, conn) -> None:
+    """Child process: build inputs, time the tool, send a result dict back."""
+    import run_store
+    from embeddings import set_backend
+    from tool_registry import get_tool
+
+    # Benchmark rows are synthetic: never record them in a run store, whatever the environment says.
+    run_store.RUN_STORE_PATH = ""
+    set_backend(encoder)
+    fn = get_tool(tool_name)["fn"]
+    args = INPUTS[tool_name](random.Random(size), size)
+    baseline_rss = _max_rss_mb()
+
+    latencies = []
+    spent = 0.0
+    while len(latencies) < repeats and (not latencies or spent < budget_s):
+        started = time.perf_counter()
+        result = fn(*args)
+        if inspect.isgenerator(result):
+            for update in result:
+                pass
+            result = update
+        elapsed = time.perf_counter() - started
+        latencies.append(elapsed)
+        spent += elapsed
+
+    conn.send({
+        "status": "error" if isinstance(result, dict) and "error" in result else "ok",
+        "runs": len(latencies),
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 50) * 1000, 3),
+            "p95": round(_percentile(latencies, 95) * 1000, 3),
+            "p99": round(_percentile(latencies, 99) * 1000, 3),
+            "mean": round(sum(latencies) / len(latencies) * 1000, 3),
+        },
+        "throughput_items_per_s": round(size / _percentile(latencies, 50), 1),
+        "baseline_rss_mb": baseline_rss,
+        "peak_rss_mb": _max_rss_mb(),
+    })
+
+
+def run_case(tool_name: str, size: int, repeats: int, budget_s: float, timeout_s: float, encoder: str = "hashing") -> Dict:
+    """Run one (tool, size) case in a fresh process, killing it after `timeout_s`."""
+    ctx = multiprocessing.get_context("fork")
+    parent, child = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_run_case, args=(tool_name, size, repeats, budget_s, encoder, child))
+    proc.start()
+    record = {"tool": tool_name, "size": size}
+    if parent.poll(timeout_s):
+        try:
+            record.update(parent.recv())
+        except EOFError:
+            record["status"] = "crashed"
+        proc.join()
+    else:
+        proc.kill()
+        proc.join()
+        record.update({"status": "timeout", "timeout_s": timeout_s})
+    return record
+
+
+def add_scaling(results: List[Dict]) -> None:
+    """Annotate each case with the exponent k in latency ~ size^k relative to the previous size."""
+    previous = {}
+    for record in results:
+        prev = previous.get(record["tool"])
+        if prev and record.get("status") == "ok" and prev.get("status") == "ok":
+            t0, t1 = prev["latency_ms"]["p50"], record["latency_ms"]["p50"]
+            if t0 > 0 and t1 > 0:
+                record["scaling_exponent"] = round(math.log(t1 / t0) / math.log(record["size"] / prev["size"]), 2)
+        previous[record["tool"]] = record
+
+
+def compare(current: List[Dict], baseline: List[Dict], threshold: float, min_ms: float = 1.0) -> List[str]:
+    """
+    List cases that regressed against a baseline run.
+
+    A case regresses if its p50 latency grew by more than `threshold` (as a fraction, and by
+    at least `min_ms` to ignore timer noise), or if it used to finish and now does not.
+    """
+    before = {(r["tool"], r["size"]): r for r in baseline}
+    regressions = []
+    for record in current:
+        old = before.get((record["tool"], record["size"]))
+        if old is None or old.get("status") != "ok":
+            continue
+        if record.get("status") != "ok":
+            regressions.append(f"{record['tool']} @ {record['size']}: was ok, now {record.get('status')}")
+            continue
+        t0, t1 = old["latency_ms"]["p50"], record["latency_ms"]["p50"]
+        if t1 > t0 * (1 + threshold) and t1 - t0 >= min_ms:
+            regressions.append(f"{record['tool']} @ {record['size']}: p50 {t0:.1f} ms -> {t1:.1f} ms (+{(t1 / t0 - 1) * 100:.0f}%)")
+    return regressions
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark every evaluation tool across input sizes.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="Comma-separated input sizes.")
+    parser.add_argument("--tools", default="", help="Comma-separated tool names (default: all benchmarkable tools).")
+    parser.add_argument("--repeats", type=int, default=5, help="Maximum timed runs per case.")
+    parser.add_argument("--budget", type=float, default=5.0, help="Stop repeating a case after this many seconds.")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Kill a case after this many seconds.")
+    parser.add_argument("--encoder", default="hashing", help="Encoder backend (default: hashing).")
+    parser.add_argument("--output", default="", help="Write results as JSON to this file.")
+    parser.add_argument("--baseline", default="", help="Previous results JSON to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed p50 slowdown vs baseline (0.2 = 20%%).")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    tools = [t.strip() for t in args.tools.split(",") if t.strip()] or list(INPUTS)
+    unknown = [t for t in tools if t not in INPUTS]
+    if unknown:
+        parser.error(f"No benchmark inputs for: {', '.join(unknown)}")
+
+    results = []
+    for tool_name in tools:
+        timed_out = False
+        for size in sorted(sizes):
+            if timed_out:
+                # Larger inputs will not finish either; record that without waiting again.
+                results.append({"tool": tool_name, "size": size, "status": "skipped"})
+                continue
+            record = run_case(tool_name, size, args.repeats, args.budget, args.timeout, args.encoder)
+            timed_out = record["status"] == "timeout"
+            results.append(record)
+            latency = record.get("latency_ms", {}).get("p50")
+            print(f"{tool_name:32s} {size:>7d}  {record['status']:8s} "
+                  f"{'' if latency is None else f'p50 {latency:10.2f} ms'}", file=sys.stderr)
+    add_scaling(results)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "encoder": args.encoder,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    superlinear = [r for r in results if r.get("scaling_exponent", 0) > 1.5]
+    for r in superlinear:
+        print(f"superlinear: {r['tool']} @ {r['size']} (exponent {r['scaling_exponent']})", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f)["results"], args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""
+BM25 scoring over interned token id arrays.
+
+`BM25Index` is the Okapi BM25 variant of `rank_bm25.BM25Okapi` (k1=1.5, b=0.75, and idf
+floored at epsilon * average idf for terms in more than half of the documents), computed
+with numpy over the int32 arrays from `tokenizer.token_ids` instead of per-document
+dicts of Python strings. Scores match `BM25Okapi` to floating-point precision.
+"""
+from typing import List
+
+import numpy as np
+
+
+class BM25Index:
+    """
+    Term statistics of a tokenized corpus, ready to score queries.
+
+    Args:
+        docs (List[np.ndarray]): Token ids of each document.
+        k1 (float): Term frequency saturation.
+        b (float): Document length normalization.
+        epsilon (float): Floor for negative idf values, as a fraction of the average idf.
+    """
+
+    def __init__(self, docs: List[np.ndarray], k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25):
+        self.k1 = k1
+        self.b = b
+        self.corpus_size = len(docs)
+        self.doc_len = np.array([len(d) for d in docs], dtype=np.float64)
+        self.avgdl = float(self.doc_len.sum()) / max(self.corpus_size, 1)
+
+        all_ids = np.concatenate(docs) if docs else np.zeros(0, dtype=np.int32)
+        doc_of = np.repeat(np.arange(self.corpus_size, dtype=np.int64), self.doc_len.astype(np.int64))
+        # Local term numbering: self.terms[t] is the token id of term t.
+        self.terms, local = np.unique(all_ids, return_inverse=True)
+
+        # One entry per distinct (term, document) pair, sorted by term then document.
+        keys, counts = np.unique(local.astype(np.int64) * max(self.corpus_size, 1) + doc_of, return_counts=True)
+        self.pair_term = keys // max(self.corpus_size, 1)
+        self.pair_doc = keys % max(self.corpus_size, 1)
+        self.pair_tf = counts.astype(np.float64)
+        self.term_start = np.searchsorted(self.pair_term, np.arange(len(self.terms) + 1))
+
+        df = np.diff(self.term_start).astype(np.float64)
+        idf = np.log(self.corpus_size - df + 0.5) - np.log(df + 0.5)
+        average_idf = float(idf.mean()) if len(idf) else 0.0
+        idf[idf < 0] = epsilon * average_idf
+        self.idf = idf
+        self._norm = self.k1 * (1 - self.b + self.b * self.doc_len / self.avgdl) if self.avgdl else np.zeros(self.corpus_size)
+
+    def get_scores(self, query: np.ndarray) -> np.ndarray:
+        """
+        BM25 score of every document for a query.
+
+        Args:
+            query (np.ndarray): Token ids of the query; repeated terms count once per occurrence.
+
+        Returns:
+            np.ndarray: One float64 score per document, in corpus order.
+        """
+        scores = np.zeros(self.corpus_size)
+        if not len(self.terms):
+            return scores
+        query = np.asarray(query)
+        pos = np.searchsorted(self.terms, query)
+        known = (pos < len(self.terms)) & (self.terms[np.minimum(pos, len(self.terms) - 1)] == query)
+        for t in pos[known].tolist():
+            lo, hi = self.term_start[t], self.term_start[t + 1]
+            docs = self.pair_doc[lo:hi]
+            tf = self.pair_tf[lo:hi]
+            scores[docs] += self.idf[t] * (tf * (self.k1 + 1) / (tf + self._norm[docs]))
+        return scores
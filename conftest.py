@@ -0,0 +1,7 @@
+import os
+
+# Tests run offline: serve the semantic tools from the deterministic hashing encoder
+# instead of downloading sentence-transformers weights.
+os.environ.setdefault("RAG_EVAL_ENCODER", "hashing")
+# Keep batch evaluations out of the working directory; run-store tests use a temp database.
+os.environ.setdefault("RAG_EVAL_RUN_STORE", "")
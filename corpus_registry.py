@@ -0,0 +1,375 @@
+"""
+Server-side registry of document sets.
+
+`register_corpus` parses a document set once and returns an id such as
+"corpus:3f2a9c0d1b7e4a56". Every tool that takes documents also accepts that id in place
+of the documents, and then reuses the corpus' parsed documents, BM25 index and embeddings
+instead of re-parsing, re-tokenizing and re-encoding the same candidate pool per call.
+
+Ids are content hashes, so registering the same documents again returns the same id.
+Corpora live in memory under a byte budget with least-recently-used eviction. With
+RAG_EVAL_CORPUS_DIR set, documents and embeddings are also written to disk, and an evicted
+or pre-restart corpus is reloaded from there on its next use. Persisted embeddings are
+stored unit-normalized and memory-mapped read-only, so processes sharing the directory
+(see `workers`) share one copy of them.
+
+Embeddings are held in RAG_EVAL_EMBEDDING_STORAGE precision (see `quantization`). With a
+reduced precision, the float32 embeddings are kept on disk only (in the corpus directory,
+or a scratch file without one) for exact rescoring and for all-pairs tools such as the
+redundancy checker, which read exact vectors from it instead of the lossy codes.
+"""
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+import functools
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+import threading
+import weakref
+
+import numpy as np
+
+from bm25 import BM25Index
+from embeddings import MINILM, encode, get_backend
+from quantization import STORAGE, QuantizedMatrix, normalize
+from tokenizer import token_ids
+
+CORPUS_PREFIX = "corpus:"
+MEMORY_BUDGET = int(float(os.environ.get("RAG_EVAL_CORPUS_MEMORY_MB", "1024")) * 2 ** 20)
+CORPUS_DIR = os.environ.get("RAG_EVAL_CORPUS_DIR", "")
+
+
+class CorpusNotFound(KeyError):
+    """Raised when a corpus id is neither in memory nor on disk."""
+
+    def __str__(self) -> str:
+        return f"Unknown corpus {self.args[0]}: it was never registered or has been evicted. Register it again."
+
+
+class CorpusTexts(list):
+    """
+    A list of texts that belongs to a registered corpus.
+
+    Tools handle it like any list of documents; `embeddings.encode` recognises it and
+    returns the corpus' stored embeddings instead of encoding the texts again.
+    """
+
+    def __init__(self, texts: List[str], corpus: "Corpus", view: str):
+        super().__init__(texts)
+        self.corpus = corpus
+        self.view = view
+
+    def embeddings(self, model_name: str) -> np.ndarray:
+        return self.corpus.exact_embeddings(self.view, model_name)
+
+    def similarity(self, queries: np.ndarray, model_name: str) -> np.ndarray:
+        return self.corpus.stored(self.view, model_name).similarity(queries)
+
+
+class Corpus:
+    """Parsed documents of one registered corpus plus everything derived from them, built on first use."""
+
+    def __init__(self, corpus_id: str, documents: List[str], directory: str = "", on_grow: Optional[Callable] = None,
+                 storage: str = STORAGE):
+        self.id = corpus_id
+        self.directory = directory
+        self.storage = storage
+        self.documents = CorpusTexts(documents, self, "documents")
+        self._views: Dict[str, CorpusTexts] = {"documents": self.documents}
+        self._embeddings: Dict[tuple, QuantizedMatrix] = {}  # (view, backend, model name) -> stored embeddings
+        self.reports: Dict[tuple, Dict] = {}  # same keys -> memory saving and score error of the storage
+        self._bm25: Optional[BM25Index] = None
+        self._lock = threading.RLock()
+        self._on_grow = on_grow
+
+    def view(self, name: str, build: Callable[[], List[str]]) -> CorpusTexts:
+        """Texts derived from the documents (e.g. their sentences), built once with `build`."""
+        with self._lock:
+            if name not in self._views:
+                self._views[name] = CorpusTexts(build(), self, name)
+            return self._views[name]
+
+    def bm25(self) -> BM25Index:
+        """The BM25 index of the documents."""
+        with self._lock:
+            if self._bm25 is None:
+                self._bm25 = BM25Index([token_ids(doc) for doc in self.documents])
+                self._grew()
+            return self._bm25
+
+    def _embedding_path(self, key: tuple) -> str:
+        view, backend, model_name = key
+        return os.path.join(self.directory, f"{view}--{backend}--{model_name}.npy")
+
+    def stored(self, view: str, model_name: str = MINILM) -> QuantizedMatrix:
+        """Embeddings of a view's texts for the active encoder backend, in the corpus' storage precision."""
+        key = (view, get_backend(), model_name)
+        with self._lock:
+            matrix = self._embeddings.get(key)
+            if matrix is None:
+                path = self._embedding_path(key) if self.directory else ""
+                if path and os.path.exists(path):
+                    embs = np.load(path, mmap_mode="r")
+                else:
+                    embs = normalize(encode(list(self._views[view]), model_name))
+                    if path:
+                        _save(path, embs)
+                        # Mapped rather than held: every process using the corpus shares the page cache copy.
+                        embs = np.load(path, mmap_mode="r")
+                exact_path = ""
+                # Compact storage keeps an exact copy on disk even without rescoring: all-pairs tools
+                # (redundancy) read their vectors from it instead of the lossy codes.
+                if self.storage != "float32":
+                    exact_path = path or _scratch_file(f"{self.id[len(CORPUS_PREFIX):]}--{view}--{key[1]}--{model_name}.npy", embs)
+                matrix = QuantizedMatrix(embs, self.storage, exact_path)
+                if exact_path and not path:
+                    weakref.finalize(matrix, _remove, exact_path)
+                self.reports[key] = matrix.report(embs)
+                self._embeddings[key] = matrix
+                self._grew()
+            return matrix
+
+    def embeddings(self, view: str, model_name: str = MINILM) -> np.ndarray:
+        """Unit-normalized float32 embeddings of a view's texts, decoded from storage when it is compact."""
+        return self.stored(view, model_name).dequantize()
+
+    def exact_embeddings(self, view: str, model_name: str = MINILM) -> np.ndarray:
+        """Unit-normalized float32 embeddings of a view's texts, exact whatever the storage precision."""
+        return self.stored(view, model_name).exact()
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the corpus."""
+        total = sum(len(text) for texts in self._views.values() for text in texts)
+        total += sum(matrix.nbytes for matrix in self._embeddings.values())
+        if self._bm25 is not None:
+            index = self._bm25
+            total += sum(a.nbytes for a in (index.terms, index.pair_term, index.pair_doc, index.pair_tf, index.idf))
+        return total
+
+    def _grew(self) -> None:
+        if self._on_grow is not None:
+            self._on_grow(self)
+
+
+_scratch: Optional[tempfile.TemporaryDirectory] = None
+
+
+def _scratch_file(name: str, embs: np.ndarray) -> str:
+    """Save float32 embeddings to a process-lifetime scratch directory and return the path."""
+    global _scratch
+    if _scratch is None:
+        _scratch = tempfile.TemporaryDirectory(prefix="rag-eval-embeddings-")
+    path = os.path.join(_scratch.name, name)
+    np.save(path, np.asarray(embs, dtype=np.float32))
+    return path
+
+
+def _save(path: str, embs: np.ndarray) -> None:
+    """Write an .npy file atomically, so a process loading it concurrently never sees a partial file."""
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, embs)
+    os.replace(tmp, path)
+
+
+def _remove(path: str) -> None:
+    if os.path.exists(path):
+        os.remove(path)
+
+
+class CorpusRegistry:
+    """
+    Registered corpora, evicted least-recently-used first once their total size exceeds `max_bytes`.
+
+    Args:
+        max_bytes (int): Memory budget for all corpora together.
+        directory (str): Optional directory to persist corpora in; empty keeps them in memory only.
+        storage (str): Precision embeddings are held in, one of `quantization.PRECISIONS`.
+    """
+
+    def __init__(self, max_bytes: int = MEMORY_BUDGET, directory: str = CORPUS_DIR, storage: str = STORAGE):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.storage = storage
+        self._corpora: "OrderedDict[str, Corpus]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    @staticmethod
+    def make_id(documents: List[str]) -> str:
+        digest = hashlib.sha256(json.dumps(documents, ensure_ascii=False).encode("utf-8")).hexdigest()
+        return CORPUS_PREFIX + digest[:16]
+
+    def _corpus_dir(self, corpus_id: str) -> str:
+        if not self.directory:
+            return ""
+        path = os.path.join(self.directory, corpus_id[len(CORPUS_PREFIX):])
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def _add(self, corpus_id: str, documents: List[str]) -> Corpus:
+        # Called with _lock held.
+        corpus = Corpus(corpus_id, documents, self._corpus_dir(corpus_id), on_grow=self._evict, storage=self.storage)
+        self._corpora[corpus_id] = corpus
+        return corpus
+
+    def register(self, documents: List[str]) -> Corpus:
+        """
+        Register a parsed document set, or return the existing corpus with the same documents.
+
+        Args:
+            documents (List[str]): The documents, already parsed.
+
+        Returns:
+            Corpus: The registered corpus.
+        """
+        corpus_id = self.make_id(documents)
+        with self._lock:
+            corpus = self._corpora.get(corpus_id)
+            if corpus is None:
+                corpus = self._add(corpus_id, list(documents))
+                if corpus.directory:
+                    path = os.path.join(corpus.directory, "documents.json")
+                    tmp = f"{path}.{os.getpid()}.tmp"
+                    with open(tmp, "w", encoding="utf-8") as f:
+                        json.dump(corpus.documents, f, ensure_ascii=False)
+                    os.replace(tmp, path)
+            self._corpora.move_to_end(corpus_id)
+        self._evict(corpus)
+        return corpus
+
+    def get(self, corpus_id: str) -> Corpus:
+        """
+        Look up a corpus by id, reloading it from disk if it was persisted.
+
+        Raises:
+            CorpusNotFound: If the corpus is neither in memory nor on disk.
+        """
+        corpus_id = corpus_id.strip()
+        with self._lock:
+            corpus = self._corpora.get(corpus_id)
+            if corpus is not None:
+                self._corpora.move_to_end(corpus_id)
+                return corpus
+            path = os.path.join(self.directory, corpus_id[len(CORPUS_PREFIX):], "documents.json") if self.directory else ""
+            if not path or not os.path.exists(path):
+                raise CorpusNotFound(corpus_id)
+            with open(path, encoding="utf-8") as f:
+                corpus = self._add(corpus_id, json.load(f))
+        self._evict(corpus)
+        return corpus
+
+    def peek(self, corpus_id: str) -> Optional[Corpus]:
+        """A corpus held in memory, without reloading it or counting it as a use."""
+        with self._lock:
+            return self._corpora.get(corpus_id.strip())
+
+    def _evict(self, keep: Corpus) -> None:
+        with self._lock:
+            sizes = {corpus_id: corpus.nbytes() for corpus_id, corpus in self._corpora.items()}
+            total = sum(sizes.values())
+            for corpus_id in list(self._corpora):
+                if total <= self.max_bytes:
+                    break
+                if corpus_id == keep.id:
+                    continue
+                del self._corpora[corpus_id]
+                total -= sizes[corpus_id]
+                self.evictions += 1
+
+    def stats(self) -> Dict:
+        """Number of corpora held in memory, their size and the budget."""
+        with self._lock:
+            corpora = list(self._corpora.values())
+        return {
+            "corpora": len(corpora),
+            "bytes": sum(corpus.nbytes() for corpus in corpora),
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+            "persisted": bool(self.directory),
+            "storage": self.storage,
+        }
+
+
+default_registry = CorpusRegistry()
+
+
+def is_corpus_ref(documents) -> bool:
+    """True if a tool's documents argument is a corpus id rather than documents."""
+    return isinstance(documents, str) and documents.strip().startswith(CORPUS_PREFIX)
+
+
+def resolve(corpus_id: str) -> CorpusTexts:
+    """The documents of a registered corpus; raises CorpusNotFound for unknown ids."""
+    return default_registry.get(corpus_id).documents
+
+
+def corpus_aware(fn: Callable) -> Callable:
+    """
+    Turn a reference to an unknown corpus into the tool's usual {"error": ...} response.
+
+    Args:
+        fn (Callable): A tool whose documents may be a corpus id, plain or generator.
+
+    Returns:
+        Callable: The wrapped tool.
+    """
+    if inspect.isgeneratorfunction(fn):
+        @functools.wraps(fn)
+        def stream_wrapper(*args, **kwargs):
+            try:
+                yield from fn(*args, **kwargs)
+            except CorpusNotFound as e:
+                yield {"error": str(e)}
+
+        return stream_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        except CorpusNotFound as e:
+            return {"error": str(e)}
+
+    return wrapper
+
+
+def register_corpus(documents: str, precompute: bool = True) -> Dict:
+    """
+    Register a document set once and get back a corpus id to pass as `documents` to any retriever or system tool.
+
+    Large candidate pools then travel to the server once, and are parsed, indexed and encoded once.
+
+    Args:
+        documents (str): A set of documents in raw string format. Supports JSON-style lists, paragraph-separated, or newline-separated entries.
+        precompute (bool): Build the BM25 index and the document embeddings now rather than on first use.
+
+    Returns:
+        Dict: A dictionary containing:
+            - 'tool': The name of the tool ("Register Corpus").
+            - 'corpus_id': Id to pass in place of the documents, e.g. "corpus:3f2a9c0d1b7e4a56".
+            - 'documents': Number of parsed documents.
+            - 'bytes': Approximate server memory held by the corpus.
+            - 'storage': With `precompute`, the embedding precision, its size against float32 and,
+              for reduced precisions, the measured score error and prefilter recall.
+            - 'registry': Number of corpora held, their total size and the memory budget.
+    """
+    from retriever_eval_tools import parse_documents
+
+    if is_corpus_ref(documents):
+        return {"error": "documents is already a corpus id."}
+    doc_list = parse_documents(documents)
+    if not doc_list:
+        return {"error": "Documents must be non-empty."}
+
+    corpus = default_registry.register(doc_list)
+    result = {"tool": "Register Corpus", "corpus_id": corpus.id, "documents": len(corpus.documents)}
+    if precompute:
+        corpus.bm25()
+        corpus.stored("documents", MINILM)
+        result["storage"] = corpus.reports[("documents", get_backend(), MINILM)]
+    result["bytes"] = corpus.nbytes()
+    result["registry"] = default_registry.stats()
+    return result
@@ -0,0 +1,174 @@
+"""
+Per-call deadlines and cooperative cancellation.
+
+A `Deadline` is installed for the duration of a tool call. Tools and the shared encode /
+similarity helpers call `check()` between encode batches and similarity blocks; once the
+deadline has passed or the call was cancelled (e.g. the MCP client went away), `check()`
+raises `DeadlineExceeded`. Tools that can stop early catch it (or poll `expired()`) and
+return the work done so far with 'truncated' set; for every other tool `with_deadline`
+turns it into an error response. Outside a deadline scope both calls are a context
+variable lookup.
+
+The server applies RAG_EVAL_DEADLINE_S (default 0, no deadline) to calls that do not pass
+`deadline_s`.
+"""
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, Tuple
+import contextvars
+import functools
+import inspect
+import os
+import threading
+import time
+
+from signatures import add_parameters, split_options
+
+DEFAULT_DEADLINE_S = float(os.environ.get("RAG_EVAL_DEADLINE_S", "0"))
+
+# Rows of a similarity matrix computed per block; tools stop between blocks once a call expires.
+SIMILARITY_BLOCK = int(os.environ.get("RAG_EVAL_SIMILARITY_BLOCK", "1024"))
+
+DEADLINE_PARAM = inspect.Parameter("deadline_s", inspect.Parameter.POSITIONAL_OR_KEYWORD, default=0.0, annotation=float)
+
+_current = contextvars.ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Raised by `check()` once the current call's deadline has passed or it was cancelled."""
+
+
+class Deadline:
+    """
+    A point in time after which a call should stop, plus a cancellation flag.
+
+    Args:
+        seconds (Optional[float]): Time budget from now; None or 0 for no time limit.
+        parent (Optional[Deadline]): An enclosing deadline; this one also expires with it.
+    """
+
+    def __init__(self, seconds: Optional[float] = None, parent: Optional["Deadline"] = None):
+        self.seconds = seconds or None
+        self.expires_at = time.monotonic() + seconds if seconds else None
+        self.parent = parent
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set() or (self.parent is not None and self.parent.cancelled())
+
+    def expired(self) -> bool:
+        if self.expires_at is not None and time.monotonic() >= self.expires_at:
+            return True
+        return self.cancelled() or (self.parent is not None and self.parent.expired())
+
+    def reason(self) -> str:
+        if self.cancelled():
+            return "The call was cancelled."
+        if self.expires_at is not None and time.monotonic() >= self.expires_at:
+            return f"Deadline of {self.seconds:g}s exceeded."
+        return self.parent.reason() if self.parent is not None else "Deadline exceeded."
+
+
+@contextmanager
+def scope(deadline: Deadline):
+    """Make `deadline` the current one inside the `with` block."""
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def current() -> Optional[Deadline]:
+    """The deadline of the call in progress, if any."""
+    return _current.get()
+
+
+def expired() -> bool:
+    """True once the current call should stop. Cheap enough to poll in loops."""
+    deadline = _current.get()
+    return deadline is not None and deadline.expired()
+
+
+def check() -> None:
+    """Raise `DeadlineExceeded` if the current call should stop."""
+    deadline = _current.get()
+    if deadline is not None and deadline.expired():
+        raise DeadlineExceeded(deadline.reason())
+
+
+def blocks(total: int, size: int = 0) -> Iterator[Tuple[int, int]]:
+    """
+    (start, end) ranges covering range(total), stopping early once the current call should stop.
+
+    The first block is always produced, so a call that is already late still returns something.
+    `size` defaults to SIMILARITY_BLOCK rows.
+    """
+    size = size or SIMILARITY_BLOCK
+    for start in range(0, total, size):
+        if start and expired():
+            return
+        yield start, min(start + size, total)
+
+
+def call_in_scope(deadline: Deadline, fn: Callable, *args, **kwargs):
+    """Call `fn` with `deadline` current; used to carry a deadline into an executor thread."""
+    with scope(deadline):
+        return fn(*args, **kwargs)
+
+
+def with_deadline(fn: Callable, default_s: float = DEFAULT_DEADLINE_S) -> Callable:
+    """
+    Add a `deadline_s` argument to a tool.
+
+    The call runs under a `Deadline` of `deadline_s` seconds (0 uses `default_s`), nested in
+    any deadline or cancellation token already current. If the tool does not handle
+    `DeadlineExceeded` itself, the response is {"error": ..., "truncated": True}; streaming
+    tools end with such an update.
+
+    Args:
+        fn (Callable): The tool function, plain or generator.
+        default_s (float): Deadline for calls that do not set one; 0 for none.
+
+    Returns:
+        Callable: The wrapped tool with the extended signature.
+    """
+    sig = add_parameters(fn, [DEADLINE_PARAM])
+
+    def make(opts) -> Deadline:
+        seconds = float(opts["deadline_s"] or 0) or default_s
+        return Deadline(seconds if seconds > 0 else None, parent=_current.get())
+
+    if inspect.isgeneratorfunction(fn):
+        @functools.wraps(fn)
+        def stream_wrapper(*args, **kwargs):
+            call_args, opts = split_options(sig, args, kwargs, ["deadline_s"])
+            deadline = make(opts)
+            updates = fn(**call_args)
+            finished = object()
+            while True:
+                # Generators run in their caller's context, so the scope is set around each step only.
+                try:
+                    update = call_in_scope(deadline, next, updates, finished)
+                except DeadlineExceeded as e:
+                    yield {"error": str(e), "truncated": True}
+                    return
+                if update is finished:
+                    return
+                yield update
+
+        stream_wrapper.__signature__ = sig
+        return stream_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        call_args, opts = split_options(sig, args, kwargs, ["deadline_s"])
+        try:
+            return call_in_scope(make(opts), fn, **call_args)
+        except DeadlineExceeded as e:
+            return {"error": str(e), "truncated": True}
+
+    wrapper.__signature__ = sig
+    return wrapper
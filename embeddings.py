@@ -0,0 +1,240 @@
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Union
+import contextvars
+import os
+import threading
+import time
+
+import numpy as np
+
+from deadlines import check
+from encoders import BACKENDS, Encoder
+from metrics import observe_encode
+from profiling import count, stage
+
+MINILM = "all-MiniLM-L6-v2"
+MPNET = "all-mpnet-base-v2"
+
+# Texts handed to the encoder per call; deadlines are checked between these slices.
+ENCODE_BATCH = int(os.environ.get("RAG_EVAL_ENCODE_BATCH", "256"))
+
+_backend = os.environ.get("RAG_EVAL_ENCODER", "sentence-transformers")
+_backend_override = contextvars.ContextVar("encoder_backend", default=None)
+
+_encoders: Dict = {}  # (backend, model name) -> Encoder
+_encoders_lock = threading.Lock()
+_loading: Dict = {}  # (backend, model name) -> lock held while that encoder loads
+
+# Per-scope memo of text -> embedding, keyed by (backend, model name). Only active inside `shared_encodings()`.
+_shared = contextvars.ContextVar("shared_encodings", default=None)
+
+
+def get_backend() -> str:
+    """Name of the encoder backend in effect for the current call."""
+    return _backend_override.get() or _backend
+
+
+def set_backend(name: str) -> None:
+    """
+    Switch the process-wide encoder backend ("sentence-transformers" or "hashing").
+
+    Args:
+        name (str): A key of `encoders.BACKENDS`.
+    """
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown encoder backend: {name}. Available: {', '.join(BACKENDS)}")
+    _backend = name
+
+
+@contextmanager
+def use_backend(name: str):
+    """Use encoder backend `name` for every `encode` call inside the `with` block."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown encoder backend: {name}. Available: {', '.join(BACKENDS)}")
+    token = _backend_override.set(name)
+    try:
+        yield
+    finally:
+        _backend_override.reset(token)
+
+
+def get_encoder(model_name: str = MINILM) -> Encoder:
+    """
+    Return the active backend's encoder for `model_name`, creating it on first use.
+
+    Args:
+        model_name (str): A sentence-transformers model name, e.g. MINILM or MPNET.
+
+    Returns:
+        Encoder: The encoder, shared by every tool in the process.
+    """
+    key = (get_backend(), model_name)
+    with _encoders_lock:
+        encoder = _encoders.get(key)
+        if encoder is not None:
+            return encoder
+        loading = _loading.setdefault(key, threading.Lock())
+    # Models load under their own lock, so loading one never blocks callers of another.
+    with loading:
+        with _encoders_lock:
+            encoder = _encoders.get(key)
+        if encoder is None:
+            encoder = BACKENDS[key[0]](model_name)
+            with _encoders_lock:
+                _encoders[key] = encoder
+        return encoder
+
+
+def is_loaded(model_name: str = MINILM) -> bool:
+    """True if the active backend's encoder for `model_name` is already loaded."""
+    with _encoders_lock:
+        return (get_backend(), model_name) in _encoders
+
+
+def register_encoder(model_name: str, encoder: Encoder, backend: str = "") -> None:
+    """
+    Serve `encoder` whenever `model_name` is requested from `backend` (default: the active one).
+
+    Args:
+        model_name (str): The model name tools ask for (e.g. MINILM).
+        encoder (Encoder): The encoder to use for that name.
+        backend (str): Backend to register under.
+    """
+    with _encoders_lock:
+        _encoders[(backend or get_backend(), model_name)] = encoder
+
+
+def _encode_batch(texts: List[str], model_name: str) -> np.ndarray:
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    encoder = get_encoder(model_name)
+    parts = []
+    # Large inputs go to the encoder in slices, with a deadline check before each one.
+    for start in range(0, len(texts), ENCODE_BATCH):
+        check()
+        batch = texts[start:start + ENCODE_BATCH]
+        started = time.perf_counter()
+        with stage("encode"):
+            parts.append(np.asarray(encoder.encode(batch), dtype=np.float32))
+        observe_encode(encoder.name, len(batch), time.perf_counter() - started)
+        count("encode_batches")
+        count("encoded_texts", len(batch))
+    return parts[0] if len(parts) == 1 else np.vstack(parts)
+
+
+def encode(texts: Union[str, List[str]], model_name: str = MINILM) -> np.ndarray:
+    """
+    Encode one text or a list of texts.
+
+    Inside a `shared_encodings()` scope every distinct text is encoded at most once per
+    model, however many tools ask for it.
+
+    Args:
+        texts (Union[str, List[str]]): A single text or a list of texts.
+        model_name (str): The model to use; the active backend decides how it is served.
+
+    Returns:
+        np.ndarray: A (dim,) vector for a single text, or an (n, dim) matrix for a list.
+    """
+    # Documents of a registered corpus carry their own embeddings (see corpus_registry.CorpusTexts).
+    stored = getattr(texts, "embeddings", None)
+    if stored is not None:
+        return stored(model_name)
+
+    single = isinstance(texts, str)
+    batch = [texts] if single else list(texts)
+
+    memo = _shared.get()
+    if memo is None:
+        embs = _encode_batch(batch, model_name)
+    else:
+        store = memo.setdefault((get_backend(), model_name), {})
+        missing = [t for t in dict.fromkeys(batch) if t not in store]
+        count("encode_cache_hits", len(batch) - len(missing))
+        count("encode_cache_misses", len(missing))
+        if missing:
+            for text, emb in zip(missing, _encode_batch(missing, model_name)):
+                store[text] = emb
+        embs = np.stack([store[t] for t in batch]) if batch else _encode_batch([], model_name)
+
+    return embs[0] if single else embs
+
+
+def cos_sim(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Cosine similarity between every row of `a` and every row of `b`.
+
+    Args:
+        a (np.ndarray): A vector or an (n, dim) matrix.
+        b (np.ndarray): A vector or an (m, dim) matrix.
+
+    Returns:
+        np.ndarray: An (n, m) similarity matrix.
+    """
+    with stage("similarity"):
+        a = np.atleast_2d(a)
+        b = np.atleast_2d(b)
+        a = a / np.maximum(np.linalg.norm(a, axis=1, keepdims=True), 1e-12)
+        b = b / np.maximum(np.linalg.norm(b, axis=1, keepdims=True), 1e-12)
+        return a @ b.T
+
+
+def scorer(texts: List[str], model_name: str = MINILM) -> Callable[[np.ndarray], np.ndarray]:
+    """
+    Prepare `texts` to be scored against query embeddings.
+
+    Plain texts are encoded once here. Texts of a registered corpus are scored from its
+    stored embeddings, in whatever precision they are held (see `quantization`), without
+    materializing a float32 copy.
+
+    Args:
+        texts (List[str]): The texts to score against.
+        model_name (str): The model the query embeddings come from.
+
+    Returns:
+        Callable[[np.ndarray], np.ndarray]: Maps a query vector or (n, dim) matrix to an
+        (n, len(texts)) cosine similarity matrix.
+    """
+    corpus_similarity = getattr(texts, "similarity", None)
+    if corpus_similarity is not None:
+        return lambda queries: corpus_similarity(queries, model_name)
+    embs = encode(texts, model_name)
+    return lambda queries: cos_sim(queries, embs)
+
+
+@contextmanager
+def shared_encodings():
+    """
+    Share encodings between every `encode` call made inside the `with` block.
+
+    Nested scopes reuse the outermost one.
+    """
+    token = _shared.set({}) if _shared.get() is None else None
+    try:
+        yield
+    finally:
+        if token is not None:
+            _shared.reset(token)
+
+
+def prefetch(texts: Iterable[str], model_name: str = MINILM) -> int:
+    """
+    Encode every not-yet-seen text in one batch so later `encode` calls are memo hits.
+
+    Has no effect outside a `shared_encodings()` scope.
+
+    Args:
+        texts (Iterable[str]): Texts that tools in the scope are about to encode.
+        model_name (str): The model to use.
+
+    Returns:
+        int: The number of texts actually sent to the model.
+    """
+    memo = _shared.get()
+    if memo is None:
+        return 0
+    store = memo.setdefault((get_backend(), model_name), {})
+    missing = [t for t in dict.fromkeys(texts) if t not in store]
+    encode(missing, model_name)
+    return len(missing)
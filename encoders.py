@@ -0,0 +1,120 @@
+"""
+Encoder backends used by the semantic tools.
+
+Tools never talk to a model directly; they call `embeddings.encode`, which asks the active
+backend for an `Encoder` per model name. Two backends ship with the server:
+
+  - "sentence-transformers" (default): the real MiniLM / mpnet models. Needs torch and
+    downloaded weights.
+  - "hashing": a deterministic feature-hashing encoder that needs only numpy. Words and
+    character trigrams are hashed with a sign bit into a fixed number of dimensions, which
+    is a sparse random projection of the bag-of-features vector. Lexically similar texts
+    get similar vectors. It is an offline stand-in for tests and benchmarks, and an
+    opt-in fast tier for high-volume screening where approximate similarity is enough.
+
+Select the backend with the RAG_EVAL_ENCODER environment variable or `embeddings.set_backend`.
+"""
+from abc import ABC, abstractmethod
+from typing import Dict, List, Tuple
+import re
+import threading
+import zlib
+
+import numpy as np
+
+# Output dimensions of the sentence-transformers models; the hashing backend mirrors them.
+MODEL_DIMS = {"all-MiniLM-L6-v2": 384, "all-mpnet-base-v2": 768}
+
+
+class Encoder(ABC):
+    """
+    Turns a batch of texts into an (n, dim) float32 matrix.
+
+    A backend that does not implement `encode` cannot be instantiated.
+    """
+
+    name = "encoder"
+    dim = 0
+
+    @abstractmethod
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Encode `texts` into an (len(texts), dim) float32 matrix."""
+
+
+class SentenceTransformerEncoder(Encoder):
+    """A sentence-transformers model, imported and loaded on construction."""
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+
+        self.name = model_name
+        self.model = SentenceTransformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(self.model.encode(texts, convert_to_numpy=True), dtype=np.float32)
+
+
+class HashingEncoder(Encoder):
+    """
+    Deterministic signed feature hashing of word unigrams and character trigrams.
+
+    Feature counts are damped with log1p and each vector is L2-normalized. The same text
+    always maps to the same vector, in every process and on every machine.
+    """
+
+    _TOKEN = re.compile(r"\b\w+\b")
+
+    def __init__(self, dim: int = 384, seed: int = 0, trigram_weight: float = 0.5):
+        self.name = f"hashing-{dim}"
+        self.dim = dim
+        self.seed = seed
+        self.trigram_weight = trigram_weight
+        self._slots: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def _slot(self, feature: str) -> Tuple[int, float]:
+        slot = self._slots.get(feature)
+        if slot is None:
+            h = zlib.crc32(feature.encode("utf-8"), self.seed)
+            slot = (h % self.dim, 1.0 if (h >> 31) & 1 else -1.0)
+            with self._lock:
+                if len(self._slots) < 1_000_000:
+                    self._slots[feature] = slot
+        return slot
+
+    def _features(self, text: str) -> List[Tuple[str, float]]:
+        features = []
+        for word in self._TOKEN.findall(text.lower()):
+            features.append((word, 1.0))
+            padded = f"<{word}>"
+            for i in range(len(padded) - 2):
+                features.append(("#" + padded[i:i + 3], self.trigram_weight))
+        return features
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        rows, cols, values = [], [], []
+        for i, text in enumerate(texts):
+            for feature, weight in self._features(text):
+                col, sign = self._slot(feature)
+                rows.append(i)
+                cols.append(col)
+                values.append(sign * weight)
+
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        if rows:
+            np.add.at(out, (np.asarray(rows), np.asarray(cols)), np.asarray(values, dtype=np.float32))
+        out = np.sign(out) * np.log1p(np.abs(out))
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.maximum(norms, 1e-12)
+
+
+def _hashing(model_name: str) -> Encoder:
+    return HashingEncoder(dim=MODEL_DIMS.get(model_name, 384))
+
+
+# backend name -> factory(model_name) -> Encoder
+BACKENDS = {
+    "sentence-transformers": SentenceTransformerEncoder,
+    "hashing": _hashing,
+}
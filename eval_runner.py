@@ -0,0 +1,220 @@
+"""
+Offline, multi-process evaluation runner.
+
+Shards a JSONL dataset of {query, documents, generation} rows across a process pool and
+runs the selected metrics from `batch_eval_tools.METRICS` without going through Gradio:
+
+    python eval_runner.py dataset.jsonl results.jsonl --metrics relevance_evaluator,hallucination_detector
+
+Each worker loads its own copy of the models once and pins torch to one thread, so
+throughput scales with the number of worker processes rather than fighting over cores.
+Results are appended to the output file as chunks finish. After every chunk the output
+offset is appended to `<output>.ckpt`; rerunning the same command after a crash
+truncates any half-written chunk and only evaluates the rows that are still missing.
+"""
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List, Set, Tuple
+import argparse
+import json
+import os
+import sys
+
+from batch_eval_tools import METRICS, evaluate_rows, parse_dataset, parse_metrics
+
+
+def _init_worker(metric_names: List[str], encoder: str) -> None:
+    # One intra-op thread per worker: the pool provides the parallelism.
+    os.environ["OMP_NUM_THREADS"] = "1"
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    from embeddings import MINILM, MPNET, get_encoder, set_backend
+
+    set_backend(encoder)
+    if encoder == "sentence-transformers":
+        import torch
+
+        torch.set_num_threads(1)
+    # Load the models this run needs up front, once per worker.
+    needed = set()
+    probe = {"query": "probe", "documents": ["probe"], "generation": "probe"}
+    for name in metric_names:
+        for model_name, _ in METRICS[name]["encodes"](probe):
+            needed.add(model_name)
+    for model_name in (MINILM, MPNET):
+        if model_name in needed:
+            get_encoder(model_name)
+
+
+def _evaluate_chunk(chunk: List[Tuple[int, str]], metric_names: List[str]) -> List[Dict]:
+    """
+    Evaluate one shard of (row_id, raw JSON line) pairs inside a worker.
+
+    A row that cannot be parsed or evaluated becomes a {"row", "error"} record; it never
+    fails the chunk, which would fail the run again on every resume.
+    """
+    records = []
+    rows = []
+    for row_id, line in chunk:
+        try:
+            rows.append((row_id, parse_dataset(line)[0]))
+        except ValueError as e:
+            records.append({"row": row_id, "error": str(e)})
+
+    try:
+        results = evaluate_rows([row for _, row in rows], metric_names)
+    except Exception:
+        # One row broke the shared batch: evaluate the chunk row by row, so the checkpoint
+        # still moves past it and the rest of the chunk keeps its results.
+        results = []
+        for _, row in rows:
+            try:
+                results.extend(evaluate_rows([row], metric_names))
+            except Exception as e:
+                results.append({"error": f"{type(e).__name__}: {e}"})
+    for (row_id, _), row_result in zip(rows, results):
+        records.append({"row": row_id, **row_result})
+    return records
+
+
+def _read_chunks(dataset_path: str, chunk_size: int, done: Set[int]) -> Iterator[Tuple[int, List[Tuple[int, str]]]]:
+    """Yield (chunk_id, rows) for every chunk not yet completed. Row ids are 0-based line numbers."""
+    chunk = []
+    chunk_id = 0
+    with open(dataset_path, encoding="utf-8") as f:
+        for row_id, line in enumerate(f):
+            if line.strip():
+                chunk.append((row_id, line))
+            if (row_id + 1) % chunk_size == 0:
+                if chunk and chunk_id not in done:
+                    yield chunk_id, chunk
+                chunk = []
+                chunk_id += 1
+    if chunk and chunk_id not in done:
+        yield chunk_id, chunk
+
+
+def _load_checkpoint(output_path: str, dataset_path: str, metric_names: List[str], chunk_size: int,
+                     encoder: str) -> Set[int]:
+    """
+    Restore progress from `<output>.ckpt` and truncate any partial chunk from the output.
+
+    A checkpoint whose output file is missing or shorter than the recorded offset is
+    discarded, and the run starts over.
+
+    Returns:
+        Set[int]: Ids of chunks whose rows are fully written.
+    """
+    ckpt_path = output_path + ".ckpt"
+    header = {"dataset": os.path.abspath(dataset_path), "metrics": metric_names, "chunk_size": chunk_size,
+              "encoder": encoder}
+    done = set()
+    offset = 0
+    if os.path.exists(ckpt_path):
+        with open(ckpt_path, encoding="utf-8") as f:
+            saved = json.loads(f.readline())
+            if saved != header:
+                raise SystemExit(
+                    f"{ckpt_path} was written for a different run ({saved}); "
+                    "delete it and the output file to start over."
+                )
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # killed mid-write; everything before it is valid
+                done.add(entry["chunk"])
+                offset = max(offset, entry["offset"])
+
+    output_size = os.path.getsize(output_path) if os.path.exists(output_path) else -1
+    if done and output_size < offset:
+        # The output was deleted, replaced or truncated since the checkpoint: the chunks it
+        # records are not all there any more, so evaluate everything again.
+        print(f"{output_path} is missing rows recorded in {ckpt_path}; starting over.", file=sys.stderr)
+        done = set()
+        offset = 0
+    if not done:
+        with open(ckpt_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(header) + "\n")
+
+    with open(output_path, "a+b") as f:
+        f.truncate(offset)
+    return done
+
+
+def run(dataset_path: str, output_path: str, metric_names: List[str], workers: int, chunk_size: int,
+        encoder: str = "sentence-transformers") -> Dict:
+    """
+    Evaluate a dataset file with a process pool, resuming from a previous checkpoint if present.
+
+    Args:
+        dataset_path (str): Path to the JSONL dataset.
+        output_path (str): Path of the append-only JSONL results file.
+        metric_names (List[str]): Metrics to run (names in `batch_eval_tools.METRICS`).
+        workers (int): Number of worker processes.
+        chunk_size (int): Rows per shard sent to a worker.
+        encoder (str): Encoder backend; "hashing" trades accuracy for a much faster screen.
+
+    Returns:
+        Dict: Number of chunks and rows evaluated in this invocation.
+    """
+    done = _load_checkpoint(output_path, dataset_path, metric_names, chunk_size, encoder)
+    chunks = _read_chunks(dataset_path, chunk_size, done)
+    rows_written = 0
+    chunks_written = 0
+
+    with open(output_path, "ab") as out, open(output_path + ".ckpt", "a", encoding="utf-8") as ckpt, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(metric_names, encoder)) as pool:
+        pending = {}
+
+        def submit_next() -> bool:
+            try:
+                chunk_id, chunk = next(chunks)
+            except StopIteration:
+                return False
+            pending[pool.submit(_evaluate_chunk, chunk, metric_names)] = chunk_id
+            return True
+
+        # Keep a couple of chunks queued per worker without reading the whole dataset into memory.
+        for _ in range(2 * workers):
+            if not submit_next():
+                break
+
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                chunk_id = pending.pop(future)
+                records = future.result()
+                out.write("".join(json.dumps(r) + "\n" for r in records).encode("utf-8"))
+                out.flush()
+                os.fsync(out.fileno())
+                ckpt.write(json.dumps({"chunk": chunk_id, "offset": out.tell()}) + "\n")
+                ckpt.flush()
+                rows_written += len(records)
+                chunks_written += 1
+                print(f"chunk {chunk_id}: {len(records)} rows ({rows_written} this run)", file=sys.stderr)
+                submit_next()
+
+    return {"chunks": chunks_written, "rows": rows_written, "resumed_chunks": len(done)}
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run RAG evaluation metrics over a JSONL dataset.")
+    parser.add_argument("dataset", help="JSONL file of {query, documents, generation} rows.")
+    parser.add_argument("output", help="Append-only JSONL results file; rerun to resume.")
+    parser.add_argument("--metrics", default="", help="Comma-separated metric names (default: all).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (default: CPU count).")
+    parser.add_argument("--encoder", default=os.environ.get("RAG_EVAL_ENCODER", "sentence-transformers"),
+                        help="Encoder backend: sentence-transformers (default) or hashing (fast screening).")
+    parser.add_argument("--chunk-size", type=int, default=256, help="Rows per shard (default: 256).")
+    args = parser.parse_args(argv)
+
+    try:
+        metric_names = parse_metrics(args.metrics)
+    except ValueError as e:
+        parser.error(str(e))
+
+    summary = run(args.dataset, args.output, metric_names, max(args.workers, 1), max(args.chunk_size, 1), args.encoder)
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,48 @@
 from typing import Dict, List
-from sentence_transformers import SentenceTransformer, util
-import re
 
-embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
+import numpy as np
 
-def simple_tokenize(text: str):
+from embeddings import MINILM, cos_sim, encode
+from metrics import observe_items
+from profiling import profiled, stage
+from responses import column, is_full, pair_columns, rounded, shaped
+from tokenizer import token_ids, words
+
+def parse_outputs(outputs: str) -> List[str]:
     """
-    Tokenize text into lowercase word tokens using regex.
+    Parse the generated outputs from a string format to a list of strings.
 
     Args:
-        text (str): Input string.
+        outputs (str): Raw string containing outputs, separated by newlines or paragraphs.
 
     Returns:
-        List[str]: List of tokens.
+        List[str]: List of cleaned output strings.
     """
-    return re.findall(r"\b\w+\b", text.lower())
+    with stage("parse_generations"):
+        lines = [line.strip() for line in outputs.strip().splitlines() if line.strip()]
+        output_list = lines if lines else [outputs.strip()] if outputs.strip() else []
+    observe_items(len(output_list))
+    return output_list
 
-def parse_outputs(outputs: str) -> List[str]:
+def repeated_trigrams(tokens: np.ndarray) -> List[str]:
     """
-    Parse the generated outputs from a string format to a list of strings.
+    Find word trigrams that occur more than once in a token id array.
 
     Args:
-        outputs (str): Raw string containing outputs, separated by newlines or paragraphs.
+        tokens (np.ndarray): Token ids from `tokenizer.token_ids`.
 
     Returns:
-        List[str]: List of cleaned output strings.
+        List[str]: Each repeated trigram as a space-joined phrase, in order of first occurrence.
     """
-    lines = [line.strip() for line in outputs.strip().splitlines() if line.strip()]
-    return lines if lines else [outputs.strip()] if outputs.strip() else []
-
+    if len(tokens) < 4:
+        return []
+    trigrams = np.stack([tokens[:-2], tokens[1:-1], tokens[2:]], axis=1)
+    unique, first, counts = np.unique(trigrams, axis=0, return_index=True, return_counts=True)
+    repeated = unique[counts > 1][np.argsort(first[counts > 1])]
+    return [" ".join(words(trigram)) for trigram in repeated]
+
+@profiled
+@shaped
 def repetition_checker(_, generations: str) -> Dict:
     """
     Detects repetitive phrases or n-grams in generated text outputs.
@@ -38,28 +52,35 @@ def repetition_checker(_, generations: str) -> Dict:
         generations (str): A string of generated outputs, separated by newlines or paragraphs.
 
     Returns:
-        Dict: A report on detected repetitions per generation.
+        Dict: A report on detected repetitions per generation. In compact and binary formats,
+              'repeated_phrases' lists each generation's repeated trigrams, in input order.
     """
     output_list = parse_outputs(generations)
     repetition_report = []
 
-    for output in output_list:
-        tokens = simple_tokenize(output)
-        repeated = set()
-        for i in range(len(tokens) - 2):
-            trigram = " ".join(tokens[i:i+3])
-            if tokens.count(trigram) > 1:
-                repeated.add(trigram)
-        repetition_report.append({
-            "output": output,
-            "repeated_phrases": list(repeated) if repeated else "None"
-        })
+    with stage("tokenize"):
+        token_lists = [token_ids(output) for output in output_list]
 
+    with stage("postprocess"):
+        for output, tokens in zip(output_list, token_lists):
+            repeated = repeated_trigrams(tokens)
+            repetition_report.append({
+                "output": output,
+                "repeated_phrases": repeated if repeated else "None"
+            })
+
+    if not is_full():
+        return {
+            "tool": "Repetition Checker",
+            "repeated_phrases": [[] if r["repeated_phrases"] == "None" else r["repeated_phrases"] for r in repetition_report],
+        }
     return {
         "tool": "Repetition Checker",
         "results": repetition_report
     }
 
+@profiled
+@shaped
 def semantic_diversity_checker(_, generations: str) -> Dict:
     """
     Measures how semantically diverse the generated outputs are using cosine similarity.
@@ -69,30 +90,42 @@ def semantic_diversity_checker(_, generations: str) -> Dict:
         generations (str): A string of generated outputs, separated by newlines or paragraphs.
 
     Returns:
-        Dict: A report showing pairwise similarities and average similarity.
+        Dict: A report showing pairwise similarities and average similarity. In compact and binary
+              formats, 'pairs' columns of generation indices (i < j) replace 'pairwise_scores'.
     """
     output_list = parse_outputs(generations)
     if len(output_list) < 2:
         return {"error": "At least two generations are needed to measure diversity."}
 
-    emb = embedding_model.encode(output_list, convert_to_tensor=True)
-    sim_matrix = util.cos_sim(emb, emb)
+    emb = encode(output_list, MINILM)
+    sim_matrix = cos_sim(emb, emb)
     pairwise = []
     sim_sum = 0.0
     count = 0
 
-    for i in range(len(output_list)):
-        for j in range(i + 1, len(output_list)):
-            score = sim_matrix[i][j].item()
-            sim_sum += score
-            count += 1
-            pairwise.append({
-                "output_i": output_list[i],
-                "output_j": output_list[j],
-                "similarity": round(score, 4)
-            })
-
-    avg_sim = round(sim_sum / count, 4) if count else 0.0
+    if not is_full():
+        with stage("postprocess"):
+            rows, cols = np.triu_indices(len(output_list), k=1)
+            scores = sim_matrix[rows, cols]
+            return {
+                "tool": "Semantic Diversity Checker",
+                "average_similarity": rounded(np.mean(scores, dtype=np.float64)),
+                "pairs": pair_columns(rows, cols, scores),
+            }
+
+    with stage("postprocess"):
+        for i in range(len(output_list)):
+            for j in range(i + 1, len(output_list)):
+                score = float(sim_matrix[i][j])
+                sim_sum += score
+                count += 1
+                pairwise.append({
+                    "output_i": output_list[i],
+                    "output_j": output_list[j],
+                    "similarity": rounded(score)
+                })
+
+    avg_sim = rounded(sim_sum / count) if count else 0.0
 
     return {
         "tool": "Semantic Diversity Checker",
@@ -100,6 +133,8 @@ def semantic_diversity_checker(_, generations: str) -> Dict:
         "pairwise_scores": pairwise
     }
 
+@profiled
+@shaped
 def length_consistency_checker(_, generations: str) -> Dict:
     """
     Evaluates the consistency of lengths across multiple generated outputs.
@@ -109,17 +144,29 @@ def length_consistency_checker(_, generations: str) -> Dict:
         generations (str): A string of generated outputs, separated by newlines or paragraphs.
 
     Returns:
-        Dict: Statistics on lengths and list of outlier generations.
+        Dict: Statistics on lengths and list of outlier generations. In compact and binary formats,
+              a 'lengths' column and the 'outliers' indices replace the outlier texts.
     """
     output_list = parse_outputs(generations)
-    lengths = [len(output.split()) for output in output_list]
+    with stage("tokenize"):
+        lengths = [len(token_ids(output)) for output in output_list]
     avg_len = sum(lengths) / len(lengths)
     std_dev = (sum((l - avg_len) ** 2 for l in lengths) / len(lengths)) ** 0.5
 
-    outliers = []
-    for output, length in zip(output_list, lengths):
-        if abs(length - avg_len) > 2 * std_dev:
-            outliers.append({"output": output, "length": length})
+    if not is_full():
+        return {
+            "tool": "Length Consistency Checker",
+            "average_length": round(avg_len, 2),
+            "std_deviation": round(std_dev, 2),
+            "lengths": column(lengths, "int32"),
+            "outliers": column([k for k, length in enumerate(lengths) if abs(length - avg_len) > 2 * std_dev], "int32"),
+        }
+
+    with stage("postprocess"):
+        outliers = []
+        for output, length in zip(output_list, lengths):
+            if abs(length - avg_len) > 2 * std_dev:
+                outliers.append({"output": output, "length": length})
 
     return {
         "tool": "Length Consistency Checker",
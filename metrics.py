@@ -0,0 +1,314 @@
+"""
+Lightweight in-process metrics with a Prometheus text-format endpoint.
+
+Tools are wrapped with `instrument`, which records request counts, latency and input
+size under the tool's name. While a tool runs its name is held in a context variable,
+so deeper layers (document parsing, the encoder) can attribute their own measurements
+to it with `observe_items` and `observe_encode` without being passed the tool name.
+
+Recording is a lock, a dict lookup and a bucket bisect per observation, cheap enough to
+leave on under load. The process' peak memory and result-cache ratios are read at scrape time.
+"""
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Tuple
+import contextvars
+import functools
+import inspect
+import resource
+import sys
+import threading
+import time
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 100000)
+CHAR_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+# name -> (type, help, buckets)
+_DEFINITIONS: Dict[str, Tuple[str, str, Tuple]] = {
+    "rag_eval_tool_requests_total": ("counter", "Tool calls by outcome: ok, error, timeout or exception.", ()),
+    "rag_eval_tool_latency_seconds": ("histogram", "Time spent executing a tool call.", LATENCY_BUCKETS),
+    "rag_eval_tool_queue_seconds": ("histogram", "Time a tool call waited for a concurrency slot.", LATENCY_BUCKETS),
+    "rag_eval_tool_input_chars": ("histogram", "Characters of text input per tool call.", CHAR_BUCKETS),
+    "rag_eval_tool_input_items": ("histogram", "Documents or generations parsed per tool call.", SIZE_BUCKETS),
+    "rag_eval_encode_batch_size": ("histogram", "Texts per encoder forward pass.", SIZE_BUCKETS),
+    "rag_eval_encode_seconds": ("histogram", "Encoder forward-pass time.", LATENCY_BUCKETS),
+    "rag_eval_startup_seconds": ("gauge", "Duration of each server startup phase.", ()),
+    "rag_eval_monitor_records_total": ("counter", "Monitored trace records (and metric evaluations) by outcome.", ()),
+}
+
+_lock = threading.Lock()
+_counters: Dict[Tuple, float] = {}
+_gauges: Dict[Tuple, float] = {}
+_histograms: Dict[Tuple, list] = {}  # key -> [bucket counts..., +Inf count, sum]
+
+current_tool = contextvars.ContextVar("current_tool", default=None)
+
+
+def _key(name: str, labels: Dict[str, str]) -> Tuple:
+    return (name,) + tuple(sorted(labels.items()))
+
+
+def inc(name: str, labels: Dict[str, str], value: float = 1.0) -> None:
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0.0) + value
+
+
+def set_max(name: str, labels: Dict[str, str], value: float) -> None:
+    key = _key(name, labels)
+    with _lock:
+        if value > _gauges.get(key, float("-inf")):
+            _gauges[key] = value
+
+
+def observe(name: str, labels: Dict[str, str], value: float) -> None:
+    buckets = _DEFINITIONS[name][2]
+    key = _key(name, labels)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+        hist[bisect_left(buckets, value)] += 1
+        hist[-1] += value
+
+
+def snapshot() -> Dict[str, Dict]:
+    """A copy of every recorded series, to diff against with `changes`."""
+    with _lock:
+        return {"counters": dict(_counters), "gauges": dict(_gauges),
+                "histograms": {key: list(hist) for key, hist in _histograms.items()}}
+
+
+def changes(before: Dict[str, Dict]) -> Dict[str, Dict]:
+    """What was recorded since `before` (from `snapshot`), in the form `merge` takes."""
+    after = snapshot()
+    counters = {key: value - before["counters"].get(key, 0.0)
+                for key, value in after["counters"].items() if value != before["counters"].get(key)}
+    gauges = {key: value for key, value in after["gauges"].items() if value != before["gauges"].get(key)}
+    histograms = {}
+    for key, hist in after["histograms"].items():
+        old = before["histograms"].get(key)
+        if hist != old:
+            histograms[key] = [a - b for a, b in zip(hist, old)] if old else hist
+    return {"counters": counters, "gauges": gauges, "histograms": histograms}
+
+
+def merge(delta: Dict[str, Dict]) -> None:
+    """Add series recorded in another process (see `changes`) to this process' series."""
+    with _lock:
+        for key, value in delta["counters"].items():
+            _counters[key] = _counters.get(key, 0.0) + value
+        for key, value in delta["gauges"].items():
+            _gauges[key] = max(value, _gauges.get(key, float("-inf")))
+        for key, hist in delta["histograms"].items():
+            mine = _histograms.get(key)
+            _histograms[key] = [a + b for a, b in zip(mine, hist)] if mine else list(hist)
+
+
+def max_rss_bytes() -> int:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def observe_items(count: int) -> None:
+    """Record how many documents/generations the running tool parsed."""
+    tool = current_tool.get()
+    if tool is not None:
+        observe("rag_eval_tool_input_items", {"tool": tool}, count)
+
+
+def observe_encode(model_name: str, batch_size: int, seconds: float) -> None:
+    """Record one encoder forward pass for the running tool."""
+    labels = {"tool": current_tool.get() or "none", "model": model_name}
+    observe("rag_eval_encode_batch_size", labels, batch_size)
+    observe("rag_eval_encode_seconds", labels, seconds)
+
+
+def _status(result) -> str:
+    # Deadline and cancellation responses carry 'truncated', with or without an error.
+    if isinstance(result, dict):
+        if result.get("truncated"):
+            return "timeout"
+        if "error" in result:
+            return "error"
+    return "ok"
+
+
+def _input_chars(args, kwargs) -> int:
+    return sum(len(v) for v in list(args) + list(kwargs.values()) if isinstance(v, str))
+
+
+def instrument(tool_name: str, fn: Callable) -> Callable:
+    """
+    Record request count, latency and input size for every call of a tool.
+
+    Memory is not broken down per tool: the process-wide peak RSS cannot be attributed to
+    one of several concurrent calls, so it is exported once, as rag_eval_process_max_rss_bytes.
+
+    Calls are counted by status: "ok", "error" (an error response), "timeout" (cut short
+    by its deadline or cancelled, see `deadlines`) or "exception" (raised).
+
+    Args:
+        tool_name (str): Label used for the tool's series.
+        fn (Callable): The tool function, plain or generator.
+
+    Returns:
+        Callable: The wrapped tool with the same signature.
+    """
+    labels = {"tool": tool_name}
+
+    def record(seconds: float, status: str) -> None:
+        observe("rag_eval_tool_latency_seconds", labels, seconds)
+        inc("rag_eval_tool_requests_total", {"tool": tool_name, "status": status})
+
+    if inspect.isgeneratorfunction(fn):
+        @functools.wraps(fn)
+        def stream_wrapper(*args, **kwargs):
+            observe("rag_eval_tool_input_chars", labels, _input_chars(args, kwargs))
+            updates = fn(*args, **kwargs)
+            busy = 0.0
+            status = "ok"
+            try:
+                while True:
+                    # Only time spent producing updates counts, not time the client takes to read them.
+                    started = time.perf_counter()
+                    token = current_tool.set(tool_name)
+                    try:
+                        update = next(updates)
+                    except StopIteration:
+                        break
+                    except Exception:
+                        status = "exception"
+                        raise
+                    finally:
+                        current_tool.reset(token)
+                        busy += time.perf_counter() - started
+                    update_status = _status(update)
+                    if update_status != "ok":
+                        status = update_status
+                    yield update
+            finally:
+                updates.close()
+                record(busy, status)
+
+        return stream_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        observe("rag_eval_tool_input_chars", labels, _input_chars(args, kwargs))
+        started = time.perf_counter()
+        token = current_tool.set(tool_name)
+        status = "exception"
+        try:
+            result = fn(*args, **kwargs)
+            status = _status(result)
+            return result
+        finally:
+            current_tool.reset(token)
+            record(time.perf_counter() - started, status)
+
+    return wrapper
+
+
+def _format_labels(labels: Tuple, extra: str = "") -> str:
+    parts = [f'{k}="{str(v)}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _cache_lines() -> list:
+    from result_cache import default_cache
+
+    lines = [
+        "# HELP rag_eval_cache_events_total Result-cache lookups by outcome.",
+        "# TYPE rag_eval_cache_events_total counter",
+    ]
+    stats = default_cache.stats()
+    for tool, counts in sorted(stats["tools"].items()):
+        for event in ("hits", "misses", "coalesced", "bypassed", "evictions", "expirations"):
+            lines.append(f'rag_eval_cache_events_total{{tool="{tool}",event="{event}"}} {counts[event]}')
+    lines += [
+        "# HELP rag_eval_cache_hit_ratio Share of cached lookups answered without computing.",
+        "# TYPE rag_eval_cache_hit_ratio gauge",
+    ]
+    for tool, counts in sorted(stats["tools"].items()):
+        lines.append(f'rag_eval_cache_hit_ratio{{tool="{tool}"}} {counts["hit_rate"]}')
+    lines += [
+        "# HELP rag_eval_cache_entries Results currently cached.",
+        "# TYPE rag_eval_cache_entries gauge",
+        f"rag_eval_cache_entries {stats['size']}",
+    ]
+    return lines
+
+
+def render() -> str:
+    """Render every metric in the Prometheus text exposition format."""
+    with _lock:
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+        histograms = {k: list(v) for k, v in _histograms.items()}
+
+    lines = []
+    for name, (kind, help_text, buckets) in _DEFINITIONS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == "counter":
+            series = {k: v for k, v in counters.items() if k[0] == name}
+            for key, value in sorted(series.items()):
+                lines.append(f"{name}{_format_labels(key[1:])} {value}")
+        elif kind == "gauge":
+            series = {k: v for k, v in gauges.items() if k[0] == name}
+            for key, value in sorted(series.items()):
+                lines.append(f"{name}{_format_labels(key[1:])} {value}")
+        else:
+            series = {k: v for k, v in histograms.items() if k[0] == name}
+            for key, hist in sorted(series.items()):
+                cumulative = 0
+                for bound, count in zip(list(buckets) + ["+Inf"], hist[:-1]):
+                    cumulative += count
+                    le = 'le="%s"' % bound
+                    lines.append(f"{name}_bucket{_format_labels(key[1:], le)} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(key[1:])} {hist[-1]}")
+                lines.append(f"{name}_count{_format_labels(key[1:])} {cumulative}")
+
+    lines += [
+        "# HELP rag_eval_process_max_rss_bytes Peak resident set size of the server process.",
+        "# TYPE rag_eval_process_max_rss_bytes gauge",
+        f"rag_eval_process_max_rss_bytes {max_rss_bytes()}",
+    ]
+    lines += _cache_lines()
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # scrapes every few seconds would flood the server log
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """
+    Serve `/metrics` on a background thread.
+
+    Args:
+        port (int): Port to listen on.
+        host (str): Interface to bind.
+
+    Returns:
+        ThreadingHTTPServer: The running server.
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="rag-eval-metrics", daemon=True).start()
+    return server
@@ -0,0 +1,541 @@
+"""
+Continuous monitoring of production RAG traces.
+
+Records of {query, documents, generation} are pushed with `monitor_ingest` or tailed from
+a JSONL trace file (RAG_EVAL_MONITOR_TRACE). A background thread evaluates them in
+batches with `relevance_evaluator`, `hallucination_detector` and `redundancy_checker`
+(through `batch_eval_tools.evaluate_rows`, so each batch encodes every text once). Each
+metric runs on its own sampling rate (RAG_EVAL_MONITOR_SAMPLE), so the cheap relevance
+score can follow all traffic while the sentence-level hallucination check sees a fraction.
+
+Results are kept as aggregates, never as rows. Per time window (RAG_EVAL_MONITOR_WINDOW_S,
+the last RAG_EVAL_MONITOR_WINDOWS of them) and metric: count, sum, min, max and a
+`QuantileSketch`. `monitor_stats` merges the windows of the requested span.
+
+Backpressure: records wait in a queue of RAG_EVAL_MONITOR_QUEUE entries. When the
+evaluator falls behind and the queue is full, pushed records are rejected (the response
+says how many, with `retry` set) and the file tailer stops reading until there is room,
+so its lag shows up as unread bytes instead of memory.
+"""
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import json
+import logging
+import math
+import os
+import queue
+import random
+import threading
+import time
+
+from batch_eval_tools import METRICS, evaluate_rows, parse_record, summary_values
+from metrics import inc
+
+MONITOR_METRICS = ("relevance_evaluator", "hallucination_detector", "redundancy_checker")
+TRACE_PATH = os.environ.get("RAG_EVAL_MONITOR_TRACE", "")
+QUEUE_SIZE = int(os.environ.get("RAG_EVAL_MONITOR_QUEUE", "10000"))
+BATCH_SIZE = int(os.environ.get("RAG_EVAL_MONITOR_BATCH", "64"))
+WINDOW_S = float(os.environ.get("RAG_EVAL_MONITOR_WINDOW_S", "60"))
+WINDOWS = int(os.environ.get("RAG_EVAL_MONITOR_WINDOWS", "60"))
+
+_log = logging.getLogger(__name__)
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """
+    Parse "metric=rate,..." into sampling rates for `MONITOR_METRICS`; metrics not listed are sampled fully.
+
+    Raises:
+        ValueError: On an unknown metric or a rate outside [0, 1].
+    """
+    rates = {name: 1.0 for name in MONITOR_METRICS}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, rate = item.partition("=")
+        name = name.strip()
+        if name not in rates:
+            raise ValueError(f"Unknown monitored metric: {name}. Available: {', '.join(MONITOR_METRICS)}")
+        rates[name] = float(rate)
+        if not 0.0 <= rates[name] <= 1.0:
+            raise ValueError(f"Sampling rate of {name} must be between 0 and 1.")
+    return rates
+
+
+SAMPLE_RATES = parse_sample_rates(
+    os.environ.get("RAG_EVAL_MONITOR_SAMPLE", "relevance_evaluator=1,hallucination_detector=0.1,redundancy_checker=0.1")
+)
+
+
+class QuantileSketch:
+    """
+    Quantiles of a stream in bounded memory, with relative error (DDSketch-style log buckets).
+
+    A value v is counted in bucket ceil(log_gamma |v|), gamma = (1 + a) / (1 - a), separately
+    for positive and negative values; values closer to zero than `min_value` share one bucket.
+    Every quantile is then within a relative `relative_accuracy` of a true sample value, the
+    number of buckets grows only with log(max / min_value), and sketches merge by adding counts.
+
+    Args:
+        relative_accuracy (float): Relative error bound a of reported quantiles.
+        min_value (float): Magnitude below which values are treated as zero.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-4):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.positive: Dict[int, int] = {}
+        self.negative: Dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        if abs(value) < self.min_value:
+            self.zeros += 1
+            return
+        key = math.ceil(math.log(abs(value)) / self._log_gamma)
+        buckets = self.positive if value > 0 else self.negative
+        buckets[key] = buckets.get(key, 0) + 1
+
+    def merge(self, other: "QuantileSketch") -> None:
+        for mine, theirs in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, n in theirs.items():
+                mine[key] = mine.get(key, 0) + n
+        self.zeros += other.zeros
+        self.count += other.count
+
+    def _value(self, key: int) -> float:
+        # Midpoint of the bucket (gamma^(key-1), gamma^key], relative error at most a.
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """The q-quantile (0 <= q <= 1) of the values added, or None if there are none."""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        # Ascending order: negatives by descending magnitude, zeros, positives by ascending magnitude.
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._value(key)
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self.positive)) if self.positive else 0.0
+
+
+class _Stat:
+    """Count, sum, min, max and quantile sketch of one metric's summary values."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sketch = QuantileSketch()
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.sketch.add(value)
+
+    def merge(self, other: "_Stat") -> None:
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.sketch.merge(other.sketch)
+
+    def report(self) -> Dict:
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 4),
+            "min": round(self.min, 4),
+            "max": round(self.max, 4),
+            # Bucket midpoints can fall outside the observed range; the exact min and max bound them.
+            **{f"p{int(q * 100)}": round(min(max(self.sketch.quantile(q), self.min), self.max), 4)
+               for q in (0.5, 0.9, 0.99)},
+        }
+
+
+class Monitor:
+    """
+    Samples, evaluates and aggregates trace records in a background thread.
+
+    Args:
+        metrics (Tuple[str, ...]): Batch-evaluator metrics to run.
+        sample_rates (Dict[str, float]): Fraction of records each metric evaluates.
+        queue_size (int): Records that may wait for evaluation before ingestion pushes back.
+        batch_size (int): Records evaluated together.
+        window_s (float): Width of one aggregation window in seconds.
+        windows (int): Number of windows kept.
+    """
+
+    def __init__(self, metrics: Tuple[str, ...] = MONITOR_METRICS, sample_rates: Optional[Dict[str, float]] = None,
+                 queue_size: int = QUEUE_SIZE, batch_size: int = BATCH_SIZE, window_s: float = WINDOW_S,
+                 windows: int = WINDOWS):
+        self.metrics = tuple(metrics)
+        self.sample_rates = {name: (sample_rates or SAMPLE_RATES).get(name, 1.0) for name in self.metrics}
+        self.batch_size = batch_size
+        self.window_s = window_s
+        self.windows = windows
+        self._queue: "queue.Queue[Tuple[float, float, Dict, Tuple[str, ...]]]" = queue.Queue(queue_size)
+        self._windows: "OrderedDict[float, Dict[str, _Stat]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._random = random.Random()
+        self.counts = {name: 0 for name in ("received", "accepted", "rejected", "unsampled", "invalid", "late",
+                                            "future", "evaluated", "failed")}
+        self._thread: Optional[threading.Thread] = None
+        self._tail: Optional[Dict] = None
+
+    def _count(self, outcome: str, n: int = 1) -> None:
+        if n:
+            with self._lock:
+                self.counts[outcome] += n
+            inc("rag_eval_monitor_records_total", {"outcome": outcome}, n)
+
+    def start(self) -> "Monitor":
+        """Start the evaluator thread (once); returns self."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="rag-eval-monitor", daemon=True)
+                self._thread.start()
+        return self
+
+    def _admit(self, record):
+        # The queue item (timestamp, enqueued at, row, sampled metrics), or why the record is dropped.
+        if not isinstance(record, dict):
+            return "invalid"
+        now = time.time()
+        timestamp = record.get("timestamp")
+        timestamp = float(timestamp) if isinstance(timestamp, (int, float)) else now
+        if not math.isfinite(timestamp):
+            return "invalid"
+        if timestamp < now - self.window_s * self.windows:
+            return "late"
+        if timestamp > now + self.window_s:
+            # Usually epoch milliseconds: it would sit in a window that is never evicted.
+            return "future"
+        try:
+            row = parse_record(record)
+        except ValueError:
+            return "invalid"
+        sampled = tuple(name for name in self.metrics if self._random.random() < self.sample_rates[name])
+        if not sampled:
+            return "unsampled"
+        return timestamp, time.monotonic(), row, sampled
+
+    @property
+    def backlog(self) -> int:
+        """Records waiting for evaluation."""
+        return self._queue.qsize()
+
+    def push(self, records: List) -> Dict:
+        """
+        Queue records without blocking; once the queue is full the remaining records are rejected.
+
+        Returns:
+            Dict: 'accepted' (queued for evaluation), 'unsampled', 'invalid', 'late' and 'future'
+            (dropped by design) and 'rejected' (the last records of the batch, to be retried).
+        """
+        outcomes = {"accepted": 0, "rejected": 0, "unsampled": 0, "invalid": 0, "late": 0, "future": 0}
+        for i, record in enumerate(records):
+            item = self._admit(record)
+            if isinstance(item, str):
+                outcomes[item] += 1
+                continue
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                outcomes["rejected"] = len(records) - i
+                break
+            outcomes["accepted"] += 1
+        self._count("received", len(records))
+        for outcome, n in outcomes.items():
+            self._count(outcome, n)
+        return outcomes
+
+    def offer(self, record, timeout: Optional[float] = None) -> bool:
+        """Queue one record, waiting for room up to `timeout` seconds (None: as long as it takes)."""
+        self._count("received")
+        item = self._admit(record)
+        if isinstance(item, str):
+            self._count(item)
+            return True
+        try:
+            self._queue.put(item, timeout=timeout)
+        except queue.Full:
+            self._count("rejected")
+            return False
+        self._count("accepted")
+        return True
+
+    def tail(self, path: str, from_start: bool = False, poll_s: float = 0.5) -> "Monitor":
+        """
+        Follow a JSONL trace file in a background thread, like `tail -F`.
+
+        New lines are read as they are appended; a truncated or replaced (rotated) file is
+        read again from its start. Reading pauses while the evaluation queue is full. If the
+        file cannot be opened or read, the error is logged and reported in `stats` and the
+        read is retried with exponential backoff (up to 30 s).
+
+        Args:
+            path (str): The trace file.
+            from_start (bool): Read the existing contents too, instead of only new lines.
+            poll_s (float): Seconds between checks for new data.
+        """
+        self._tail = {"path": path, "offset": 0, "size": 0}
+        thread = threading.Thread(target=self._follow, args=(path, from_start, poll_s),
+                                  name="rag-eval-monitor-tail", daemon=True)
+        thread.start()
+        return self
+
+    def _follow(self, path: str, from_start: bool, poll_s: float) -> None:
+        f, inode, pending = None, None, b""
+        retry_s = poll_s
+        while True:
+            try:
+                stat = os.stat(path)
+                if f is None or stat.st_ino != inode or stat.st_size < f.tell():
+                    if f is not None:
+                        f.close()
+                    f, inode, pending = None, None, b""
+                    f, inode = open(path, "rb"), stat.st_ino
+                    if not from_start and self._tail["offset"] == 0:
+                        f.seek(0, os.SEEK_END)
+                    from_start = True  # a rotated file is new traffic: read all of it
+                chunk = f.read(1 << 20)
+            except FileNotFoundError:
+                time.sleep(poll_s)  # not created yet, or mid-rotation
+                continue
+            except OSError as e:
+                # Permissions, a network mount going away...: keep the tailer alive and retry, backing off.
+                error = f"{type(e).__name__}: {e}"
+                if self._tail.get("error") != error:
+                    _log.warning("Cannot read trace file %s (%s); retrying.", path, error)
+                self._tail["error"] = error
+                time.sleep(retry_s)
+                retry_s = min(retry_s * 2, max(poll_s, 30.0))
+                continue
+            if "error" in self._tail:
+                _log.warning("Reading trace file %s again.", path)
+                del self._tail["error"]
+                retry_s = poll_s
+            self._tail.update(offset=f.tell(), size=stat.st_size)
+            if not chunk:
+                time.sleep(poll_s)
+                continue
+            *lines, pending = (pending + chunk).split(b"\n")
+            for line in lines:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None  # counted as invalid
+                self.offer(record)
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._evaluate(batch)
+            except Exception:  # counted; the monitor must outlive a bad batch
+                self._count("failed", len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    @staticmethod
+    def _evaluate_rows(rows: List[Dict], name: str) -> List[Dict]:
+        try:
+            return evaluate_rows(rows, [name])
+        except Exception:
+            # One bad record must not cost the rest of the batch: retry them one at a time.
+            results = []
+            for row in rows:
+                try:
+                    results.extend(evaluate_rows([row], [name]))
+                except Exception as e:
+                    results.append({name: {"error": f"{type(e).__name__}: {e}"}})
+            return results
+
+    def _evaluate(self, batch: List[Tuple[float, float, Dict, Tuple[str, ...]]]) -> None:
+        evaluated = failed = 0
+        for name in self.metrics:
+            items = [item for item in batch if name in item[3]]
+            if not items:
+                continue
+            results = self._evaluate_rows([row for _, _, row, _ in items], name)
+            _, values = summary_values(results, [name])[name]
+            with self._lock:
+                for (timestamp, _, _, _), value in zip(items, values):
+                    if value is None:
+                        failed += 1
+                        continue
+                    start = timestamp - timestamp % self.window_s
+                    window = self._windows.get(start)
+                    if window is None:
+                        out_of_order = bool(self._windows) and start < next(reversed(self._windows))
+                        window = self._windows[start] = {}
+                        if out_of_order:
+                            # A record older than the newest window: keep the windows in time order.
+                            self._windows = OrderedDict(sorted(self._windows.items()))
+                        while len(self._windows) > self.windows:
+                            # Evict the oldest window other than this one, even when this record is the oldest.
+                            del self._windows[next(key for key in self._windows if key != start)]
+                    window.setdefault(name, _Stat()).add(value)
+                    evaluated += 1
+        self._count("evaluated", evaluated)
+        self._count("failed", failed)
+
+    def wait_idle(self, timeout: float = 30.0) -> bool:
+        """Block until every queued record has been evaluated; True unless `timeout` passed first."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stats(self, window_s: float = 300.0) -> Dict:
+        """
+        Aggregates over the last `window_s` seconds (whole windows), with ingestion counters.
+
+        Returns:
+            Dict: 'metrics' (per metric: its summary name, count, mean, min, max, p50, p90, p99),
+            'series' (per window start: count and mean per metric), 'ingestion' counters with the
+            current 'backlog' and its 'lag_s', the 'sample_rates' and the 'tail' position if a file is followed
+            (with the read 'error' while it cannot be read).
+        """
+        since = time.time() - window_s
+        with self._lock:
+            windows = [(start, window) for start, window in self._windows.items() if start + self.window_s > since]
+            totals = {name: _Stat() for name in self.metrics}
+            for _, window in windows:
+                for name, stat in window.items():
+                    totals[name].merge(stat)
+            series = {
+                "start": [start for start, _ in windows],
+                **{name: {"count": [w[name].count if name in w else 0 for _, w in windows],
+                          "mean": [round(w[name].total / w[name].count, 4) if name in w else None for _, w in windows]}
+                   for name in self.metrics},
+            }
+            counts = dict(self.counts)
+        with self._queue.mutex:
+            oldest = self._queue.queue[0][1] if self._queue.queue else None
+        ingestion = {
+            **counts,
+            "backlog": self.backlog,
+            "capacity": self._queue.maxsize,
+            "lag_s": round(time.monotonic() - oldest, 3) if oldest is not None else 0.0,
+        }
+        tail = None
+        if self._tail is not None:
+            tail = {**self._tail, "lag_bytes": max(self._tail["size"] - self._tail["offset"], 0)}
+        return {
+            "window_s": window_s,
+            "metrics": {name: {"summary": METRICS[name]["summary"][0], **totals[name].report()} for name in self.metrics},
+            "series": series,
+            "ingestion": ingestion,
+            "sample_rates": dict(self.sample_rates),
+            "tail": tail,
+        }
+
+
+_default: Optional[Monitor] = None
+_default_lock = threading.Lock()
+
+
+def default_monitor() -> Monitor:
+    """The process-wide monitor, started on first use."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = Monitor().start()
+        return _default
+
+
+def start() -> Optional[Monitor]:
+    """Start tailing RAG_EVAL_MONITOR_TRACE if it is set; returns the monitor, or None."""
+    if not TRACE_PATH:
+        return None
+    return default_monitor().tail(TRACE_PATH)
+
+
+def monitor_ingest(records: str) -> Dict:
+    """
+    Push a batch of production trace records for continuous monitoring.
+
+    Records are sampled per metric and evaluated in the background; `monitor_stats`
+    reports the aggregates.
+
+    Args:
+        records (str): JSONL, or a JSON list, of {"query": ..., "documents": ..., "generation": ...}
+                       objects, optionally with a "timestamp" in epoch seconds (default: now).
+
+    Returns:
+        Dict: A dictionary containing:
+            - 'tool': The name of the tool ("Monitor Ingest").
+            - 'accepted': Records queued for evaluation.
+            - 'unsampled', 'invalid', 'late', 'future': Records dropped by sampling, as malformed,
+              as older than the retained windows, or as timestamped more than one window ahead
+              (e.g. in milliseconds).
+            - 'rejected': Records refused because the evaluator is behind; these are the last
+              records of the batch, and 'retry' is set when there are any.
+            - 'backlog': Records waiting for evaluation.
+    """
+    text = records.strip()
+    try:
+        if text.startswith("["):
+            parsed = json.loads(text)
+        else:
+            parsed = [json.loads(line) for line in text.splitlines() if line.strip()]
+    except ValueError as e:
+        return {"error": f"Records must be JSONL or a JSON list: {e}"}
+    if not isinstance(parsed, list) or not parsed:
+        return {"error": "No records provided."}
+    monitor = default_monitor()
+    outcomes = monitor.push(parsed)
+    response = {"tool": "Monitor Ingest", **outcomes, "backlog": monitor.backlog}
+    if outcomes["rejected"]:
+        response["retry"] = True
+    return response
+
+
+def monitor_stats(window_s: float = 300.0) -> Dict:
+    """
+    Report rolling relevance, hallucination and redundancy aggregates over monitored traffic.
+
+    Args:
+        window_s (float): How many recent seconds to aggregate (rounded to whole windows).
+
+    Returns:
+        Dict: A dictionary containing:
+            - 'tool': The name of the tool ("Monitor Stats").
+            - 'metrics': Per metric, its summary value's count, mean, min, max and p50/p90/p99
+              (quantiles from a sketch, within 1% relative error).
+            - 'series': Per window start (epoch seconds), the count and mean of every metric.
+            - 'ingestion': Records received, accepted, rejected (backpressure), dropped and
+              evaluated, plus the current 'backlog' and the age of its oldest record ('lag_s').
+            - 'sample_rates': Fraction of records each metric evaluates.
+            - 'tail': Position in the followed trace file and unread 'lag_bytes' (and the 'error'
+              while the file cannot be read), or None.
+    """
+    if window_s <= 0:
+        return {"error": "window_s must be positive."}
+    return {"tool": "Monitor Stats", **default_monitor().stats(window_s)}
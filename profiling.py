@@ -0,0 +1,163 @@
+"""
+Opt-in, per-call stage timings for tool responses.
+
+Tools decorated with `profiled` accept `profile` and `profile_top_n` arguments. With
+`profile=True` the response gains a 'timings' section: milliseconds spent in each stage
+(parse_documents, tokenize, encode, similarity, postprocess, ...), encoder memo hits and
+misses, and the size of the serialized response. `profile_top_n=N` also attaches the
+top N functions of a cProfile run by cumulative time.
+
+Stages are marked in the code with `with stage("encode"):`. Outside a profiled call that
+is a context-variable lookup returning a shared no-op context manager.
+"""
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict
+import contextvars
+import cProfile
+import functools
+import inspect
+import io
+import json
+import pstats
+import time
+
+from signatures import add_parameters, split_options
+
+_session = contextvars.ContextVar("profile_session", default=None)
+_NOOP = nullcontext()
+
+PROFILE_PARAMS = [
+    inspect.Parameter("profile", inspect.Parameter.POSITIONAL_OR_KEYWORD, default=False, annotation=bool),
+    inspect.Parameter("profile_top_n", inspect.Parameter.POSITIONAL_OR_KEYWORD, default=0, annotation=int),
+]
+
+
+@contextmanager
+def _timed(session: Dict, name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages = session["stages"]
+        stages[name] = stages.get(name, 0.0) + (time.perf_counter() - started)
+
+
+def stage(name: str):
+    """
+    Time the enclosed block as stage `name` of the current profiled call.
+
+    Repeated entries of the same stage accumulate.
+    """
+    session = _session.get()
+    if session is None:
+        return _NOOP
+    return _timed(session, name)
+
+
+def count(name: str, n: int = 1) -> None:
+    """Add `n` to counter `name` of the current profiled call (e.g. encoder memo hits)."""
+    session = _session.get()
+    if session is not None:
+        session["counts"][name] = session["counts"].get(name, 0) + n
+
+
+def _new_session() -> Dict:
+    return {"stages": {}, "counts": {}, "busy": 0.0}
+
+
+def _timings(session: Dict, result) -> Dict:
+    timings = {
+        "total_ms": round(session["busy"] * 1000, 3),
+        "stages_ms": {name: round(seconds * 1000, 3) for name, seconds in session["stages"].items()},
+        "counts": dict(session["counts"]),
+    }
+    started = time.perf_counter()
+    timings["serialization_bytes"] = len(json.dumps(result, default=str).encode("utf-8"))
+    timings["serialization_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return timings
+
+
+def _top_functions(profiler: cProfile.Profile, top_n: int) -> str:
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(top_n)
+    return out.getvalue()
+
+
+def profiled(fn: Callable) -> Callable:
+    """
+    Add `profile` / `profile_top_n` arguments to a tool and attach 'timings' to its response.
+
+    For streaming tools the timings are attached to the update whose 'progress' is 'done';
+    a stream that ends without one (an error, a deadline) gets a final update holding
+    only 'timings'. Updates are never held back to find out which one is last.
+
+    Args:
+        fn (Callable): The tool function, plain or generator.
+
+    Returns:
+        Callable: The wrapped tool with the extended signature.
+    """
+    sig = add_parameters(fn, PROFILE_PARAMS)
+    options = [p.name for p in PROFILE_PARAMS]
+
+    def run(session: Dict, profiler, call: Callable):
+        token = _session.set(session)
+        if profiler is not None:
+            profiler.enable()
+        started = time.perf_counter()
+        try:
+            return call()
+        finally:
+            session["busy"] += time.perf_counter() - started
+            if profiler is not None:
+                profiler.disable()
+            _session.reset(token)
+
+    def attach(session: Dict, profiler, top_n: int, result):
+        if isinstance(result, dict):
+            result["timings"] = _timings(session, result)
+            if profiler is not None:
+                result["timings"]["cprofile"] = _top_functions(profiler, top_n)
+        return result
+
+    if inspect.isgeneratorfunction(fn):
+        @functools.wraps(fn)
+        def stream_wrapper(*args, **kwargs):
+            call_args, opts = split_options(sig, args, kwargs, options)
+            if not opts["profile"]:
+                yield from fn(**call_args)
+                return
+            top_n = int(opts["profile_top_n"] or 0)
+            session = _new_session()
+            profiler = cProfile.Profile() if top_n > 0 else None
+            updates = fn(**call_args)
+            finished = object()
+            attached = False
+            while True:
+                update = run(session, profiler, lambda: next(updates, finished))
+                if update is finished:
+                    break
+                # Each update goes out as soon as it exists; the timings ride on the final one.
+                if isinstance(update, dict) and (update.get("progress") or {}).get("done"):
+                    update = attach(session, profiler, top_n, update)
+                    attached = True
+                yield update
+            if not attached:
+                yield attach(session, profiler, top_n, {})
+
+        stream_wrapper.__signature__ = sig
+        return stream_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        call_args, opts = split_options(sig, args, kwargs, options)
+        if not opts["profile"]:
+            return fn(**call_args)
+        top_n = int(opts["profile_top_n"] or 0)
+        session = _new_session()
+        profiler = cProfile.Profile() if top_n > 0 else None
+        result = run(session, profiler, lambda: fn(**call_args))
+        return attach(session, profiler, top_n, result)
+
+    wrapper.__signature__ = sig
+    return wrapper
@@ -0,0 +1,228 @@
+"""
+Reduced-precision storage for corpus embeddings.
+
+A `QuantizedMatrix` holds unit-normalized embeddings in one of four precisions:
+
+    float32   4 bytes per dimension, exact (the default)
+    float16   2 bytes per dimension
+    int8      1 byte per dimension, symmetric scalar quantization with one scale per dimension
+    binary    1 bit per dimension: signs of a fixed random projection (SimHash), with
+              similarity estimated from Hamming distance as cos(pi * h / dim)
+
+Queries stay float32 and are scored against the compact codes directly. When an exact
+float32 copy exists on disk, each query's best `rescore_k` candidates are then rescored
+exactly from a memory-mapped view of that file, so only those rows are ever read back.
+
+The precision is RAG_EVAL_EMBEDDING_STORAGE and the number of rescored candidates per
+query RAG_EVAL_RESCORE_K (0 disables rescoring).
+"""
+from typing import Dict, Optional
+import functools
+import os
+
+import numpy as np
+
+from deadlines import check
+from profiling import stage
+
+PRECISIONS = ("float32", "float16", "int8", "binary")
+STORAGE = os.environ.get("RAG_EVAL_EMBEDDING_STORAGE", "float32")
+RESCORE_K = int(os.environ.get("RAG_EVAL_RESCORE_K", "100"))
+
+# Stored rows scored per block, bounding the float32 temporaries of a query batch.
+_BLOCK = 65536
+
+# np.bitwise_count needs NumPy >= 2.0; older versions count bits through a byte table.
+_bitwise_count = getattr(np, "bitwise_count", None)
+_BYTE_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _popcount(words: np.ndarray) -> np.ndarray:
+    """Set bits of uint64 `words`, summed over the last axis, as int32."""
+    if _bitwise_count is not None:
+        return _bitwise_count(words).sum(axis=-1, dtype=np.int32)
+    return _BYTE_POPCOUNT[words.view(np.uint8)].sum(axis=-1, dtype=np.int32)
+
+
+@functools.lru_cache(maxsize=None)
+def _projection(dim: int) -> np.ndarray:
+    # Random hyperplanes for binary codes; fixed per dimension and shared by every matrix.
+    projection = np.random.default_rng(0).standard_normal((dim, dim)).astype(np.float32)
+    projection.flags.writeable = False
+    return projection
+
+
+def normalize(embs: np.ndarray) -> np.ndarray:
+    """Rows scaled to unit length, as float32; rows that already are are returned without a copy."""
+    embs = np.atleast_2d(np.asarray(embs, dtype=np.float32))
+    norms = np.sqrt(np.einsum("ij,ij->i", embs, embs))[:, None]
+    if np.allclose(norms, 1.0, atol=1e-5):
+        # Keeps a read-only memory map of normalized embeddings shared instead of copying it.
+        return embs
+    return embs / np.maximum(norms, 1e-12)
+
+
+class QuantizedMatrix:
+    """
+    Unit-normalized embeddings in compact form, scored against float32 queries.
+
+    Args:
+        embs (np.ndarray): (n, dim) float embeddings; they are normalized before quantizing.
+        precision (str): One of PRECISIONS.
+        exact_path (str): Optional .npy file holding the same embeddings in float32, used for rescoring.
+    """
+
+    def __init__(self, embs: np.ndarray, precision: str = STORAGE, exact_path: str = ""):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown embedding storage {precision!r}; expected one of {', '.join(PRECISIONS)}.")
+        unit = normalize(embs)
+        self.precision = precision
+        self.shape = unit.shape
+        self.exact_path = exact_path
+        self.scale: Optional[np.ndarray] = None
+        self.projection: Optional[np.ndarray] = None
+        self._exact: Optional[np.ndarray] = None
+        if precision == "float32":
+            self.data = unit
+        elif precision == "float16":
+            self.data = unit.astype(np.float16)
+        elif precision == "int8":
+            self.scale = np.maximum(np.abs(unit).max(axis=0, initial=0.0), 1e-12) / 127.0
+            self.data = np.round(unit / self.scale).astype(np.int8)
+        else:
+            # Random hyperplanes make the Hamming distance track the angle even for sparse or skewed embeddings.
+            self.projection = _projection(self.shape[1])
+            self.data = self._sign_codes(unit)
+        self.data.flags.writeable = False
+
+    def _sign_codes(self, unit: np.ndarray) -> np.ndarray:
+        # Bits packed into 64-bit words (zero-padded), so Hamming distance is XOR plus popcount per word.
+        bits = np.packbits(unit @ self.projection > 0, axis=1)
+        padded = np.zeros((len(bits), -(-bits.shape[1] // 8) * 8), dtype=np.uint8)
+        padded[:, :bits.shape[1]] = bits
+        return padded.view(np.uint64)
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes + (self.scale.nbytes if self.scale is not None else 0)
+
+    def dequantize(self) -> np.ndarray:
+        """The stored rows as float32 (approximately unit length)."""
+        if self.precision == "float32":
+            return self.data
+        if self.precision == "float16":
+            return self.data.astype(np.float32)
+        if self.precision == "int8":
+            return self.data.astype(np.float32) * self.scale
+        signs = np.unpackbits(self.data.view(np.uint8), axis=1, count=self.shape[1]).astype(np.float32) * 2 - 1
+        return normalize(signs @ self.projection.T)
+
+    def approximate(self, queries: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """(n_queries, n) cosine similarities computed from the compact codes only, optionally for some `rows`."""
+        q = normalize(queries)
+        data = self.data if rows is None else self.data[rows]
+        scores = np.empty((len(q), len(data)), dtype=np.float32)
+        size = _BLOCK
+        if self.precision == "binary":
+            q_bits = self._sign_codes(q)
+            # The XOR temporary is (queries, block, words per code); keep it around 64 MB.
+            size = max(1, min(_BLOCK, 2 ** 23 // max(len(q) * self.data.shape[1], 1)))
+        elif self.precision == "int8":
+            q = q * self.scale
+        for start in range(0, len(data), size):
+            check()
+            block = data[start:start + size]
+            if self.precision == "binary":
+                hamming = _popcount(q_bits[:, None, :] ^ block[None, :, :])
+                scores[:, start:start + len(block)] = np.cos(np.pi * hamming / self.shape[1])
+            else:
+                scores[:, start:start + len(block)] = q @ block.astype(np.float32, copy=False).T
+        return scores
+
+    def exact(self) -> np.ndarray:
+        """
+        All rows as exact unit-normalized float32, for all-pairs comparisons that rescoring cannot cover.
+
+        Compact storage reads them from the memory-mapped exact copy on disk (without a copy when
+        the file is already normalized); only without one are the codes decoded.
+        """
+        if self.precision == "float32":
+            return self.data
+        if self.exact_path:
+            return normalize(np.load(self.exact_path, mmap_mode="r"))
+        return self.dequantize()
+
+    def exact_rows(self, rows: np.ndarray) -> np.ndarray:
+        """Unit-normalized float32 rows read from the exact copy on disk."""
+        if self._exact is None:
+            self._exact = np.load(self.exact_path, mmap_mode="r")
+        return normalize(self._exact[rows])
+
+    def similarity(self, queries: np.ndarray, rescore_k: int = RESCORE_K) -> np.ndarray:
+        """
+        Cosine similarity of every query to every stored row.
+
+        Args:
+            queries (np.ndarray): A vector or an (n_queries, dim) matrix.
+            rescore_k (int): Per query, how many of the best approximate candidates are rescored
+                exactly from the float32 copy on disk; 0 (or no copy) returns approximate scores.
+
+        Returns:
+            np.ndarray: An (n_queries, n) similarity matrix; exact for float32 storage and for rescored
+            candidates. Other scores stay approximate, capped at the query's lowest rescored score so
+            they never outrank a candidate.
+        """
+        with stage("similarity"):
+            scores = self.approximate(queries)
+            if self.precision == "float32" or not rescore_k or not self.exact_path or not len(self):
+                return scores
+            k = min(rescore_k, len(self))
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            candidates = np.unique(top)
+            exact = normalize(queries) @ self.exact_rows(candidates).T
+            rows = np.arange(len(scores))[:, None]
+            rescored = exact[rows, np.searchsorted(candidates, top)]
+            np.minimum(scores, rescored.min(axis=1, keepdims=True), out=scores)
+            scores[rows, top] = rescored
+            return scores
+
+    def report(self, embs: np.ndarray, sample: int = 64, targets: int = 50000, top_k: int = 10) -> Dict:
+        """
+        Memory saving and score error of this storage against float32 `embs`.
+
+        Up to `sample` stored rows are used as queries against up to `targets` stored rows.
+
+        Returns:
+            Dict: 'precision', 'bytes', 'float32_bytes', 'compression', the mean and max absolute
+            score error of approximate scores, and 'prefilter_recall': the fraction of each sample
+            query's exact top `top_k` found among its `RESCORE_K` best approximate candidates.
+        """
+        n = len(self)
+        float32_bytes = int(n * self.shape[1] * 4)
+        result = {
+            "precision": self.precision,
+            "bytes": int(self.nbytes),
+            "float32_bytes": float32_bytes,
+            "compression": round(float32_bytes / max(self.nbytes, 1), 2),
+        }
+        if not n or self.precision == "float32":
+            return result
+        rng = np.random.default_rng(0)
+        rows = np.sort(rng.choice(n, size=min(targets, n), replace=False))
+        queries = normalize(np.asarray(embs)[rng.choice(rows, size=min(sample, len(rows)), replace=False)])
+        exact = queries @ normalize(np.asarray(embs)[rows]).T
+        approx = self.approximate(queries, rows)
+        error = np.abs(approx - exact)
+        k = min(top_k, len(rows))
+        candidates = min(max(RESCORE_K, k), len(rows))
+        exact_top = np.argpartition(-exact, k - 1, axis=1)[:, :k]
+        approx_top = np.argpartition(-approx, candidates - 1, axis=1)[:, :candidates]
+        found = [len(np.intersect1d(a, b)) for a, b in zip(exact_top, approx_top)]
+        result.update({
+            "score_error": {"mean_abs": round(float(error.mean()), 5), "max_abs": round(float(error.max()), 5)},
+            "prefilter_recall": round(float(np.mean(found)) / k, 4),
+        })
+        return result
@@ -0,0 +1,175 @@
+"""
+Response formats shared by every tool.
+
+Tools decorated with `shaped` accept `response_format` and `precision` arguments:
+
+  - "full" (default): the original responses, which echo each document, generation or
+    sentence next to its score.
+  - "compact": no text echo. Per-input values are columnar arrays in input order, so entry
+    k of every column belongs to input k, and pairs are parallel 'i' / 'j' index columns
+    next to their scores. Response size grows with the number of scores, not with the
+    size of the texts.
+  - "binary": like "compact", but every numeric column is a base64-encoded little-endian
+    array {"dtype", "shape", "data"} for bulk clients. `decode` turns one back into numpy.
+
+`precision` is the number of decimals scores are rounded to, in every format (default 4).
+"""
+from typing import Callable, Dict, Sequence, Tuple, Union
+import base64
+import contextvars
+import functools
+import inspect
+
+import numpy as np
+
+from signatures import add_parameters, split_options
+
+FORMATS = ("full", "compact", "binary")
+DEFAULT_PRECISION = 4
+MAX_PRECISION = 8
+
+RESPONSE_PARAMS = [
+    inspect.Parameter("response_format", inspect.Parameter.POSITIONAL_OR_KEYWORD, default="full", annotation=str),
+    inspect.Parameter("precision", inspect.Parameter.POSITIONAL_OR_KEYWORD, default=DEFAULT_PRECISION, annotation=int),
+]
+
+# (format, precision) of the tool call in progress.
+_options = contextvars.ContextVar("response_options", default=("full", DEFAULT_PRECISION))
+
+
+def current_options() -> Tuple[str, int]:
+    """The (response_format, precision) of the tool call in progress."""
+    return _options.get()
+
+
+def is_full() -> bool:
+    """True if the tool call in progress wants the original, text-echoing response."""
+    return _options.get()[0] == "full"
+
+
+def rounded(value: float) -> float:
+    """Round a score to the precision of the tool call in progress."""
+    return round(float(value), _options.get()[1])
+
+
+def column(values: Union[Sequence, np.ndarray], dtype: str = "float32") -> Union[list, Dict]:
+    """
+    Encode one column of per-input values for a compact or binary response.
+
+    Args:
+        values (Union[Sequence, np.ndarray]): Scores, counts, flags or indices, in input order.
+        dtype (str): numpy dtype of the column ("float32", "int32", "bool", ...). Floating
+                     columns are rounded to the call's precision.
+
+    Returns:
+        Union[list, Dict]: A JSON list, or {"dtype", "shape", "data"} in binary format.
+    """
+    fmt, precision = _options.get()
+    arr = np.asarray(values)
+    floating = np.issubdtype(np.dtype(dtype), np.floating)
+    if floating:
+        arr = np.round(arr.astype(np.float64), precision)
+    if fmt == "binary":
+        arr = arr.astype(np.dtype(dtype).newbyteorder("<"))
+        return {
+            "dtype": arr.dtype.str,
+            "shape": list(arr.shape),
+            "data": base64.b64encode(arr.tobytes()).decode("ascii"),
+        }
+    # JSON keeps the rounded float64 values, so 0.1 prints as 0.1 rather than its float32 neighbour.
+    return arr.tolist() if floating else arr.astype(dtype).tolist()
+
+
+def pair_columns(i: Sequence[int], j: Sequence[int], similarity: Sequence[float]) -> Dict:
+    """
+    Encode pairs of inputs as parallel index columns plus their similarity scores.
+
+    Returns:
+        Dict: {'i': [...], 'j': [...], 'similarity': [...]}; pair k is (i[k], j[k]).
+    """
+    return {"i": column(i, "int32"), "j": column(j, "int32"), "similarity": column(similarity)}
+
+
+def decode(col: Union[list, Dict]) -> np.ndarray:
+    """
+    Turn a column from any response format back into a numpy array.
+
+    Args:
+        col (Union[list, Dict]): A JSON list or a binary column dict.
+
+    Returns:
+        np.ndarray: The column's values.
+    """
+    if isinstance(col, dict):
+        data = np.frombuffer(base64.b64decode(col["data"]), dtype=np.dtype(col["dtype"]))
+        return data.reshape(col["shape"])
+    return np.asarray(col)
+
+
+def _resolve(opts: Dict) -> Tuple[str, int]:
+    fmt = str(opts["response_format"] or "full").strip().lower()
+    precision = opts["precision"]
+    precision = DEFAULT_PRECISION if precision is None else min(max(int(precision), 0), MAX_PRECISION)
+    return fmt, precision
+
+
+def shaped(fn: Callable) -> Callable:
+    """
+    Add `response_format` / `precision` arguments to a tool.
+
+    The options are visible to the tool through `is_full`, `rounded` and `column` for the
+    duration of the call. Compact and binary responses are tagged with a 'format' key.
+
+    Args:
+        fn (Callable): The tool function, plain or generator.
+
+    Returns:
+        Callable: The wrapped tool with the extended signature.
+    """
+    sig = add_parameters(fn, RESPONSE_PARAMS)
+    options = [p.name for p in RESPONSE_PARAMS]
+    unknown = f"Unknown response_format. Use one of: {', '.join(FORMATS)}."
+
+    def tag(fmt: str, result):
+        if fmt != "full" and isinstance(result, dict) and "error" not in result:
+            result["format"] = fmt
+        return result
+
+    if inspect.isgeneratorfunction(fn):
+        @functools.wraps(fn)
+        def stream_wrapper(*args, **kwargs):
+            call_args, opts = split_options(sig, args, kwargs, options)
+            fmt, precision = _resolve(opts)
+            if fmt not in FORMATS:
+                yield {"error": unknown}
+                return
+            updates = fn(**call_args)
+            finished = object()
+            while True:
+                # Generators run in their caller's context, so set the options around each step only.
+                token = _options.set((fmt, precision))
+                try:
+                    update = next(updates, finished)
+                finally:
+                    _options.reset(token)
+                if update is finished:
+                    return
+                yield tag(fmt, update)
+
+        stream_wrapper.__signature__ = sig
+        return stream_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        call_args, opts = split_options(sig, args, kwargs, options)
+        fmt, precision = _resolve(opts)
+        if fmt not in FORMATS:
+            return {"error": unknown}
+        token = _options.set((fmt, precision))
+        try:
+            return tag(fmt, fn(**call_args))
+        finally:
+            _options.reset(token)
+
+    wrapper.__signature__ = sig
+    return wrapper
@@ -0,0 +1,243 @@
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future
+from typing import Callable, Dict, Optional, Tuple
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+
+from signatures import add_parameters, split_options
+
+CACHE_SIZE = int(os.environ.get("RAG_EVAL_CACHE_SIZE", "1024"))
+CACHE_TTL = float(os.environ.get("RAG_EVAL_CACHE_TTL", "600"))
+
+
+class LeaderCancelled(Exception):
+    """Passed to coalesced callers when the call they waited on was cancelled; they compute again."""
+
+
+def _normalize(value):
+    # Line endings and surrounding whitespace never change a tool's result.
+    if isinstance(value, str):
+        return value.replace("\r\n", "\n").strip()
+    return value
+
+
+class ResultCache:
+    """
+    Size-bounded LRU cache of tool results with a TTL and single-flight coalescing.
+
+    Identical calls that arrive while the first one is still computing wait for its
+    result instead of computing it again. Cached results are shared between callers
+    and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries: int = CACHE_SIZE, ttl: float = CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()  # key -> (expires_at, tool_name, result)
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def make_key(tool_name: str, arguments: Dict) -> str:
+        """Hash the tool name and its normalized, by-name arguments."""
+        payload = json.dumps(
+            {"tool": tool_name, "args": {k: _normalize(v) for k, v in arguments.items()}},
+            sort_keys=True, default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _count(self, tool_name: str, event: str) -> None:
+        counts = self._stats.setdefault(tool_name, {"hits": 0, "misses": 0, "coalesced": 0, "bypassed": 0,
+                                                     "evictions": 0, "expirations": 0})
+        counts[event] += 1
+
+    def begin(self, key: str, tool_name: str) -> Tuple[str, object]:
+        """
+        Look up `key`.
+
+        Returns:
+            Tuple[str, object]: ("hit", result), ("wait", future) if an identical call is
+            in flight, or ("lead", future) if the caller must compute and then call
+            `finish` or `fail`.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._count(tool_name, "hits")
+                    return "hit", entry[2]
+                del self._entries[key]
+                self._count(tool_name, "expirations")
+            future = self._inflight.get(key)
+            if future is not None:
+                self._count(tool_name, "coalesced")
+                return "wait", future
+            self._count(tool_name, "misses")
+            future = Future()
+            self._inflight[key] = future
+            return "lead", future
+
+    def finish(self, key: str, tool_name: str, result) -> None:
+        """Store the leader's result and release every waiting caller."""
+        with self._lock:
+            future = self._inflight.pop(key)
+            # Error dicts are answers too (e.g. empty input), but transient ones marked
+            # "retry" (such as a capacity rejection) must not be replayed, nor results
+            # cut short by a deadline ("truncated").
+            if not (isinstance(result, dict) and (result.get("retry") or result.get("truncated"))):
+                self._entries[key] = (time.monotonic() + self.ttl, tool_name, result)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    _, (_, evicted_tool, _) = self._entries.popitem(last=False)
+                    self._count(evicted_tool, "evictions")
+        if not future.done():
+            future.set_result(result)
+
+    def fail(self, key: str, error: BaseException) -> None:
+        """
+        Propagate the leader's exception to waiting callers without caching it.
+
+        A cancelled leader (e.g. its client disconnected) says nothing about the call itself,
+        so its waiters get `LeaderCancelled` and compute the result again instead.
+        """
+        with self._lock:
+            future = self._inflight.pop(key)
+        if isinstance(error, (asyncio.CancelledError, CancelledError)):
+            error = LeaderCancelled()
+        if not future.done():
+            future.set_exception(error)
+
+    def record_bypass(self, tool_name: str) -> None:
+        with self._lock:
+            self._count(tool_name, "bypassed")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """Hit/miss counters per tool and overall, plus current occupancy."""
+        with self._lock:
+            per_tool = {name: dict(counts) for name, counts in self._stats.items()}
+            size = len(self._entries)
+        totals = {"hits": 0, "misses": 0, "coalesced": 0, "bypassed": 0, "evictions": 0, "expirations": 0}
+        for counts in per_tool.values():
+            for event, n in counts.items():
+                totals[event] += n
+        for counts in list(per_tool.values()) + [totals]:
+            lookups = counts["hits"] + counts["misses"] + counts["coalesced"]
+            counts["hit_rate"] = round((counts["hits"] + counts["coalesced"]) / lookups, 4) if lookups else 0.0
+        return {"size": size, "max_entries": self.max_entries, "ttl_s": self.ttl, "totals": totals, "tools": per_tool}
+
+
+default_cache = ResultCache()
+
+USE_CACHE_PARAM = inspect.Parameter("use_cache", inspect.Parameter.POSITIONAL_OR_KEYWORD, default=True, annotation=bool)
+
+
+def cached(tool_name: str, fn: Callable, cache: Optional[ResultCache] = None) -> Callable:
+    """
+    Put a result cache with single-flight coalescing in front of a tool.
+
+    The wrapper takes one extra argument, `use_cache` (default True); pass False to
+    force a fresh computation. Calls with `profile` set always compute, since their
+    timings describe that call. Streaming (generator) tools are returned unwrapped.
+
+    Args:
+        tool_name (str): Name used in cache keys and stats.
+        fn (Callable): The tool, sync or async.
+        cache (Optional[ResultCache]): Cache to use; defaults to the process-wide cache.
+
+    Returns:
+        Callable: The wrapped tool.
+    """
+    if inspect.isgeneratorfunction(fn) or inspect.isasyncgenfunction(fn):
+        return fn
+    cache = cache or default_cache
+    sig = add_parameters(fn, [USE_CACHE_PARAM])
+
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            call_args, options = split_options(sig, args, kwargs, ["use_cache"])
+            if not options["use_cache"] or call_args.get("profile"):
+                cache.record_bypass(tool_name)
+                return await fn(**call_args)
+            key = cache.make_key(tool_name, call_args)
+            while True:
+                state, value = cache.begin(key, tool_name)
+                if state == "hit":
+                    return value
+                if state != "wait":
+                    break
+                try:
+                    # Shielded: a waiter whose own client goes away must not cancel the shared call.
+                    return await asyncio.shield(asyncio.wrap_future(value))
+                except LeaderCancelled:
+                    continue
+            try:
+                result = await fn(**call_args)
+            except BaseException as e:
+                cache.fail(key, e)
+                raise
+            cache.finish(key, tool_name, result)
+            return result
+
+        async_wrapper.__signature__ = sig
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        call_args, options = split_options(sig, args, kwargs, ["use_cache"])
+        if not options["use_cache"] or call_args.get("profile"):
+            cache.record_bypass(tool_name)
+            return fn(**call_args)
+        key = cache.make_key(tool_name, call_args)
+        while True:
+            state, value = cache.begin(key, tool_name)
+            if state == "hit":
+                return value
+            if state != "wait":
+                break
+            try:
+                return value.result()
+            except LeaderCancelled:
+                continue
+        try:
+            result = fn(**call_args)
+        except BaseException as e:
+            cache.fail(key, e)
+            raise
+        cache.finish(key, tool_name, result)
+        return result
+
+    wrapper.__signature__ = sig
+    return wrapper
+
+
+def cache_stats(reset: bool = False) -> Dict:
+    """
+    Report result-cache statistics for every tool.
+
+    Args:
+        reset (bool): If True, drop all cached results after reporting.
+
+    Returns:
+        Dict: A dictionary containing:
+            - 'tool': The name of the tool ("Cache Stats").
+            - 'size' / 'max_entries' / 'ttl_s': Current occupancy and limits.
+            - 'totals': Hits, misses, coalesced calls, bypasses, evictions, expirations and hit rate.
+            - 'tools': The same counters per tool.
+    """
+    stats = default_cache.stats()
+    if reset:
+        default_cache.clear()
+    return {"tool": "Cache Stats", **stats}
@@ -1,16 +1,34 @@
-from typing import Dict,List
-from rank_bm25 import BM25Okapi
-from sentence_transformers import SentenceTransformer, util
+from itertools import chain, repeat
+from typing import Dict, Iterator, List, Union
+import numpy as np
 import re
 import ast
+import json
+import time
+
+from bm25 import BM25Index
+from corpus_registry import CorpusTexts, corpus_aware, is_corpus_ref, resolve
+from deadlines import blocks, check
+from embeddings import MINILM, cos_sim, encode, scorer
+from metrics import observe_items
+from profiling import profiled, stage
+from responses import column, is_full, pair_columns, rounded, shaped
+from tokenizer import token_ids
+
+def parse_documents(documents: Union[str, List[str]]):
+    with stage("parse_documents"):
+        doc_list = _parse_documents(documents)
+    observe_items(len(doc_list))
+    return doc_list
+
+def _parse_documents(documents: Union[str, List[str]]):
+    if is_corpus_ref(documents):
+        return resolve(documents)
+    if isinstance(documents, CorpusTexts):
+        return documents
+    if isinstance(documents, list):
+        return [d.strip() for d in documents if isinstance(d, str) and d.strip()]
 
-# Load once
-embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
-
-def simple_tokenize(text: str):
-    return re.findall(r"\b\w+\b", text.lower())
-
-def parse_documents(documents: str):
     doc_list = []
 
     if documents.strip().startswith("[") and documents.strip().endswith("]"):
@@ -37,6 +55,9 @@ def parse_documents(documents: str):
     return [documents.strip()] if documents.strip() else []
 
 # 1. BM25 Scorer 
+@profiled
+@shaped
+@corpus_aware
 def bm25_relevance_scorer(query: str, documents: str) -> Dict:
     """
     Compute relevance scores between a query and a list of documents using the BM25 algorithm.
@@ -47,6 +68,7 @@ def bm25_relevance_scorer(query: str, documents: str) -> Dict:
     Args:
         query (str): The input search query in plain text.
         documents (str): A set of documents in raw string format. Supports JSON-style lists, paragraph-separated, or newline-separated entries.
+                         Or a corpus id from `register_corpus`.
 
     Returns:
         Dict: A dictionary containing:
@@ -55,24 +77,32 @@ def bm25_relevance_scorer(query: str, documents: str) -> Dict:
             - 'results': A list of dictionaries, each with:
                 - 'document': The original document string.
                 - 'score': The BM25 relevance score (higher means more relevant).
+        In compact and binary formats, 'scores' replaces 'query' and 'results': one score per document, in input order.
     """
     doc_list = parse_documents(documents)
     if not query.strip() or not doc_list:
         return {"error": "Query and documents must be non-empty."}
     
-    tokenized_docs = [simple_tokenize(doc) for doc in doc_list]
-    bm25 = BM25Okapi(tokenized_docs)
-    tokenized_query = simple_tokenize(query)
-    bm25_scores = bm25.get_scores(tokenized_query)
-
-    results = []
-    for doc, score in zip(doc_list, bm25_scores):
-        results.append({"document": doc, "score": round(max(score, 0.0), 4)})
+    with stage("tokenize"):
+        tokenized_query = token_ids(query)
+    with stage("similarity"):
+        bm25 = bm25_index(doc_list)
+        bm25_scores = bm25.get_scores(tokenized_query)
+
+    with stage("postprocess"):
+        if not is_full():
+            return {"tool": "BM25 Relevance Scorer", "scores": column(np.maximum(bm25_scores, 0.0))}
+        results = []
+        for doc, score in zip(doc_list, bm25_scores):
+            results.append({"document": doc, "score": rounded(max(score, 0.0))})
 
     return {"tool": "BM25 Relevance Scorer", "query": query, "results": results}
 
 
 # 2. Semantic Relevance (Cosine Similarity)
+@profiled
+@shaped
+@corpus_aware
 def semantic_relevance_scorer(query: str, documents: str) -> Dict:
     """
     Compute semantic relevance scores between a query and a list of documents using cosine similarity.
@@ -83,7 +113,7 @@ def semantic_relevance_scorer(query: str, documents: str) -> Dict:
     Args:
         query (str): The input query in natural language.
         documents (str): A string representing a list of documents. Supports multiple formats including JSON-style lists,
-                         paragraph-separated text, or newline-separated entries.
+                         paragraph-separated text, or newline-separated entries. Or a corpus id from `register_corpus`.
 
     Returns:
         Dict: A dictionary containing:
@@ -92,23 +122,139 @@ def semantic_relevance_scorer(query: str, documents: str) -> Dict:
             - 'results': A list of dictionaries with:
                 - 'document': The original document text.
                 - 'score': A float representing cosine similarity between the query and the document (0 to 1).
+        In compact and binary formats, 'scores' replaces 'query' and 'results': one score per document, in input order.
     """
     doc_list = parse_documents(documents)
     if not query.strip() or not doc_list:
         return {"error": "Query and documents must be non-empty."}
 
-    query_emb = embedding_model.encode(query, convert_to_tensor=True)
-    doc_embs = embedding_model.encode(doc_list, convert_to_tensor=True)
-    cosine_scores = util.cos_sim(query_emb, doc_embs)[0]
+    query_emb = encode(query, MINILM)
+    cosine_scores = scorer(doc_list, MINILM)(query_emb)[0]
 
-    results = []
-    for doc, score in zip(doc_list, cosine_scores):
-        results.append({"document": doc, "score": round(score.item(), 4)})
+    with stage("postprocess"):
+        if not is_full():
+            return {"tool": "Semantic Relevance Scorer", "scores": column(cosine_scores)}
+        results = []
+        for doc, score in zip(doc_list, cosine_scores):
+            results.append({"document": doc, "score": rounded(score)})
 
     return {"tool": "Semantic Relevance Scorer", "query": query, "results": results}
 
 
+# 2b. Hybrid Relevance (BM25 + semantic fusion)
+def bm25_index(doc_list: List[str]) -> BM25Index:
+    """The BM25 index of a document list, reusing the stored one for a registered corpus."""
+    if isinstance(doc_list, CorpusTexts):
+        return doc_list.corpus.bm25()
+    return BM25Index([token_ids(doc) for doc in doc_list])
+
+def _ranks(scores: np.ndarray) -> np.ndarray:
+    """1-based rank of every column in each row, highest score first; ties keep input order."""
+    order = np.argsort(-scores, axis=1, kind="stable")
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(1, scores.shape[1] + 1)[None, :], axis=1)
+    return ranks
+
+def _min_max(scores: np.ndarray) -> np.ndarray:
+    """Scale each row to [0, 1]; a constant row maps to 1 if positive, else 0."""
+    lo = scores.min(axis=1, keepdims=True)
+    span = scores.max(axis=1, keepdims=True) - lo
+    flat = np.where(lo > 0, 1.0, 0.0) * np.ones_like(scores)
+    return np.where(span > 0, (scores - lo) / np.where(span > 0, span, 1.0), flat)
+
+@profiled
+@shaped
+@corpus_aware
+def hybrid_relevance_scorer(query: str, documents: str, bm25_weight: float = 1.0, semantic_weight: float = 1.0,
+                            fusion: str = "rrf", top_k: int = 0, rrf_k: int = 60) -> Dict:
+    """
+    Score documents against one or more queries with BM25 and semantic similarity in a single pass, and fuse the two.
+
+    Documents are parsed, tokenized and encoded once, however many queries are given. Two fused scores are returned:
+    reciprocal rank fusion, bm25_weight / (rrf_k + bm25 rank) + semantic_weight / (rrf_k + semantic rank), and a
+    weighted sum of the min-max normalized BM25 and cosine scores, divided by the sum of the weights.
+
+    Args:
+        query (str): The search query. Put one query per line to score several queries against the same documents.
+        documents (str): A set of documents in raw string format. Supports JSON-style lists, paragraph-separated, or newline-separated entries.
+                         Or a corpus id from `register_corpus`.
+        bm25_weight (float): Weight of the BM25 signal in both fused scores.
+        semantic_weight (float): Weight of the semantic signal in both fused scores.
+        fusion (str): Fused score to rank by: "rrf" or "weighted".
+        top_k (int): Number of top-ranked documents to return per query; 0 returns all.
+        rrf_k (int): Rank offset of reciprocal rank fusion; larger values flatten the rank differences.
+
+    Returns:
+        Dict: A dictionary containing:
+            - 'tool': The name of the tool ("Hybrid Relevance Scorer").
+            - 'fusion': The fused score used for ranking.
+            - 'results': One entry per query with:
+                - 'query': The query.
+                - 'documents': The top documents by the fused score, each with 'index' (position in the input),
+                  'document', 'bm25', 'semantic', 'rrf' and 'weighted'.
+        In compact and binary formats, each entry instead has 'bm25', 'semantic', 'rrf' and 'weighted' columns
+        in document order and a 'ranking' column with the indices of the top documents.
+    """
+    doc_list = parse_documents(documents)
+    queries = [q.strip() for q in query.splitlines() if q.strip()]
+    if not queries or not doc_list:
+        return {"error": "Query and documents must be non-empty."}
+    fusion = fusion.strip().lower()
+    if fusion not in ("rrf", "weighted"):
+        return {"error": "fusion must be 'rrf' or 'weighted'."}
+    if bm25_weight < 0 or semantic_weight < 0 or bm25_weight + semantic_weight <= 0:
+        return {"error": "Weights must be non-negative and not both zero."}
+
+    with stage("tokenize"):
+        tokenized_queries = [token_ids(q) for q in queries]
+    with stage("similarity"):
+        bm25 = bm25_index(doc_list)
+        bm25_scores = np.maximum(np.stack([bm25.get_scores(q) for q in tokenized_queries]), 0.0)
+
+    query_embs = encode(queries, MINILM)
+    semantic_scores = scorer(doc_list, MINILM)(query_embs).astype(np.float64)
+
+    with stage("similarity"):
+        rrf = bm25_weight / (rrf_k + _ranks(bm25_scores)) + semantic_weight / (rrf_k + _ranks(semantic_scores))
+        weighted = (bm25_weight * _min_max(bm25_scores) + semantic_weight * _min_max(semantic_scores)) / (bm25_weight + semantic_weight)
+        fused = rrf if fusion == "rrf" else weighted
+        top_k = int(top_k) if top_k and int(top_k) > 0 else len(doc_list)
+        ranking = np.argsort(-fused, axis=1, kind="stable")[:, :top_k]
+
+    with stage("postprocess"):
+        results = []
+        for q, query_text in enumerate(queries):
+            if not is_full():
+                results.append({
+                    "bm25": column(bm25_scores[q]),
+                    "semantic": column(semantic_scores[q]),
+                    "rrf": column(rrf[q]),
+                    "weighted": column(weighted[q]),
+                    "ranking": column(ranking[q], "int32"),
+                })
+                continue
+            results.append({
+                "query": query_text,
+                "documents": [
+                    {
+                        "index": d,
+                        "document": doc_list[d],
+                        "bm25": rounded(bm25_scores[q, d]),
+                        "semantic": rounded(semantic_scores[q, d]),
+                        "rrf": rounded(rrf[q, d]),
+                        "weighted": rounded(weighted[q, d]),
+                    }
+                    for d in ranking[q].tolist()
+                ],
+            })
+
+    return {"tool": "Hybrid Relevance Scorer", "fusion": fusion, "results": results}
+
+
 # 3. Redundancy Checker 
+@profiled
+@shaped
+@corpus_aware
 def redundancy_checker(_, documents: str) -> Dict:
     """
     Detect redundant or highly similar document pairs using semantic similarity.
@@ -118,40 +264,173 @@ def redundancy_checker(_, documents: str) -> Dict:
 
     Args:
         _ (str): Placeholder for unused input (for LLM compatibility).
-        documents (str): A string containing multiple documents. Accepts formats like JSON-style lists, 
-                         newline-separated text, or paragraph-separated entries.
+        documents (str): A string containing multiple documents. Accepts formats like JSON-style lists,
+                         newline-separated text, or paragraph-separated entries. Or a corpus id from `register_corpus`.
 
     Returns:
         Dict: A dictionary containing:
             - 'tool': The name of the tool ("Redundancy Checker").
             - 'results': A list of redundant document pairs with their similarity scores,
                          or a message indicating no redundancy if none are found.
+        In compact and binary formats, 'pairs' replaces 'results': {'i', 'j', 'similarity'} columns of
+        document indices (i < j) and scores, empty when nothing is redundant.
+        If the call's deadline passes part-way, 'truncated' is set and the pairs cover only
+        documents i < 'processed' (of 'total').
     """
     doc_list = parse_documents(documents)
     if not doc_list or len(doc_list) < 2:
         return {"error": "At least two documents are required to check redundancy."}
 
-    doc_embs = embedding_model.encode(doc_list, convert_to_tensor=True)
-    sim_matrix = util.cos_sim(doc_embs, doc_embs)
-
-    redundant_pairs = []
-    for i in range(len(doc_list)):
-        for j in range(i + 1, len(doc_list)):
-            score = sim_matrix[i][j].item()
-            if score > 0.8:
-                redundant_pairs.append({
-                    "doc_i": doc_list[i],
-                    "doc_j": doc_list[j],
-                    "similarity": round(score, 4)
-                })
+    doc_embs = encode(doc_list, MINILM)
+    n = len(doc_list)
+    rows, cols, scores = [], [], []
+    processed = 0
+    # Rows are compared in blocks against the documents after them only (the upper triangle),
+    # which keeps memory at one block of the matrix and gives a place to stop at the deadline.
+    for start, end in blocks(n - 1):
+        sim = cos_sim(doc_embs[start:end], doc_embs[start:])
+        with stage("postprocess"):
+            # Block row a is document start + a, block column c is document start + c; keep c > a.
+            a, c = np.nonzero(np.triu(sim > 0.8, k=1))
+            rows.append(a + start)
+            cols.append(c + start)
+            scores.append(sim[a, c])
+        processed = end
+
+    with stage("postprocess"):
+        rows, cols, scores = np.concatenate(rows), np.concatenate(cols), np.concatenate(scores)
+        partial = {"truncated": True, "processed": processed, "total": n} if processed < n - 1 else {}
+        if not is_full():
+            return {"tool": "Redundancy Checker", "pairs": pair_columns(rows, cols, scores), **partial}
+        redundant_pairs = []
+        for i, j, score in zip(rows.tolist(), cols.tolist(), scores.tolist()):
+            redundant_pairs.append({
+                "doc_i": doc_list[i],
+                "doc_j": doc_list[j],
+                "similarity": rounded(score)
+            })
 
     return {
         "tool": "Redundancy Checker",
-        "results": redundant_pairs if redundant_pairs else "No highly redundant documents found."
+        "results": redundant_pairs if redundant_pairs else "No highly redundant documents found.",
+        **partial,
+    }
+
+
+# 3b. Redundancy Checker (streaming)
+@profiled
+@shaped
+@corpus_aware
+def redundancy_checker_stream(_, documents: str, chunk_size: int = 64) -> Iterator[Dict]:
+    """
+    Streaming variant of the redundancy checker for large document sets.
+
+    Documents are encoded in chunks; each chunk is compared against every document seen so far,
+    and the redundant pairs it uncovers are yielded straight away with progress metadata.
+    Clients can act on early pairs or cancel without paying for the rest of the run.
+
+    Args:
+        _ (str): Placeholder for unused input (for LLM compatibility).
+        documents (str): A string containing multiple documents. Accepts formats like JSON-style lists,
+                         newline-separated text, or paragraph-separated entries. Or a corpus id from `register_corpus`.
+        chunk_size (int): Number of documents encoded and compared per update.
+
+    Yields:
+        Dict: Partial updates with:
+            - 'tool': The name of the tool ("Redundancy Checker").
+            - 'progress': {'processed', 'total', 'fraction', 'elapsed_s', 'done'}.
+            - 'new_results': Redundant pairs found in this chunk.
+        The final update has 'done' set and carries the complete 'results', in the same
+        format and order as `redundancy_checker`. In compact and binary formats, 'new_pairs'
+        and 'pairs' columns replace 'new_results' and 'results'.
+        If the call's deadline passes, the stream ends with an {'error', 'truncated'} update
+        after the chunks already sent.
+    """
+    doc_list = parse_documents(documents)
+    if not doc_list or len(doc_list) < 2:
+        yield {"error": "At least two documents are required to check redundancy."}
+        return
+
+    chunk_size = max(int(chunk_size), 1)
+    total = len(doc_list)
+    started = time.perf_counter()
+    all_embs = None
+    found = []
+    full = is_full()
+
+    # A registered corpus' embeddings are looked up once for the whole stream, not once per chunk.
+    corpus_embs = encode(doc_list, MINILM) if isinstance(doc_list, CorpusTexts) else None
+
+    for start in range(0, total, chunk_size):
+        check()
+        end = min(start + chunk_size, total)
+        if corpus_embs is not None:
+            all_embs = corpus_embs
+        else:
+            chunk_embs = encode(doc_list[start:end], MINILM)
+            if all_embs is None:
+                # Filled in place chunk by chunk, never re-stacked.
+                all_embs = np.empty((total, chunk_embs.shape[1]), dtype=chunk_embs.dtype)
+            all_embs[start:end] = chunk_embs
+        chunk_embs = all_embs[start:end]
+        seen_embs = all_embs[:end]
+
+        # Row a of the chunk is document start + a; pair it with every earlier document.
+        sim = cos_sim(chunk_embs, seen_embs)
+        earlier = np.arange(end)[None, :] < np.arange(start, end)[:, None]
+        rows, cols = np.nonzero((sim > 0.8) & earlier)
+
+        with stage("postprocess"):
+            new_pairs = []
+            for a, j in zip(rows.tolist(), cols.tolist()):
+                i = start + a
+                score = float(sim[a, j])
+                if full:
+                    new_pairs.append({"doc_i": doc_list[j], "doc_j": doc_list[i], "similarity": rounded(score)})
+                found.append((j, i, score))
+            if full:
+                new = {"new_results": new_pairs}
+            else:
+                new = {"new_pairs": pair_columns(cols, rows + start, sim[rows, cols])}
+
+        if end < total:
+            yield {
+                "tool": "Redundancy Checker",
+                "progress": {
+                    "processed": end,
+                    "total": total,
+                    "fraction": round(end / total, 4),
+                    "elapsed_s": round(time.perf_counter() - started, 3),
+                    "done": False,
+                },
+                **new,
+            }
+
+    found.sort(key=lambda item: (item[0], item[1]))
+    if full:
+        final = {"results": [
+            {"doc_i": doc_list[j], "doc_j": doc_list[i], "similarity": rounded(score)} for j, i, score in found
+        ] or "No highly redundant documents found."}
+    else:
+        final = {"pairs": pair_columns([p[0] for p in found], [p[1] for p in found], [p[2] for p in found])}
+    yield {
+        "tool": "Redundancy Checker",
+        "progress": {
+            "processed": total,
+            "total": total,
+            "fraction": 1.0,
+            "elapsed_s": round(time.perf_counter() - started, 3),
+            "done": True,
+        },
+        **new,
+        **final,
     }
 
 
 # 4. Exact Match Checker 
+@profiled
+@shaped
+@corpus_aware
 def exact_match_checker(query: str, documents: str) -> Dict:
     """
     Check if each document contains the exact query string as a substring (case-insensitive).
@@ -162,7 +441,7 @@ def exact_match_checker(query: str, documents: str) -> Dict:
     Args:
         query (str): The exact phrase or keyword to search for.
         documents (str): A raw string containing multiple documents. Supports JSON-style lists,
-                         newline-separated, or paragraph-separated formats.
+                         newline-separated, or paragraph-separated formats. Or a corpus id from `register_corpus`.
 
     Returns:
         Dict: A dictionary containing:
@@ -171,17 +450,21 @@ def exact_match_checker(query: str, documents: str) -> Dict:
             - 'results': A list of dictionaries with:
                 - 'document': The original document.
                 - 'exact_match': A boolean indicating if the query is an exact substring of the document.
+        In compact and binary formats, an 'exact_match' column replaces 'query' and 'results', in document order.
     """
     doc_list = parse_documents(documents)
     query_lower = query.strip().lower()
     results = []
 
-    for doc in doc_list:
-        match = query_lower in doc.lower()
-        results.append({
-            "document": doc,
-            "exact_match": match
-        })
+    with stage("similarity"):
+        if not is_full():
+            return {"tool": "Exact Match Checker", "exact_match": column([query_lower in doc.lower() for doc in doc_list], "bool")}
+        for doc in doc_list:
+            match = query_lower in doc.lower()
+            results.append({
+                "document": doc,
+                "exact_match": match
+            })
 
     return {
         "tool": "Exact Match Checker",
@@ -189,3 +472,204 @@ def exact_match_checker(query: str, documents: str) -> Dict:
         "results": results
     }
 
+
+
+# 5. Retrieval Metrics (labeled)
+def _parse_rankings(rankings: str) -> Dict[str, List[str]]:
+    """
+    Parse ranked results into query id -> document ids, best first.
+
+    Accepts a JSON object mapping each query id to a ranked list of document ids or to a
+    {document id: score} object, TREC run lines ("qid Q0 docid rank score tag", ordered by
+    score), or "qid docid" lines in rank order.
+    """
+    text = rankings.strip()
+    if text.startswith("{"):
+        parsed = json.loads(text)
+        return {
+            str(qid): list(map(str, sorted(docs, key=docs.get, reverse=True) if isinstance(docs, dict) else docs))
+            for qid, docs in parsed.items()
+        }
+    ranked: Dict[str, list] = {}
+    for line in text.splitlines():
+        parts = line.split()
+        if not parts:
+            continue
+        if len(parts) >= 6:
+            ranked.setdefault(parts[0], []).append((-float(parts[4]), parts[2]))
+        elif len(parts) == 2:
+            ranked.setdefault(parts[0], []).append((len(ranked.get(parts[0], ())), parts[1]))
+        else:
+            raise ValueError(f"unrecognised ranking line: {line!r}")
+    # Stable sort: equal scores keep their file order.
+    return {qid: [doc for _, doc in sorted(entries, key=lambda e: e[0])] for qid, entries in ranked.items()}
+
+
+def _parse_qrels(qrels: str) -> Dict[str, Dict[str, int]]:
+    """
+    Parse relevance labels into query id -> {document id: grade}.
+
+    Accepts a JSON object mapping each query id to a {document id: grade} object or to a list
+    of relevant document ids (grade 1), TREC qrels lines ("qid iter docid grade"), or
+    "qid docid [grade]" lines.
+    """
+    text = qrels.strip()
+    if text.startswith("{"):
+        parsed = json.loads(text)
+        return {
+            str(qid): {str(d): int(g) for d, g in labels.items()} if isinstance(labels, dict) else {str(d): 1 for d in labels}
+            for qid, labels in parsed.items()
+        }
+    labels: Dict[str, Dict[str, int]] = {}
+    for line in text.splitlines():
+        parts = line.split()
+        if not parts:
+            continue
+        if len(parts) == 4:
+            labels.setdefault(parts[0], {})[parts[2]] = int(parts[3])
+        elif len(parts) in (2, 3):
+            labels.setdefault(parts[0], {})[parts[1]] = int(parts[2]) if len(parts) == 3 else 1
+        else:
+            raise ValueError(f"unrecognised qrels line: {line!r}")
+    return labels
+
+
+def labeled_metrics(ranked: List[List[str]], labels: List[Dict[str, int]], ks: List[int]) -> Dict[str, np.ndarray]:
+    """
+    Per-query Recall@k, Precision@k, nDCG@k, reciprocal rank and average precision.
+
+    Rankings are flattened into one array of relevance grades; @k metrics are computed on a
+    (queries, max k) padded grade matrix and MRR / MAP over the full depth with segment sums,
+    so the cost is a few numpy passes however many queries there are. Documents with grade > 0
+    are relevant; nDCG uses linear gains and a log2 discount, as trec_eval does. A document
+    listed twice in one ranking only counts at its first rank.
+
+    Args:
+        ranked (List[List[str]]): Per query, document ids best first.
+        labels (List[Dict[str, int]]): Per query, document id -> relevance grade.
+        ks (List[int]): Cutoffs for the @k metrics.
+
+    Returns:
+        Dict[str, np.ndarray]: Metric name ("recall@5", "ndcg@10", "mrr", "map", ...) -> one value per query.
+    """
+    # A repeated relevant document would count as another hit and push recall and MAP past 1.
+    ranked = [list(dict.fromkeys(docs)) for docs in ranked]
+    nq = len(ranked)
+    lengths = np.fromiter(map(len, ranked), dtype=np.int64, count=nq)
+    total = int(lengths.sum())
+    grades = np.fromiter(
+        chain.from_iterable(map(rel.get, docs, repeat(0)) for docs, rel in zip(ranked, labels)),
+        dtype=np.float64, count=total,
+    )
+    rows = np.repeat(np.arange(nq), lengths)
+    starts = np.cumsum(lengths) - lengths
+    positions = np.arange(total) - np.repeat(starts, lengths)  # 0-based rank within the query
+    relevant = grades > 0
+    n_relevant = np.fromiter((sum(g > 0 for g in rel.values()) for rel in labels), dtype=np.int64, count=nq)
+    safe_relevant = np.maximum(n_relevant, 1)
+
+    metrics = {}
+    depth = max(ks)
+    top = positions < depth
+    padded = np.zeros((nq, depth))
+    padded[rows[top], positions[top]] = grades[top]
+    hits = np.cumsum(padded > 0, axis=1)
+    discounts = 1.0 / np.log2(np.arange(2, depth + 2))
+
+    # Ideal ordering: each query's positive grades, highest first, padded the same way.
+    ideal_grades = np.fromiter(chain.from_iterable((g for g in rel.values() if g > 0) for rel in labels),
+                               dtype=np.float64, count=int(n_relevant.sum()))
+    ideal_rows = np.repeat(np.arange(nq), n_relevant)
+    # Rows are already grouped, so sorting by (row, -grade) only reorders grades within each query.
+    ideal_grades = ideal_grades[np.lexsort((-ideal_grades, ideal_rows))]
+    ideal_positions = np.arange(len(ideal_grades)) - np.repeat(np.cumsum(n_relevant) - n_relevant, n_relevant)
+    keep = ideal_positions < depth
+    ideal = np.zeros((nq, depth))
+    ideal[ideal_rows[keep], ideal_positions[keep]] = ideal_grades[keep]
+    dcg = np.cumsum(padded * discounts, axis=1)
+    idcg = np.cumsum(ideal * discounts, axis=1)
+
+    for k in ks:
+        metrics[f"recall@{k}"] = hits[:, k - 1] / safe_relevant
+        metrics[f"precision@{k}"] = hits[:, k - 1] / k
+        metrics[f"ndcg@{k}"] = np.divide(dcg[:, k - 1], idcg[:, k - 1], out=np.zeros(nq), where=idcg[:, k - 1] > 0)
+
+    # Full-depth metrics on the flat arrays: hits so far at each rank, per query.
+    cumulative = np.cumsum(relevant)
+    hits_before = np.concatenate([[0], cumulative])[starts]
+    hits_so_far = cumulative - np.repeat(hits_before, lengths)
+    precision_at_hit = np.where(relevant, hits_so_far / (positions + 1), 0.0)
+    metrics["map"] = np.bincount(rows, weights=precision_at_hit, minlength=nq) / safe_relevant
+    reciprocal = np.zeros(nq)
+    first_rows, first = np.unique(rows[relevant], return_index=True)
+    reciprocal[first_rows] = 1.0 / (positions[relevant][first] + 1)
+    metrics["mrr"] = reciprocal
+    return metrics
+
+
+@profiled
+@shaped
+def retrieval_metrics_evaluator(rankings: str, qrels: str, ks: str = "1,5,10") -> Dict:
+    """
+    Evaluate ranked retrieval results against ground-truth relevance labels for many queries at once.
+
+    Computes Recall@k, Precision@k and nDCG@k for every cutoff in `ks`, plus MRR and MAP, with
+    numpy operations over all queries together. Queries are those in `qrels` with at least one
+    relevant document; a query missing from `rankings` scores 0.
+
+    Args:
+        rankings (str): Ranked results: a JSON object {query id: [doc ids, best first]} or
+                        {query id: {doc id: score}}, TREC run lines ("qid Q0 docid rank score tag"),
+                        or "qid docid" lines in rank order.
+        qrels (str): Relevance labels: a JSON object {query id: {doc id: grade}} or {query id: [relevant doc ids]},
+                     TREC qrels lines ("qid 0 docid grade"), or "qid docid [grade]" lines. Grades > 0 are relevant.
+        ks (str): Comma-separated cutoffs, e.g. "1,5,10".
+
+    Returns:
+        Dict: A dictionary containing:
+            - 'tool': The name of the tool ("Retrieval Metrics Evaluator").
+            - 'queries': Number of evaluated queries.
+            - 'unlabeled_queries': Number of ranked queries without relevant labels, which are skipped.
+            - 'metrics': Mean of every metric over the evaluated queries ("recall@5", "ndcg@10", "mrr", "map", ...).
+            - 'per_query': Per query, its id and every metric.
+        In compact and binary formats, 'per_query' is instead one column per metric, in qrels order.
+    """
+    try:
+        cutoffs = sorted({int(k) for k in ks.replace(" ", "").split(",") if k})
+    except ValueError:
+        return {"error": f"ks must be comma-separated positive integers, got {ks!r}."}
+    if not cutoffs or cutoffs[0] < 1:
+        return {"error": f"ks must be comma-separated positive integers, got {ks!r}."}
+
+    with stage("parse_documents"):
+        try:
+            run = _parse_rankings(rankings)
+            labels = _parse_qrels(qrels)
+        except (ValueError, TypeError, AttributeError) as e:
+            return {"error": f"Could not parse rankings or qrels: {e}"}
+    query_ids = [qid for qid, rel in labels.items() if any(g > 0 for g in rel.values())]
+    evaluated = set(query_ids)
+    if not run or not query_ids:
+        return {"error": "Rankings and relevance labels must be non-empty."}
+    observe_items(len(query_ids))
+
+    with stage("similarity"):
+        per_query = labeled_metrics([run.get(qid, []) for qid in query_ids], [labels[qid] for qid in query_ids], cutoffs)
+
+    with stage("postprocess"):
+        result = {
+            "tool": "Retrieval Metrics Evaluator",
+            "queries": len(query_ids),
+            "unlabeled_queries": sum(1 for qid in run if qid not in evaluated),
+            "ks": cutoffs,
+            "metrics": {name: rounded(values.mean()) for name, values in per_query.items()},
+        }
+        if not is_full():
+            result["per_query"] = {name: column(values) for name, values in per_query.items()}
+            return result
+        names = list(per_query)
+        columns = [[rounded(v) for v in per_query[name].tolist()] for name in names]
+        result["per_query"] = [
+            {"query": qid, **dict(zip(names, values))} for qid, values in zip(query_ids, zip(*columns))
+        ]
+    return result
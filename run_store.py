@@ -0,0 +1,275 @@
+"""
+SQLite store of batch evaluation runs.
+
+Every `batch_evaluator` call is recorded as a run. Per row and metric the store keeps the
+summary value (indexed by run id, dataset row hash, tool and metric) and, once per distinct
+input, the tool's full output. A later run skips rows whose inputs, metrics and scoring
+configuration are unchanged and reuses the stored outputs, so incremental reruns only
+evaluate new or edited rows.
+
+Each run's aggregates (count, sum, min, max, errors per metric) are written with the run,
+so `compare_runs` reads a handful of rows however many metric rows the runs hold.
+
+The store is opt-in: RAG_EVAL_RUN_STORE is the database path, and empty (the default)
+disables it, so importing and calling the tools never writes a database into the working
+directory.
+
+Outputs are reused when they are deterministic answers, including validation errors such
+as "at least two generations are required". Outputs cut short by a deadline, retryable
+rejections and errors from unexpected exceptions are never stored.
+"""
+from contextlib import closing, contextmanager
+from typing import Dict, Iterator, List, Optional
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+
+from embeddings import get_backend
+
+RUN_STORE_PATH = os.environ.get("RAG_EVAL_RUN_STORE", "")
+
+# Bump when a metric's output changes for the same input, so stored outputs are not reused.
+SCORING_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    created REAL NOT NULL,
+    rows INTEGER NOT NULL,
+    reused_rows INTEGER NOT NULL,
+    metrics TEXT NOT NULL,
+    config TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scores (
+    run_id TEXT NOT NULL,
+    row INTEGER NOT NULL,
+    row_hash TEXT NOT NULL,
+    tool TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (run_id, tool, row)
+);
+CREATE INDEX IF NOT EXISTS scores_by_row ON scores (row_hash, tool, metric);
+CREATE TABLE IF NOT EXISTS outputs (
+    row_hash TEXT NOT NULL,
+    tool TEXT NOT NULL,
+    config TEXT NOT NULL,
+    output BLOB NOT NULL,
+    PRIMARY KEY (row_hash, tool, config)
+);
+CREATE TABLE IF NOT EXISTS run_aggregates (
+    run_id TEXT NOT NULL,
+    tool TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    sum REAL NOT NULL,
+    min REAL,
+    max REAL,
+    errors INTEGER NOT NULL,
+    PRIMARY KEY (run_id, tool, metric)
+);
+"""
+
+
+def row_hash(row: Dict) -> str:
+    """Content hash of a dataset row's query, documents and generation."""
+    payload = json.dumps([row["query"], row["documents"], row["generation"]], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def new_run_id() -> str:
+    return time.strftime("%Y%m%dT%H%M%S") + "-" + uuid.uuid4().hex[:8]
+
+
+def scoring_config(response_format: str, precision: int) -> str:
+    """Everything besides the row itself that a stored output depends on."""
+    return f"v{SCORING_VERSION}|{get_backend()}|{response_format}|{precision}"
+
+
+class RunStore:
+    """
+    Runs, per-row metric values, reusable outputs and run aggregates in one SQLite file.
+
+    Args:
+        path (str): Database file; created on first use.
+    """
+
+    def __init__(self, path: str = RUN_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        with self._connect() as db:
+            db.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # One short-lived connection per operation; SQLite connections are not shareable across threads.
+        with closing(sqlite3.connect(self.path, timeout=30)) as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            with db:
+                yield db
+
+    def lookup(self, hashes: List[str], tools: List[str], config: str) -> Dict[tuple, Dict]:
+        """
+        Stored outputs for the given rows and tools under `config`.
+
+        Returns:
+            Dict[tuple, Dict]: (row_hash, tool) -> the tool's output, for every pair that is stored.
+        """
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._connect() as db:
+            for tool in tools:
+                for start in range(0, len(unique), 500):
+                    batch = unique[start:start + 500]
+                    marks = ",".join("?" * len(batch))
+                    for h, blob in db.execute(
+                        f"SELECT row_hash, output FROM outputs WHERE tool = ? AND config = ? AND row_hash IN ({marks})",
+                        [tool, config, *batch],
+                    ):
+                        found[(h, tool)] = json.loads(zlib.decompress(blob))
+        return found
+
+    def record(self, run_id: str, hashes: List[str], results: List[Dict], values: Dict[str, tuple],
+               config: str, reused: Optional[set] = None) -> None:
+        """
+        Write a finished run: per-row values, new outputs and the run's aggregates.
+
+        Args:
+            run_id (str): Id of the run; an existing run with this id is replaced.
+            hashes (List[str]): Row hash of every row, in dataset order.
+            results (List[Dict]): Per row, tool name -> the tool's output.
+            values (Dict[str, tuple]): Tool name -> (summary metric name, per-row values with None for errors).
+            config (str): Scoring configuration the outputs were produced under.
+            reused (Optional[set]): Indices of rows whose outputs came from the store.
+        """
+        reused = reused or set()
+        scores = []
+        aggregates = []
+        for tool, (metric, column) in values.items():
+            scores.extend((run_id, i, h, tool, metric, v) for i, (h, v) in enumerate(zip(hashes, column)))
+            ok = [v for v in column if v is not None]
+            aggregates.append((run_id, tool, metric, len(ok), float(sum(ok)), min(ok, default=None),
+                               max(ok, default=None), len(column) - len(ok)))
+        outputs = [
+            (h, tool, config, zlib.compress(json.dumps(output).encode("utf-8")))
+            for i, (h, row_result) in enumerate(zip(hashes, results)) if i not in reused
+            for tool, output in row_result.items() if reusable(output)
+        ]
+
+        with self._lock, self._connect() as db:
+            for table in ("runs", "scores", "run_aggregates"):
+                db.execute(f"DELETE FROM {table} WHERE run_id = ?", (run_id,))
+            db.execute(
+                "INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?)",
+                (run_id, time.time(), len(results), len(reused), json.dumps(list(values)), config),
+            )
+            db.executemany("INSERT INTO scores VALUES (?, ?, ?, ?, ?, ?)", scores)
+            db.executemany("INSERT OR REPLACE INTO outputs VALUES (?, ?, ?, ?)", outputs)
+            db.executemany("INSERT INTO run_aggregates VALUES (?, ?, ?, ?, ?, ?, ?, ?)", aggregates)
+
+    def aggregates(self, run_id: str) -> Optional[Dict[tuple, Dict]]:
+        """
+        A run's stored aggregates.
+
+        Returns:
+            Optional[Dict[tuple, Dict]]: (tool, metric) -> {count, sum, min, max, errors}, or None for an unknown run.
+        """
+        with self._connect() as db:
+            if db.execute("SELECT 1 FROM runs WHERE run_id = ?", (run_id,)).fetchone() is None:
+                return None
+            rows = db.execute(
+                "SELECT tool, metric, count, sum, min, max, errors FROM run_aggregates WHERE run_id = ?", (run_id,)
+            ).fetchall()
+        return {
+            (tool, metric): {"count": count, "sum": total, "min": lo, "max": hi, "errors": errors}
+            for tool, metric, count, total, lo, hi, errors in rows
+        }
+
+    def runs(self, limit: int = 20) -> List[Dict]:
+        """The most recent runs, newest first."""
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT run_id, created, rows, reused_rows, metrics FROM runs ORDER BY created DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [
+            {"run_id": run_id, "created": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(created)),
+             "rows": n, "reused_rows": reused, "metrics": json.loads(metrics)}
+            for run_id, created, n, reused, metrics in rows
+        ]
+
+
+def reusable(output: Dict) -> bool:
+    """True if a tool output may be replayed for the same input: not cut short, retryable or an internal failure."""
+    return not (output.get("truncated") or output.get("retry") or output.get("internal"))
+
+
+_default_store: Optional[RunStore] = None
+_default_lock = threading.Lock()
+
+
+def default_store() -> Optional[RunStore]:
+    """The process-wide store at RAG_EVAL_RUN_STORE, or None if the store is disabled."""
+    global _default_store
+    if not RUN_STORE_PATH:
+        return None
+    with _default_lock:
+        if _default_store is None:
+            _default_store = RunStore(RUN_STORE_PATH)
+        return _default_store
+
+
+def compare_runs(run_a: str, run_b: str) -> Dict:
+    """
+    Compare the aggregate scores of two stored batch evaluation runs.
+
+    Reads only the per-run aggregates written with each run, so it answers in milliseconds
+    however many rows the runs contain. Leave both ids empty to list recent runs.
+
+    Args:
+        run_a (str): Baseline run id, as returned by `batch_evaluator`.
+        run_b (str): Run id to compare against the baseline.
+
+    Returns:
+        Dict: A dictionary containing:
+            - 'tool': The name of the tool ("Compare Runs").
+            - 'run_a' / 'run_b': The compared run ids.
+            - 'metrics': Per tool and summary metric: mean in each run, 'delta' (b - a), row counts and errors.
+              Metrics present in only one run have None for the other side.
+        With both ids empty, 'runs' lists the most recent runs instead.
+    """
+    store = default_store()
+    if store is None:
+        return {"error": "The run store is disabled (RAG_EVAL_RUN_STORE is empty)."}
+    if not run_a.strip() and not run_b.strip():
+        return {"tool": "Compare Runs", "runs": store.runs()}
+
+    a = store.aggregates(run_a.strip())
+    b = store.aggregates(run_b.strip())
+    missing = [run_id for run_id, agg in ((run_a, a), (run_b, b)) if agg is None]
+    if missing:
+        return {"error": f"Unknown run: {', '.join(missing)}."}
+
+    def mean(agg: Optional[Dict]) -> Optional[float]:
+        return round(agg["sum"] / agg["count"], 4) if agg and agg["count"] else None
+
+    metrics = []
+    for key in sorted(set(a) | set(b)):
+        mean_a, mean_b = mean(a.get(key)), mean(b.get(key))
+        metrics.append({
+            "tool": key[0],
+            "metric": key[1],
+            "mean_a": mean_a,
+            "mean_b": mean_b,
+            "delta": round(mean_b - mean_a, 4) if mean_a is not None and mean_b is not None else None,
+            "count_a": a[key]["count"] if key in a else None,
+            "count_b": b[key]["count"] if key in b else None,
+            "errors_a": a[key]["errors"] if key in a else None,
+            "errors_b": b[key]["errors"] if key in b else None,
+        })
+    return {"tool": "Compare Runs", "run_a": run_a.strip(), "run_b": run_b.strip(), "metrics": metrics}
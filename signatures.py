@@ -0,0 +1,43 @@
+from typing import Callable, Dict, List, Tuple
+import inspect
+
+
+def add_parameters(fn: Callable, params: List[inspect.Parameter]) -> inspect.Signature:
+    """
+    Return `fn`'s signature with extra keyword-capable parameters appended.
+
+    Wrappers that add per-call options (e.g. `use_cache`) set the result as their
+    `__signature__`, so Gradio builds an input for the option and MCP clients see it.
+
+    Args:
+        fn (Callable): The wrapped function.
+        params (List[inspect.Parameter]): Parameters to append; they need defaults.
+
+    Returns:
+        inspect.Signature: The extended signature.
+    """
+    sig = inspect.signature(fn)
+    existing = list(sig.parameters.values())
+    names = {p.name for p in existing}
+    return sig.replace(parameters=existing + [p for p in params if p.name not in names])
+
+
+def split_options(sig: inspect.Signature, args: Tuple, kwargs: Dict, options: List[str]) -> Tuple[Dict, Dict]:
+    """
+    Bind a call against an extended signature and separate the wrapper's options from the rest.
+
+    Args:
+        sig (inspect.Signature): The extended signature from `add_parameters`.
+        args (Tuple): Positional arguments of the call.
+        kwargs (Dict): Keyword arguments of the call.
+        options (List[str]): Names of the parameters the wrapper consumes.
+
+    Returns:
+        Tuple[Dict, Dict]: (arguments for the wrapped function, option values), both by name
+        with defaults applied.
+    """
+    bound = sig.bind(*args, **kwargs)
+    bound.apply_defaults()
+    call_args = dict(bound.arguments)
+    values = {name: call_args.pop(name) for name in options}
+    return call_args, values
@@ -1,9 +1,60 @@
-from typing import Dict, List
-from sentence_transformers import SentenceTransformer, util
+from itertools import chain
+from typing import Dict, Iterator, List
+import json
 import re
+import time
+
+import numpy as np
+from corpus_registry import CorpusTexts, corpus_aware
+from deadlines import blocks, check
 from retriever_eval_tools import parse_documents
 
-embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
+from embeddings import MINILM, MPNET, cos_sim, encode, scorer
+from metrics import observe_items
+from profiling import profiled, stage
+from responses import column, is_full, pair_columns, rounded, shaped
+
+def parse_generations(generations: str) -> List[str]:
+    """
+    Split newline- or paragraph-separated generations into a list of non-empty strings.
+
+    Args:
+        generations (str): Raw generations string.
+
+    Returns:
+        List[str]: One entry per generation.
+    """
+    with stage("parse_generations"):
+        generation_list = [g.strip() for g in generations.strip().splitlines() if g.strip()]
+    observe_items(len(generation_list))
+    return generation_list
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Split text into sentences on '.', '?' and '!'.
+
+    Args:
+        text (str): Input text.
+
+    Returns:
+        List[str]: Non-empty, stripped sentences.
+    """
+    with stage("split_sentences"):
+        return [s.strip() for s in re.split(r'[.?!]', text) if s.strip()]
+
+def source_sentences(doc_list: List[str]) -> List[str]:
+    """
+    Split source documents into sentences, once per registered corpus.
+
+    Args:
+        doc_list (List[str]): Parsed source documents.
+
+    Returns:
+        List[str]: The sentences of all documents, in order.
+    """
+    if isinstance(doc_list, CorpusTexts):
+        return doc_list.corpus.view("sentences", lambda: split_sentences(" ".join(doc_list)))
+    return split_sentences(" ".join(doc_list))
 
 def relevance_score(query: str, answer: str) -> float:
     """
@@ -16,10 +67,12 @@ def relevance_score(query: str, answer: str) -> float:
     Returns:
         float: Cosine similarity score between query and answer (0 to 1).
     """
-    query_emb = embedding_model.encode(query, convert_to_tensor=True)
-    answer_emb = embedding_model.encode(answer, convert_to_tensor=True)
-    return round(util.cos_sim(query_emb, answer_emb).item(), 4)
+    query_emb = encode(query, MINILM)
+    answer_emb = encode(answer, MINILM)
+    return round(float(cos_sim(query_emb, answer_emb)[0][0]), 4)
 
+@profiled
+@shaped
 def relevance_evaluator(query: str, generations: str) -> Dict:
     """
     Evaluate how relevant each generation is to the given query using cosine similarity.
@@ -29,19 +82,28 @@ def relevance_evaluator(query: str, generations: str) -> Dict:
         generations (str): Newline-separated or paragraph-separated list of generated responses.
 
     Returns:
-        Dict: Relevance scores for each generation and average relevance.
+        Dict: Relevance scores for each generation and average relevance. In compact and binary
+              formats, a 'scores' column in generation order replaces 'query' and 'results'.
     """
-    generation_list = [g.strip() for g in generations.strip().splitlines() if g.strip()]
+    generation_list = parse_generations(generations)
     if not generation_list:
         return {"error": "No valid generations provided."}
 
-    scores = [relevance_score(query, gen) for gen in generation_list]
-    avg_score = round(sum(scores) / len(scores), 4)
+    # One batched encode for all generations instead of one model call per generation.
+    query_emb = encode(query, MINILM)
+    gen_embs = encode(generation_list, MINILM)
+    raw_scores = cos_sim(query_emb, gen_embs)[0]
+    scores = [rounded(score) for score in raw_scores]
+    avg_score = rounded(sum(scores) / len(scores))
 
-    results = [
-        {"generation": gen, "relevance": score}
-        for gen, score in zip(generation_list, scores)
-    ]
+    if not is_full():
+        return {"tool": "System Relevance Evaluator", "average_relevance": avg_score, "scores": column(raw_scores)}
+
+    with stage("postprocess"):
+        results = [
+            {"generation": gen, "relevance": score}
+            for gen, score in zip(generation_list, scores)
+        ]
 
     return {
         "tool": "System Relevance Evaluator",
@@ -50,6 +112,8 @@ def relevance_evaluator(query: str, generations: str) -> Dict:
         "results": results
     }
 
+@profiled
+@shaped
 def coverage_evaluator(_, generations: str) -> Dict:
     """
     Evaluate how diverse the content is across multiple system outputs (coverage proxy).
@@ -59,30 +123,42 @@ def coverage_evaluator(_, generations: str) -> Dict:
         generations (str): Newline-separated or paragraph-separated list of generated outputs.
 
     Returns:
-        Dict: Pairwise cosine similarities and average to estimate content spread.
+        Dict: Pairwise cosine similarities and average to estimate content spread. In compact and
+              binary formats, 'pairs' columns of generation indices (i < j) replace 'pairwise_comparisons'.
     """
-    generation_list = [g.strip() for g in generations.strip().splitlines() if g.strip()]
+    generation_list = parse_generations(generations)
     if len(generation_list) < 2:
         return {"error": "At least two generations required for coverage analysis."}
 
-    emb = embedding_model.encode(generation_list, convert_to_tensor=True)
-    sim_matrix = util.cos_sim(emb, emb)
+    emb = encode(generation_list, MINILM)
+    sim_matrix = cos_sim(emb, emb)
     pairwise = []
     sim_sum = 0.0
     count = 0
 
-    for i in range(len(generation_list)):
-        for j in range(i + 1, len(generation_list)):
-            score = sim_matrix[i][j].item()
-            pairwise.append({
-                "output_i": generation_list[i],
-                "output_j": generation_list[j],
-                "similarity": round(score, 4)
-            })
-            sim_sum += score
-            count += 1
-
-    avg_sim = round(sim_sum / count, 4)
+    if not is_full():
+        with stage("postprocess"):
+            rows, cols = np.triu_indices(len(generation_list), k=1)
+            scores = sim_matrix[rows, cols]
+            return {
+                "tool": "System Coverage Evaluator",
+                "average_pairwise_similarity": rounded(np.mean(scores, dtype=np.float64)),
+                "pairs": pair_columns(rows, cols, scores),
+            }
+
+    with stage("postprocess"):
+        for i in range(len(generation_list)):
+            for j in range(i + 1, len(generation_list)):
+                score = float(sim_matrix[i][j])
+                pairwise.append({
+                    "output_i": generation_list[i],
+                    "output_j": generation_list[j],
+                    "similarity": rounded(score)
+                })
+                sim_sum += score
+                count += 1
+
+    avg_sim = rounded(sim_sum / count)
 
     return {
         "tool": "System Coverage Evaluator",
@@ -93,6 +169,9 @@ def coverage_evaluator(_, generations: str) -> Dict:
 
 
 
+@profiled
+@shaped
+@corpus_aware
 def hallucination_detector(generation: str, source_docs: str) -> Dict:
     """
     Detects hallucinations by comparing generation sentences to source sentences using cosine similarity.
@@ -100,49 +179,281 @@ def hallucination_detector(generation: str, source_docs: str) -> Dict:
 
     Args:
         generation (str): The LLM-generated answer.
-        source_docs (str): Supporting documents (raw string, newline/paragraph/JSON-style list).
+        source_docs (str): Supporting documents (raw string, newline/paragraph/JSON-style list, or a corpus id from `register_corpus`).
 
     Returns:
-        Dict: Hallucination flags and their similarity scores.
+        Dict: Hallucination flags and their similarity scores. In compact and binary formats:
+              'sentences' (count), a 'max_support_scores' column in sentence order and the
+              'hallucinated' sentence indices replace 'results' and 'debug_scores'.
+              If the call's deadline passes part-way, 'truncated' is set and only the first
+              'processed' generation sentences are scored.
     """
-    import re
-    from sentence_transformers import SentenceTransformer, util
-    from retriever_eval_tools import parse_documents
-
-    model = SentenceTransformer("all-mpnet-base-v2")
-
     # Sentence splitting
-    gen_sents = [s.strip() for s in re.split(r'[.?!]', generation) if s.strip()]
+    gen_sents = split_sentences(generation)
     doc_list = parse_documents(source_docs)
-    doc_text = " ".join(doc_list)
-    doc_sents = [s.strip() for s in re.split(r'[.?!]', doc_text) if s.strip()]
+    doc_sents = source_sentences(doc_list)
 
     if not gen_sents:
         return {"error": "No valid generation sentences."}
     if not doc_sents:
         return {"error": "No valid source sentences."}
 
-    gen_embs = model.encode(gen_sents, convert_to_tensor=True)
-    doc_embs = model.encode(doc_sents, convert_to_tensor=True)
+    gen_embs = encode(gen_sents, MPNET)
+    support = scorer(doc_sents, MPNET)
 
-    sim_matrix = util.cos_sim(gen_embs, doc_embs)
     threshold = 0.80
+    max_scores = []
+    # Generation sentences are scored in blocks so a call past its deadline stops between them.
+    for start, end in blocks(len(gen_sents)):
+        max_scores.append(support(gen_embs[start:end]).max(axis=1))
+    max_scores = np.concatenate(max_scores)
+    processed = len(max_scores)
+    partial = {"truncated": True, "processed": processed} if processed < len(gen_sents) else {}
     flagged = []
 
-    for i, gen_sent in enumerate(gen_sents):
-        max_score = max(sim_matrix[i]).item()
-        flagged.append({
-            "sentence": gen_sent,
-            "max_support_score": round(max_score, 4),
-            "hallucinated": max_score < threshold
-        })
+    if not is_full():
+        with stage("postprocess"):
+            return {
+                "tool": "Hallucination Detector",
+                "threshold": threshold,
+                "sentences": len(gen_sents),
+                "max_support_scores": column(max_scores),
+                "hallucinated": column(np.nonzero(max_scores < threshold)[0], "int32"),
+                **partial,
+            }
+
+    with stage("postprocess"):
+        for gen_sent, max_score in zip(gen_sents, max_scores.tolist()):
+            flagged.append({
+                "sentence": gen_sent,
+                "max_support_score": rounded(max_score),
+                "hallucinated": max_score < threshold
+            })
 
     hallucinated_only = [f for f in flagged if f["hallucinated"]]
     return {
         "tool": "Hallucination Detector",
         "threshold": threshold,
         "results": hallucinated_only if hallucinated_only else "No hallucinated sentences detected.",
-        "debug_scores": flagged  # include all scores for manual inspection
+        "debug_scores": flagged,  # include all scores for manual inspection
+        **partial,
     }
 
 
+def parse_generation_list(generations: str) -> List[str]:
+    """
+    Parse generations given as a JSON list of strings, or one per line.
+
+    Args:
+        generations (str): Raw generations string.
+
+    Returns:
+        List[str]: One entry per generation; a JSON list keeps multi-line generations whole.
+    """
+    text = generations.strip()
+    if text.startswith("["):
+        try:
+            parsed = json.loads(text)
+        except ValueError:
+            parsed = None
+        if isinstance(parsed, list):
+            generation_list = [g.strip() for g in parsed if isinstance(g, str) and g.strip()]
+            observe_items(len(generation_list))
+            return generation_list
+    return parse_generations(generations)
+
+
+@profiled
+@shaped
+@corpus_aware
+def batch_hallucination_detector(generations: str, source_docs: str) -> Dict:
+    """
+    Detect hallucinations in many generations (e.g. several sampled answers) against one source set.
+
+    The source sentences are split and encoded once, and the sentences of all generations are
+    encoded in one batch and scored in one similarity pass, so the cost grows with the total
+    number of sentences rather than with calls times source size. Sentences are flagged exactly
+    as `hallucination_detector` flags them.
+
+    Args:
+        generations (str): The LLM-generated answers, as a JSON list of strings or one per line.
+        source_docs (str): Supporting documents (raw string, newline/paragraph/JSON-style list, or a corpus id from `register_corpus`).
+
+    Returns:
+        Dict: A dictionary containing:
+            - 'tool': The name of the tool ("Batch Hallucination Detector").
+            - 'threshold': Support score below which a sentence is flagged.
+            - 'average_hallucination_rate': Mean of the per-generation rates.
+            - 'results': Per generation, in order: the 'generation', its number of 'sentences',
+              its 'hallucination_rate' (flagged / sentences, 0 without sentences) and the
+              'hallucinated' sentences with their 'max_support_score'.
+        In compact and binary formats, columns replace 'results': 'sentences' and
+        'hallucination_rates' per generation, 'max_support_scores' per sentence (all generations'
+        sentences concatenated in order) and the 'hallucinated' indices into that concatenation.
+        If the call's deadline passes part-way, 'truncated' is set and only the first
+        'processed' generations are reported.
+    """
+    generation_list = parse_generation_list(generations)
+    doc_sents = source_sentences(parse_documents(source_docs))
+
+    if not generation_list:
+        return {"error": "No valid generations provided."}
+    if not doc_sents:
+        return {"error": "No valid source sentences."}
+
+    gen_sents = [split_sentences(generation) for generation in generation_list]
+    all_sents = list(chain.from_iterable(gen_sents))
+    if not all_sents:
+        return {"error": "No valid generation sentences."}
+
+    gen_embs = encode(all_sents, MPNET)
+    support = scorer(doc_sents, MPNET)
+
+    threshold = 0.80
+    max_scores = []
+    for start, end in blocks(len(all_sents)):
+        max_scores.append(support(gen_embs[start:end]).max(axis=1))
+    max_scores = np.concatenate(max_scores)
+
+    with stage("postprocess"):
+        counts = np.array([len(sents) for sents in gen_sents])
+        ends = np.cumsum(counts)
+        # Only generations whose sentences were all scored before the deadline are reported.
+        processed = int(np.searchsorted(ends, len(max_scores), side="right"))
+        partial = {"truncated": True, "processed": processed} if processed < len(generation_list) else {}
+        scored = int(ends[processed - 1]) if processed else 0
+        max_scores, counts = max_scores[:scored], counts[:processed]
+        hallucinated = max_scores < threshold
+        owner = np.repeat(np.arange(processed), counts)
+        flagged = np.bincount(owner[hallucinated], minlength=processed)
+        rates = np.divide(flagged, counts, out=np.zeros(processed), where=counts > 0)
+        average = rounded(rates.mean()) if processed else 0.0
+
+        if not is_full():
+            return {
+                "tool": "Batch Hallucination Detector",
+                "threshold": threshold,
+                "average_hallucination_rate": average,
+                "sentences": column(counts, "int32"),
+                "hallucination_rates": column(rates),
+                "max_support_scores": column(max_scores),
+                "hallucinated": column(np.nonzero(hallucinated)[0], "int32"),
+                **partial,
+            }
+
+        results = []
+        for i in range(processed):
+            start = int(ends[i] - counts[i])
+            sentence_flags = [
+                {"sentence": sent, "max_support_score": rounded(score)}
+                for sent, score, flag in zip(gen_sents[i], max_scores[start:ends[i]].tolist(),
+                                             hallucinated[start:ends[i]].tolist())
+                if flag
+            ]
+            results.append({
+                "generation": generation_list[i],
+                "sentences": int(counts[i]),
+                "hallucination_rate": rounded(rates[i]),
+                "hallucinated": sentence_flags if sentence_flags else "No hallucinated sentences detected.",
+            })
+
+    return {
+        "tool": "Batch Hallucination Detector",
+        "threshold": threshold,
+        "average_hallucination_rate": average,
+        "results": results,
+        **partial,
+    }
+
+
+
+
+@profiled
+@shaped
+@corpus_aware
+def hallucination_detector_stream(generation: str, source_docs: str, chunk_size: int = 8) -> Iterator[Dict]:
+    """
+    Streaming variant of the hallucination detector for long generations and large sources.
+
+    Source sentences are encoded once up front; generation sentences are then scored in chunks
+    and each chunk's flags are yielded as soon as they are known, with progress metadata.
+
+    Args:
+        generation (str): The LLM-generated answer.
+        source_docs (str): Supporting documents (raw string, newline/paragraph/JSON-style list, or a corpus id from `register_corpus`).
+        chunk_size (int): Number of generation sentences scored per update.
+
+    Yields:
+        Dict: Partial updates with:
+            - 'tool': The name of the tool ("Hallucination Detector").
+            - 'progress': {'processed', 'total', 'fraction', 'elapsed_s', 'done'}.
+            - 'new_scores': Support scores for the sentences in this chunk.
+        The final update has 'done' set and also carries 'threshold', 'results' and
+        'debug_scores' exactly as `hallucination_detector` returns them. In compact and binary
+        formats, 'new_scores' is {'start', 'max_support_scores', 'hallucinated'} for the chunk and
+        the final update carries the compact fields of `hallucination_detector`.
+        If the call's deadline passes, the stream ends with an {'error', 'truncated'} update
+        after the chunks already sent.
+    """
+    gen_sents = split_sentences(generation)
+    doc_list = parse_documents(source_docs)
+    doc_sents = source_sentences(doc_list)
+
+    if not gen_sents:
+        yield {"error": "No valid generation sentences."}
+        return
+    if not doc_sents:
+        yield {"error": "No valid source sentences."}
+        return
+
+    chunk_size = max(int(chunk_size), 1)
+    total = len(gen_sents)
+    started = time.perf_counter()
+    threshold = 0.80
+    support = scorer(doc_sents, MPNET)
+    flagged = []
+    full = is_full()
+    all_scores = []
+
+    for start in range(0, total, chunk_size):
+        check()
+        chunk = gen_sents[start:start + chunk_size]
+        max_scores = support(encode(chunk, MPNET)).max(axis=1)
+        all_scores.append(max_scores)
+        if full:
+            new_scores = [
+                {"sentence": sent, "max_support_score": rounded(score), "hallucinated": float(score) < threshold}
+                for sent, score in zip(chunk, max_scores)
+            ]
+            flagged.extend(new_scores)
+        else:
+            new_scores = {
+                "start": start,
+                "max_support_scores": column(max_scores),
+                "hallucinated": column(start + np.nonzero(max_scores < threshold)[0], "int32"),
+            }
+
+        processed = start + len(chunk)
+        update = {
+            "tool": "Hallucination Detector",
+            "progress": {
+                "processed": processed,
+                "total": total,
+                "fraction": round(processed / total, 4),
+                "elapsed_s": round(time.perf_counter() - started, 3),
+                "done": processed == total,
+            },
+            "new_scores": new_scores,
+        }
+        if processed == total and full:
+            hallucinated_only = [f for f in flagged if f["hallucinated"]]
+            update["threshold"] = threshold
+            update["results"] = hallucinated_only if hallucinated_only else "No hallucinated sentences detected."
+            update["debug_scores"] = flagged
+        elif processed == total:
+            max_scores = np.concatenate(all_scores)
+            update["threshold"] = threshold
+            update["sentences"] = total
+            update["max_support_scores"] = column(max_scores)
+            update["hallucinated"] = column(np.nonzero(max_scores < threshold)[0], "int32")
+        yield update
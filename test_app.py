@@ -0,0 +1,56 @@
+# test_app.py
+
+import asyncio
+import threading
+
+import app
+
+TOOL = {"name": "test_busy_tool", "model_bound": False, "concurrency_limit": 1, "max_queue": 0}
+
+
+def _blocking_tool(started: threading.Event, release: threading.Event):
+    def tool(query: str) -> dict:
+        started.set()
+        release.wait(5)
+        return {"tool": "Blocking", "query": query}
+    return tool
+
+
+async def _until(event: threading.Event) -> None:
+    while not event.is_set():
+        await asyncio.sleep(0.005)
+
+
+def test_saturated_tool_answers_busy():
+    started, release = threading.Event(), threading.Event()
+    fn = app.offload(TOOL, _blocking_tool(started, release))
+
+    async def main():
+        first = asyncio.ensure_future(fn("first"))
+        await _until(started)
+        busy = await fn("second")
+        release.set()
+        return busy, await first, await fn("third")
+
+    busy, first, third = asyncio.run(main())
+    assert busy["retry"] is True and "at capacity" in busy["error"]
+    assert first == {"tool": "Blocking", "query": "first"}
+    assert third == {"tool": "Blocking", "query": "third"}, "The slot is released once the call returns"
+
+
+def test_queued_call_waits_for_the_slot():
+    started, release = threading.Event(), threading.Event()
+    fn = app.offload(dict(TOOL, max_queue=1), _blocking_tool(started, release))
+
+    async def main():
+        first = asyncio.ensure_future(fn("first"))
+        await _until(started)
+        queued = asyncio.ensure_future(fn("queued"))
+        await asyncio.sleep(0.01)
+        busy = await fn("third")
+        release.set()
+        return busy, await first, await queued
+
+    busy, first, queued = asyncio.run(main())
+    assert "at capacity" in busy["error"]
+    assert first["query"] == "first" and queued["query"] == "queued"
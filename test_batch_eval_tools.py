@@ -0,0 +1,64 @@
+# test_batch_eval_tools.py
+
+import json
+from collections import Counter
+
+import embeddings
+from batch_eval_tools import batch_evaluator
+from embeddings import MINILM, MPNET, get_backend, get_encoder
+from encoders import Encoder
+
+ROWS = [
+    {"query": "What causes rain?",
+     "documents": ["Rain is caused by condensation of water vapor.", "Clouds form when air cools."],
+     "generation": "Rain forms when water vapor condenses. Clouds form when air cools."},
+    {"query": "What causes rain?",
+     "documents": ["Clouds form when air cools.", "The Earth revolves around the sun."],
+     "generation": "Rain forms when water vapor condenses."},
+]
+
+
+class CountingEncoder(Encoder):
+    def __init__(self, encoder):
+        self.encoder = encoder
+        self.name = encoder.name
+        self.dim = encoder.dim
+        self.calls = []
+
+    def encode(self, texts):
+        self.calls.append(list(texts))
+        return self.encoder.encode(texts)
+
+
+def test_each_text_is_encoded_once_across_metrics(monkeypatch):
+    counting = {}
+    for model_name in (MINILM, MPNET):
+        counting[model_name] = CountingEncoder(get_encoder(model_name))
+        monkeypatch.setitem(embeddings._encoders, (get_backend(), model_name), counting[model_name])
+
+    # Both MiniLM-bound tools read the documents; relevance_evaluator adds the queries and generations.
+    metrics = "semantic_relevance_scorer,redundancy_checker,relevance_evaluator,hallucination_detector"
+    result = batch_evaluator("\n".join(json.dumps(row) for row in ROWS), metrics)
+    assert [aggregate["errors"] for aggregate in result["aggregates"].values()] == [0, 0, 0, 0]
+
+    for model_name, encoder in counting.items():
+        encoded = Counter(text for call in encoder.calls for text in call)
+        assert len(encoder.calls) == 1, f"{model_name}: one batch for the whole dataset"
+        assert max(encoded.values()) == 1, f"{model_name}: a text was encoded twice"
+    minilm = set(counting[MINILM].calls[0])
+    assert {"What causes rain?", "Clouds form when air cools.", "Rain forms when water vapor condenses."} <= minilm
+
+
+def test_mistyped_row_fails_alone():
+    lines = [json.dumps(ROWS[0]),
+             json.dumps({"query": "q", "documents": 5, "generation": "g"}),
+             json.dumps({"query": 7, "documents": ["a doc"], "generation": ["one", 2]}),
+             json.dumps(ROWS[1])]
+    result = batch_evaluator("\n".join(lines), "semantic_relevance_scorer,relevance_evaluator")
+    assert "error" not in result and result["rows"] == 4
+    relevance = [row["semantic_relevance_scorer"] for row in result["results"]]
+    assert "error" not in relevance[0] and "error" not in relevance[3]
+    assert relevance[1]["error"] == "Line 2: 'documents' must be a string or a list of strings, not int."
+    assert relevance[2]["error"].startswith("Line 3: ")
+    assert result["aggregates"]["semantic_relevance_scorer"]["errors"] == 2
+    assert result["aggregates"]["semantic_relevance_scorer"]["count"] == 2
@@ -0,0 +1,31 @@
+# test_batch_hallucination.py
+
+import json
+
+from responses import decode
+from system_eval_tools import batch_hallucination_detector, hallucination_detector
+
+SOURCES = (
+    "Albert Einstein was a theoretical physicist known for the theory of relativity.\n"
+    "The light bulb was invented by Thomas Edison in the late 19th century."
+)
+GENERATIONS = [
+    "Albert Einstein developed the theory of relativity.",
+    "Albert Einstein invented the light bulb. The moon is made of cheese. Edison invented the light bulb.",
+    "?!",
+]
+
+
+def test_batch_matches_one_call_per_generation():
+    batch = batch_hallucination_detector(json.dumps(GENERATIONS), SOURCES)
+    assert [r["sentences"] for r in batch["results"]] == [1, 3, 0]
+    for generation, result in zip(GENERATIONS[:2], batch["results"]):
+        single = hallucination_detector(generation, SOURCES)["debug_scores"]
+        flagged = [{"sentence": s["sentence"], "max_support_score": s["max_support_score"]} for s in single if s["hallucinated"]]
+        assert result["hallucinated"] == (flagged or "No hallucinated sentences detected.")
+        assert result["hallucination_rate"] == round(len(flagged) / len(single), 4)
+
+    compact = batch_hallucination_detector(json.dumps(GENERATIONS), SOURCES, response_format="binary")
+    assert decode(compact["sentences"]).tolist() == [1, 3, 0]
+    assert len(decode(compact["max_support_scores"])) == 4
+    assert decode(compact["hallucination_rates"]).round(4).tolist() == [r["hallucination_rate"] for r in batch["results"]]
@@ -0,0 +1,65 @@
+# test_benchmark_eval_tools.py
+
+import time
+
+import pytest
+
+import benchmark_eval_tools
+import run_store
+from benchmark_eval_tools import add_scaling, compare, run_case
+
+
+def _case(tool, size, p50, status="ok"):
+    record = {"tool": tool, "size": size, "status": status}
+    if status == "ok":
+        record["latency_ms"] = {"p50": p50}
+    return record
+
+
+def test_add_scaling_fits_exponent_per_tool():
+    results = [
+        _case("linear", 10, 2.0), _case("quadratic", 10, 1.0),
+        _case("linear", 100, 20.0), _case("quadratic", 100, 100.0),
+        _case("linear", 1000, 0, status="timeout"), _case("quadratic", 1000, 10000.0),
+        _case("linear", 10000, 2000.0),
+    ]
+    add_scaling(results)
+    exponents = {(r["tool"], r["size"]): r.get("scaling_exponent") for r in results}
+    assert exponents == {
+        ("linear", 10): None, ("quadratic", 10): None,
+        ("linear", 100): 1.0, ("quadratic", 100): 2.0,
+        ("linear", 1000): None, ("quadratic", 1000): 2.0,
+        ("linear", 10000): None,  # its predecessor did not finish
+    }
+
+
+def test_compare_flags_slowdowns_and_new_failures():
+    baseline = [_case("a", 10, 10.0), _case("b", 10, 10.0), _case("c", 10, 0.1), _case("d", 10, 10.0),
+                _case("e", 10, 0, status="timeout")]
+    current = [_case("a", 10, 11.9), _case("b", 10, 12.5), _case("c", 10, 0.5), _case("d", 10, 0, status="timeout"),
+               _case("e", 10, 0, status="timeout"), _case("new", 10, 100.0)]
+    regressions = compare(current, baseline, threshold=0.2)
+    assert len(regressions) == 2
+    assert regressions[0].startswith("b @ 10: p50 10.0 ms -> 12.5 ms (+25%)")
+    assert regressions[1] == "d @ 10: was ok, now timeout"
+    assert compare(current, baseline, threshold=0.2, min_ms=0.1)[1].startswith("c @ 10"), "Under min_ms is noise"
+
+
+def test_run_case_times_a_tool_without_recording_runs(tmp_path, monkeypatch):
+    store = tmp_path / "runs.sqlite"
+    monkeypatch.setattr(run_store, "RUN_STORE_PATH", str(store))
+    monkeypatch.setenv("RAG_EVAL_RUN_STORE", str(store))
+
+    record = run_case("batch_evaluator", 3, repeats=2, budget_s=5.0, timeout_s=60.0)
+    assert record["status"] == "ok" and record["runs"] == 2
+    assert 0 < record["latency_ms"]["p50"] <= record["latency_ms"]["p99"]
+    assert record["peak_rss_mb"] >= record["baseline_rss_mb"] > 0
+    assert not store.exists(), "Synthetic benchmark rows must not reach the run store"
+
+
+def test_run_case_kills_a_case_past_its_timeout(monkeypatch):
+    monkeypatch.setitem(benchmark_eval_tools.INPUTS, "exact_match_checker", lambda rng, n: time.sleep(30))
+    started = time.monotonic()
+    record = run_case("exact_match_checker", 10, repeats=1, budget_s=1.0, timeout_s=0.2)
+    assert record == {"tool": "exact_match_checker", "size": 10, "status": "timeout", "timeout_s": 0.2}
+    assert time.monotonic() - started < 10
@@ -0,0 +1,40 @@
+# test_corpus_registry.py
+
+import corpus_registry
+from corpus_registry import CorpusRegistry, register_corpus
+from retriever_eval_tools import bm25_relevance_scorer, semantic_relevance_scorer
+from system_eval_tools import hallucination_detector
+
+DOCUMENTS = """Paris is the capital of France.
+Berlin is in Germany.
+The light bulb was invented by Thomas Edison."""
+
+
+def test_corpus_id_gives_same_results_as_documents():
+    registered = register_corpus(DOCUMENTS)
+    corpus_id = registered["corpus_id"]
+    assert registered["documents"] == 3
+    assert register_corpus(DOCUMENTS)["corpus_id"] == corpus_id, "Same documents should map to the same id"
+
+    for tool in (bm25_relevance_scorer, semantic_relevance_scorer):
+        assert tool("capital of France", corpus_id)["results"] == tool("capital of France", DOCUMENTS)["results"]
+    generation = "Edison invented the light bulb. Paris is in Spain."
+    assert hallucination_detector(generation, corpus_id)["debug_scores"] == hallucination_detector(generation, DOCUMENTS)["debug_scores"]
+
+    assert "error" in bm25_relevance_scorer("capital", "corpus:0000000000000000")
+
+
+def test_eviction_and_persistence(tmp_path, monkeypatch):
+    registry = CorpusRegistry(max_bytes=200, directory=str(tmp_path))
+    first = registry.register(DOCUMENTS.splitlines())
+    first.embeddings("documents")
+    second = registry.register(["An entirely different document set."])
+    second.embeddings("documents")
+
+    assert registry.stats()["corpora"] == 1 and registry.evictions == 1
+    reloaded = registry.get(first.id)
+    assert reloaded is not first and list(reloaded.documents) == list(first.documents)
+    assert (reloaded.embeddings("documents") == first.embeddings("documents")).all()
+
+    monkeypatch.setattr(corpus_registry, "default_registry", CorpusRegistry())
+    assert "error" in bm25_relevance_scorer("capital", first.id)
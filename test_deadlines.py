@@ -0,0 +1,53 @@
+# test_deadlines.py
+
+import numpy as np
+
+import admission
+import deadlines
+from corpus_registry import register_corpus
+from deadlines import Deadline, call_in_scope, with_deadline
+from embeddings import MINILM, cos_sim, encode
+from retriever_eval_tools import redundancy_checker, redundancy_checker_stream
+from tool_registry import get_tool
+
+DOCUMENTS = "\n".join(["The cat sat on the mat.", "The cat sat on the mat!", "Dogs bark at night."] * 5)
+
+
+def test_blocked_redundancy_matches_full_matrix(monkeypatch):
+    monkeypatch.setattr(deadlines, "SIMILARITY_BLOCK", 4)
+    docs = DOCUMENTS.splitlines()
+    embs = encode(docs, MINILM)
+    sim = cos_sim(embs, embs)
+    rows, cols = np.nonzero(np.triu(sim > 0.8, k=1))
+
+    pairs = redundancy_checker("", DOCUMENTS, response_format="compact")["pairs"]
+    assert pairs["i"] == rows.tolist() and pairs["j"] == cols.tolist()
+
+
+def test_expired_deadline_returns_partial_result(monkeypatch):
+    monkeypatch.setattr(deadlines, "SIMILARITY_BLOCK", 4)
+    # A registered corpus is already encoded, so only the similarity blocks are cut short.
+    corpus_id = register_corpus(DOCUMENTS)["corpus_id"]
+    full = redundancy_checker("", corpus_id, response_format="compact")
+    expired = Deadline()
+    expired.cancel()
+
+    result = call_in_scope(expired, redundancy_checker, "", corpus_id, response_format="compact")
+    assert result["truncated"] and result["processed"] == 4 and result["total"] == 15
+    assert all(i < 4 for i in result["pairs"]["i"])
+    assert len(result["pairs"]["i"]) < len(full["pairs"]["i"])
+
+
+def test_cancelled_stream_ends_with_truncated_update():
+    token = Deadline()
+    token.cancel()
+    stream = with_deadline(redundancy_checker_stream)
+    updates = call_in_scope(token, lambda: list(stream("", DOCUMENTS, 4)))
+    assert updates == [{"error": "The call was cancelled.", "truncated": True}]
+
+
+def test_admission_rejects_oversized_inputs():
+    tool = get_tool("redundancy_checker")
+    assert admission.check(tool, {"_": "", "documents": DOCUMENTS}) is None
+    assert admission.check(tool, {"_": "", "documents": DOCUMENTS}, max_pairs=50)["rejected"]
+    assert admission.check(tool, {"_": "", "documents": DOCUMENTS}, max_chars=100)["rejected"]
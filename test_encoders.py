@@ -0,0 +1,45 @@
+# test_encoders.py
+
+import numpy as np
+import pytest
+
+from embeddings import MINILM, cos_sim, encode, get_backend, use_backend
+from encoders import Encoder, HashingEncoder
+from retriever_eval_tools import semantic_relevance_scorer
+
+
+def test_hashing_encoder_is_deterministic():
+    texts = ["Paris is the capital of France.", "The light bulb was invented by Edison."]
+    first = HashingEncoder(dim=384).encode(texts)
+    second = HashingEncoder(dim=384).encode(texts)
+
+    assert first.shape == (2, 384) and first.dtype == np.float32
+    assert np.array_equal(first, second), "Same text should always map to the same vector"
+    assert np.allclose(np.linalg.norm(first, axis=1), 1.0)
+
+
+def test_hashing_encoder_ranks_similar_text_higher():
+    query, close, far = encode([
+        "how does the model scoring protocol work",
+        "The model scoring protocol ranks tool outputs.",
+        "Rain forms when water vapor condenses.",
+    ], MINILM)
+
+    sims = cos_sim(query, np.stack([close, far]))[0]
+    assert sims[0] > sims[1]
+
+
+def test_semantic_tool_runs_on_hashing_backend():
+    with use_backend("hashing"):
+        assert get_backend() == "hashing"
+        result = semantic_relevance_scorer("capital of france", "Paris is the capital of France.\nRain is wet.")
+
+    assert [r["document"] for r in result["results"]][0] == "Paris is the capital of France."
+
+
+def test_incomplete_backend_fails_on_construction():
+    class NoEncode(Encoder):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        NoEncode()
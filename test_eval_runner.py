@@ -0,0 +1,102 @@
+# test_eval_runner.py
+
+import json
+
+import pytest
+
+import eval_runner
+
+ROWS = [
+    {"query": f"question {i}", "documents": [f"answer {i} is here.", "Unrelated text."], "generation": f"answer {i}"}
+    for i in range(10)
+]
+METRICS = ["bm25_relevance_scorer", "exact_match_checker"]
+_evaluate_chunk = eval_runner._evaluate_chunk
+_evaluate_rows = eval_runner.evaluate_rows
+
+
+def crash_on_third_chunk(chunk, metric_names):
+    # Stands in for a worker dying mid-run; it runs in the forked worker, so it must be importable.
+    if chunk[0][0] == 4:
+        raise RuntimeError("killed")
+    return _evaluate_chunk(chunk, metric_names)
+
+
+def fail_on_poison(rows, metric_names):
+    # A row that makes the evaluation itself raise; runs in the forked worker.
+    if any(row["query"] == "poison" for row in rows):
+        raise RuntimeError("poisoned row")
+    return _evaluate_rows(rows, metric_names)
+
+
+def _records(path):
+    # Chunks are written in completion order, which need not be row order.
+    return sorted((json.loads(line) for line in path.read_text().splitlines()), key=lambda r: r["row"])
+
+
+def _run(dataset, output):
+    return eval_runner.run(str(dataset), str(output), METRICS, workers=1, chunk_size=2, encoder="hashing")
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    path = tmp_path / "dataset.jsonl"
+    path.write_text("".join(json.dumps(row) + "\n" for row in ROWS))
+    return path
+
+
+def test_resumed_run_matches_uninterrupted_run(tmp_path, dataset, monkeypatch):
+    expected = tmp_path / "expected.jsonl"
+    _run(dataset, expected)
+
+    output = tmp_path / "output.jsonl"
+    monkeypatch.setattr(eval_runner, "_evaluate_chunk", crash_on_third_chunk)
+    with pytest.raises(RuntimeError):
+        _run(dataset, output)
+    monkeypatch.undo()
+    # A kill can also land while a chunk or its checkpoint entry is half written.
+    with open(output, "a") as f:
+        f.write('{"row": 4, "bm25_rel')
+    with open(str(output) + ".ckpt", "a") as f:
+        f.write('{"chunk": 2, "off')
+
+    summary = _run(dataset, output)
+    # Chunk 2 is only submitted once a chunk is written; chunks finishing with it may be written before it fails.
+    assert summary["resumed_chunks"] >= 1 and summary["rows"] == 10 - 2 * summary["resumed_chunks"]
+    assert _records(output) == _records(expected)
+
+
+def test_checkpoint_without_output_starts_over(tmp_path, dataset):
+    output = tmp_path / "output.jsonl"
+    _run(dataset, output)
+    expected = _records(output)
+
+    output.unlink()
+    summary = _run(dataset, output)
+    assert summary == {"chunks": 5, "rows": 10, "resumed_chunks": 0}
+    assert _records(output) == expected
+
+    with open(output, "r+") as f:
+        f.truncate(len(f.read()) // 2)
+    assert _run(dataset, output)["resumed_chunks"] == 0
+    assert _records(output) == expected
+
+
+def test_poisoned_row_does_not_fail_the_run(tmp_path, monkeypatch):
+    rows = [dict(row) for row in ROWS]
+    rows[5]["query"] = "poison"
+    lines = [json.dumps(row) for row in rows]
+    lines[7] = "not json"
+    dataset = tmp_path / "dataset.jsonl"
+    dataset.write_text("\n".join(lines) + "\n")
+    monkeypatch.setattr(eval_runner, "evaluate_rows", fail_on_poison)
+
+    output = tmp_path / "output.jsonl"
+    assert _run(dataset, output) == {"chunks": 5, "rows": 10, "resumed_chunks": 0}
+    records = _records(output)
+    assert [r["row"] for r in records] == list(range(10))
+    assert records[5] == {"row": 5, "error": "RuntimeError: poisoned row"}
+    assert "error" in records[7]
+    assert all("error" not in r for i, r in enumerate(records) if i not in (5, 7))
+    assert set(records[4]) == {"row", *METRICS}, "The poisoned row's chunk partner is still scored"
+    assert _run(dataset, output)["rows"] == 0, "The checkpoint moved past the bad rows"
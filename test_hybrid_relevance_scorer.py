@@ -0,0 +1,29 @@
+# test_hybrid_relevance_scorer.py
+
+from retriever_eval_tools import bm25_relevance_scorer, hybrid_relevance_scorer, semantic_relevance_scorer
+
+DOCUMENTS = """Rain is caused by condensation of water vapor.
+The Earth revolves around the sun.
+Paris is the capital of France.
+Water evaporates and returns as rain."""
+
+
+def test_hybrid_matches_single_signal_tools():
+    result = hybrid_relevance_scorer("What causes rain?\nWhere is Paris?", DOCUMENTS)
+    assert [r["query"] for r in result["results"]] == ["What causes rain?", "Where is Paris?"]
+
+    for entry in result["results"]:
+        bm25 = [r["score"] for r in bm25_relevance_scorer(entry["query"], DOCUMENTS)["results"]]
+        semantic = [r["score"] for r in semantic_relevance_scorer(entry["query"], DOCUMENTS)["results"]]
+        by_index = {d["index"]: d for d in entry["documents"]}
+        assert [by_index[i]["bm25"] for i in range(4)] == bm25
+        assert [by_index[i]["semantic"] for i in range(4)] == semantic
+        rrf = [d["rrf"] for d in entry["documents"]]
+        assert rrf == sorted(rrf, reverse=True)
+
+
+def test_hybrid_top_k_and_weights():
+    result = hybrid_relevance_scorer("Where is Paris?", DOCUMENTS, semantic_weight=0.0, fusion="weighted", top_k=1)
+    top = result["results"][0]["documents"]
+    assert len(top) == 1 and top[0]["document"] == "Paris is the capital of France."
+    assert top[0]["weighted"] == 1.0
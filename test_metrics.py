@@ -0,0 +1,61 @@
+# test_metrics.py
+
+import re
+import time
+
+import metrics
+from deadlines import check, with_deadline
+from metrics import LATENCY_BUCKETS, instrument
+
+
+def succeeds(query: str) -> dict:
+    return {"tool": "Succeeds", "length": len(query)}
+
+
+def fails(query: str) -> dict:
+    return {"error": "No query provided."}
+
+
+def times_out(query: str) -> dict:
+    time.sleep(0.02)
+    check()
+    return {"tool": "Times Out"}
+
+
+def _series(text, name):
+    # {labels: value} for every sample of `name` in the exposition text.
+    pattern = re.compile(r"^" + re.escape(name) + r"(\{[^}]*\})? (\S+)$", re.M)
+    return {labels or "": float(value) for labels, value in pattern.findall(text)}
+
+
+def test_render_counts_outcomes_and_buckets_latency():
+    ok = instrument("test_metrics_ok", succeeds)
+    error = instrument("test_metrics_error", fails)
+    timeout = instrument("test_metrics_timeout", with_deadline(times_out))
+    for query in ("a", "bb", "ccc"):
+        assert ok(query)["tool"] == "Succeeds"
+    assert "error" in error("")
+    assert timeout("q", deadline_s=0.001)["truncated"]
+
+    text = metrics.render()
+    assert "# TYPE rag_eval_tool_requests_total counter" in text
+    assert "# TYPE rag_eval_tool_latency_seconds histogram" in text
+    requests = _series(text, "rag_eval_tool_requests_total")
+    assert requests['{status="ok",tool="test_metrics_ok"}'] == 3
+    assert requests['{status="error",tool="test_metrics_error"}'] == 1
+    assert requests['{status="timeout",tool="test_metrics_timeout"}'] == 1
+    assert not any("test_metrics_ok" in labels and "ok" not in labels for labels in requests)
+
+    buckets = _series(text, "rag_eval_tool_latency_seconds_bucket")
+    ok_buckets = [(labels, value) for labels, value in buckets.items() if 'tool="test_metrics_ok"' in labels]
+    assert [re.search(r'le="([^"]+)"', labels).group(1) for labels, _ in ok_buckets] == [str(b) for b in LATENCY_BUCKETS] + ["+Inf"]
+    counts = [value for _, value in ok_buckets]
+    assert counts == sorted(counts), "Buckets are cumulative"
+    assert counts[0] == 3, "Three near-instant calls land in the smallest bucket"
+    assert _series(text, "rag_eval_tool_latency_seconds_count")['{tool="test_metrics_ok"}'] == counts[-1] == 3
+    timeout_buckets = {labels: value for labels, value in buckets.items() if 'tool="test_metrics_timeout"' in labels}
+    assert timeout_buckets['{tool="test_metrics_timeout",le="0.01"}'] == 0, "It slept 20ms before stopping"
+    assert timeout_buckets['{tool="test_metrics_timeout",le="+Inf"}'] == 1
+    assert _series(text, "rag_eval_tool_input_chars_sum")['{tool="test_metrics_ok"}'] == 6
+    assert "rag_eval_tool_max_rss_bytes" not in text, "Peak RSS is process-wide, not per tool"
+    assert _series(text, "rag_eval_process_max_rss_bytes")[""] > 0
@@ -0,0 +1,98 @@
+# test_monitoring.py
+
+import json
+import time
+
+import numpy as np
+
+import monitoring
+from batch_eval_tools import parse_record
+from monitoring import Monitor, QuantileSketch
+
+RECORD = {
+    "query": "What causes rain?",
+    "documents": ["Rain is caused by condensation of water vapor.", "Rain is caused by condensation of water vapor."],
+    "generation": "Rain forms when water vapor condenses. The moon is made of cheese.",
+}
+
+
+def test_sketch_quantiles_are_within_relative_error():
+    values = np.random.default_rng(0).uniform(-1, 1, 20000)
+    sketch, halves = QuantileSketch(), [QuantileSketch(), QuantileSketch()]
+    for i, value in enumerate(values.tolist()):
+        sketch.add(value)
+        halves[i % 2].add(value)
+    halves[0].merge(halves[1])
+    for q in (0.1, 0.5, 0.9, 0.99):
+        exact = float(np.quantile(values, q))
+        assert abs(sketch.quantile(q) - exact) <= 0.02 * abs(exact) + 1e-3
+        assert halves[0].quantile(q) == sketch.quantile(q), "Merged sketches match one sketch of all values"
+
+
+def test_monitor_aggregates_sampled_records_and_pushes_back():
+    # Not started: nothing drains the queue, so the third record finds it full.
+    idle = Monitor(queue_size=2, sample_rates={"relevance_evaluator": 1.0})
+    outcomes = idle.push([RECORD, RECORD, RECORD, "not a record"])
+    assert outcomes["accepted"] == 2 and outcomes["rejected"] == 2
+
+    monitor = Monitor(sample_rates={"relevance_evaluator": 1.0, "hallucination_detector": 1.0,
+                                    "redundancy_checker": 0.0}).start()
+    assert monitor.push([RECORD] * 5 + ["not a record"])["invalid"] == 1
+    assert monitor.wait_idle()
+    stats = monitor.stats(60)
+    assert stats["metrics"]["relevance_evaluator"]["count"] == 5
+    hallucination = stats["metrics"]["hallucination_detector"]
+    assert hallucination["summary"] == "hallucination_rate" and hallucination["p50"] == hallucination["mean"]
+    assert stats["metrics"]["redundancy_checker"]["count"] == 0
+    assert stats["ingestion"]["evaluated"] == 10 and stats["ingestion"]["backlog"] == 0
+
+
+def test_out_of_order_window_at_capacity_is_kept():
+    monitor = Monitor(sample_rates={"relevance_evaluator": 1.0}, window_s=10, windows=2)
+    sampled = ("relevance_evaluator",)
+    row = parse_record(RECORD)
+    for timestamp in (100.0, 110.0, 95.0):
+        monitor._evaluate([(timestamp, 0.0, row, sampled)])
+    assert list(monitor._windows) == [90.0, 110.0], "The closed window is evicted, not the one just written"
+    assert monitor._windows[90.0]["relevance_evaluator"].count == 1
+    assert monitor.counts["evaluated"] == 3
+
+
+def test_tailer_survives_unreadable_trace(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    path.mkdir()  # stat works, open fails
+    monitor = Monitor(sample_rates={"relevance_evaluator": 0.0}).tail(str(path), from_start=True, poll_s=0.01)
+
+    deadline = time.monotonic() + 10
+    while "error" not in (monitor.stats()["tail"] or {}) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert monitor.stats()["tail"]["error"].startswith("IsADirectoryError")
+
+    path.rmdir()
+    path.write_text(json.dumps(RECORD) + "\n" + json.dumps(RECORD) + "\n")
+    while monitor.counts["received"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert monitor.counts["received"] == 2
+    assert "error" not in monitor.stats()["tail"]
+
+
+def test_bad_records_are_dropped_without_costing_good_ones(monkeypatch):
+    monitor = Monitor(sample_rates={"relevance_evaluator": 1.0, "hallucination_detector": 0.0,
+                                    "redundancy_checker": 0.0})
+    now = time.time()
+    outcomes = monitor.push([RECORD, dict(RECORD, query=7), dict(RECORD, timestamp=now * 1000),
+                             dict(RECORD, timestamp=now + 30)])
+    assert outcomes == {"accepted": 2, "rejected": 0, "unsampled": 0, "invalid": 1, "late": 0, "future": 1}
+
+    evaluate_rows = monitoring.evaluate_rows
+
+    def fails_on_boom(rows, metric_names):
+        if any(row["query"] == "boom" for row in rows):
+            raise RuntimeError("boom")
+        return evaluate_rows(rows, metric_names)
+
+    monkeypatch.setattr(monitoring, "evaluate_rows", fails_on_boom)
+    sampled = ("relevance_evaluator",)
+    rows = [parse_record(RECORD), parse_record(dict(RECORD, query="boom")), parse_record(RECORD)]
+    monitor._evaluate([(now, 0.0, row, sampled) for row in rows])
+    assert monitor.counts["evaluated"] == 2 and monitor.counts["failed"] == 1
@@ -0,0 +1,70 @@
+# test_profiling.py
+
+import re
+
+from profiling import profiled
+from retriever_eval_tools import redundancy_checker_stream, semantic_relevance_scorer
+
+QUERY = "What causes rain?"
+DOCUMENTS = "Rain is caused by condensation of water vapor.\n\nThe Earth revolves around the sun.\n\nClouds are made of water."
+
+
+def _without_timing(update):
+    # Wall-clock fields differ between any two runs.
+    update = {k: v for k, v in update.items() if k != "timings"}
+    if "progress" in update:
+        update["progress"] = {k: v for k, v in update["progress"].items() if k != "elapsed_s"}
+    return update
+
+
+def test_profile_attaches_timings_without_changing_the_result():
+    plain = semantic_relevance_scorer(QUERY, DOCUMENTS)
+    assert "timings" not in plain
+
+    profiled = semantic_relevance_scorer(QUERY, DOCUMENTS, profile=True)
+    timings = profiled.pop("timings")
+    assert profiled == plain
+    assert {"parse_documents", "encode", "similarity"} <= set(timings["stages_ms"])
+    assert timings["counts"]["encoded_texts"] == 4
+    assert timings["total_ms"] >= sum(timings["stages_ms"].values()) * 0.99
+    assert timings["serialization_bytes"] > 0
+    assert "cprofile" not in timings
+
+
+def test_profile_top_n_limits_the_cprofile_listing():
+    timings = semantic_relevance_scorer(QUERY, DOCUMENTS, profile=True, profile_top_n=3)["timings"]
+    rows = re.findall(r"^\s+\d+(?:/\d+)?\s+[\d.]+\s+[\d.]+\s+[\d.]+\s+[\d.]+ \S", timings["cprofile"], re.M)
+    assert len(rows) == 3
+    assert "restriction <3>" in timings["cprofile"]
+
+
+def test_streams_attach_timings_to_the_final_update_only():
+    updates = list(redundancy_checker_stream("_", DOCUMENTS, chunk_size=1, profile=True))
+    assert len(updates) > 1
+    assert all("timings" not in update for update in updates[:-1])
+    assert "encode" in updates[-1]["timings"]["stages_ms"]
+    plain = list(redundancy_checker_stream("_", DOCUMENTS, chunk_size=1))
+    assert [_without_timing(update) for update in updates] == [_without_timing(update) for update in plain]
+
+
+def test_profiled_streams_do_not_hold_updates_back():
+    produced = []
+
+    @profiled
+    def stream(n: int):
+        for i in range(n):
+            produced.append(i)
+            yield {"progress": {"processed": i + 1, "done": i + 1 == n}}
+
+    updates = stream(3, profile=True)
+    assert next(updates)["progress"]["processed"] == 1
+    assert produced == [0], "The first update is sent before the second is computed"
+    rest = list(updates)
+    assert "timings" in rest[-1] and len(rest) == 2
+
+    @profiled
+    def failing(_: str):
+        yield {"error": "At least two documents are required."}
+
+    assert list(failing("x", profile=True))[0] == {"error": "At least two documents are required."}
+    assert list(failing("x", profile=True))[1].keys() == {"timings"}
@@ -0,0 +1,68 @@
+# test_quantization.py
+
+import numpy as np
+
+import corpus_registry
+import quantization
+from corpus_registry import CorpusRegistry, register_corpus
+from embeddings import MINILM, encode
+from quantization import QuantizedMatrix, normalize
+from retriever_eval_tools import redundancy_checker, redundancy_checker_stream, semantic_relevance_scorer
+
+DOCUMENTS = [f"Document {i} is about topic {i % 7} and subject {i % 11}." for i in range(200)]
+
+
+def test_compact_storage_size_and_error(tmp_path):
+    embs = encode(DOCUMENTS, MINILM)
+    exact = normalize(embs[:5]) @ normalize(embs).T
+    path = str(tmp_path / "exact.npy")
+    np.save(path, embs)
+
+    for precision, ratio, tolerance in (("float16", 2, 1e-3), ("int8", 4, 1e-2)):
+        matrix = QuantizedMatrix(embs, precision)
+        assert matrix.report(embs)["compression"] >= ratio * 0.95
+        assert np.abs(matrix.similarity(embs[:5]) - exact).max() < tolerance
+
+    binary = QuantizedMatrix(embs, "binary", exact_path=path)
+    assert binary.nbytes < embs.nbytes / 16
+    scores = binary.similarity(embs[:5], rescore_k=20)
+    # Rescored candidates carry exact scores; the rest are capped at the lowest of them.
+    top = np.argsort(-scores, axis=1)[:, :10]
+    assert np.allclose(np.take_along_axis(scores, top, 1), np.take_along_axis(exact, top, 1), atol=1e-5)
+    assert (top[:, 0] == np.arange(5)).all(), "A stored document is its own best match"
+
+
+def test_corpus_uses_configured_storage(monkeypatch):
+    monkeypatch.setattr(corpus_registry, "default_registry", CorpusRegistry(storage="int8"))
+    registered = register_corpus("\n".join(DOCUMENTS))
+    assert registered["storage"]["precision"] == "int8" and registered["storage"]["compression"] > 3.8
+
+    query = "Document 17 is about topic 3"
+    compact = semantic_relevance_scorer(query, registered["corpus_id"], response_format="compact")["scores"]
+    exact = semantic_relevance_scorer(query, "\n".join(DOCUMENTS), response_format="compact")["scores"]
+    assert int(np.argmax(compact)) == int(np.argmax(exact))
+    assert np.allclose(compact, exact, atol=1e-3)
+
+
+def test_redundancy_on_binary_corpus_matches_float32(monkeypatch):
+    docs = [f"Document {i % 40} is about topic {i % 7} and subject {i % 11}." for i in range(120)]
+    flagged = {}
+    for storage in ("float32", "binary"):
+        monkeypatch.setattr(corpus_registry, "default_registry", CorpusRegistry(storage=storage))
+        corpus_id = register_corpus("\n".join(docs), True)["corpus_id"]
+        pairs = redundancy_checker("_", corpus_id, response_format="compact")["pairs"]
+        streamed = list(redundancy_checker_stream("_", corpus_id, chunk_size=16, response_format="compact"))[-1]["pairs"]
+        assert (streamed["i"], streamed["j"]) == (pairs["i"], pairs["j"])
+        assert np.allclose(streamed["similarity"], pairs["similarity"], atol=1e-3)
+        flagged[storage] = pairs
+    assert flagged["float32"]["i"], "The corpus has redundant pairs"
+    assert (flagged["binary"]["i"], flagged["binary"]["j"]) == (flagged["float32"]["i"], flagged["float32"]["j"])
+    assert np.allclose(flagged["binary"]["similarity"], flagged["float32"]["similarity"], atol=1e-3)
+
+
+def test_binary_scores_without_bitwise_count(monkeypatch):
+    embs = encode(DOCUMENTS, MINILM)
+    binary = QuantizedMatrix(embs, "binary")
+    expected = binary.approximate(embs[:5])
+    monkeypatch.setattr(quantization, "_bitwise_count", None)  # NumPy 1.x
+    assert np.array_equal(binary.approximate(embs[:5]), expected)
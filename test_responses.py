@@ -0,0 +1,30 @@
+# test_responses.py
+
+import numpy as np
+
+from responses import decode
+from retriever_eval_tools import bm25_relevance_scorer, redundancy_checker
+
+
+DOCUMENTS = "Apples are red.\nApples are red and juicy.\nOranges are orange in color.\nApples are red."
+
+
+def test_compact_and_binary_match_full_scores():
+    full = bm25_relevance_scorer("red apples", DOCUMENTS)
+    compact = bm25_relevance_scorer("red apples", DOCUMENTS, response_format="compact")
+    binary = bm25_relevance_scorer("red apples", DOCUMENTS, response_format="binary")
+
+    assert compact["format"] == "compact" and "results" not in compact
+    assert compact["scores"] == [r["score"] for r in full["results"]]
+    assert np.allclose(decode(binary["scores"]), compact["scores"])
+
+
+def test_compact_pairs_are_index_columns():
+    full = redundancy_checker("_", DOCUMENTS, precision=2)
+    compact = redundancy_checker("_", DOCUMENTS, response_format="compact", precision=2)
+    docs = DOCUMENTS.splitlines()
+
+    pairs = list(zip(compact["pairs"]["i"], compact["pairs"]["j"], compact["pairs"]["similarity"]))
+    assert [(docs[i], docs[j], s) for i, j, s in pairs] == [
+        (r["doc_i"], r["doc_j"], r["similarity"]) for r in full["results"]
+    ]
@@ -0,0 +1,106 @@
+# test_result_cache.py
+
+import asyncio
+import threading
+import time
+
+from result_cache import ResultCache, cached
+
+
+def test_cache_hits_and_bypass():
+    calls = []
+
+    def tool(query: str, documents: str):
+        calls.append(query)
+        return {"query": query}
+
+    cache = ResultCache(max_entries=8, ttl=60)
+    wrapped = cached("tool", tool, cache)
+
+    assert wrapped("q", "docs") == {"query": "q"}
+    assert wrapped("q", "docs\r\n") == {"query": "q"}, "Whitespace-only differences should hit"
+    assert wrapped("q", "docs", use_cache=False) == {"query": "q"}
+    assert len(calls) == 2
+
+    totals = cache.stats()["totals"]
+    assert totals["hits"] == 1 and totals["misses"] == 1 and totals["bypassed"] == 1
+
+
+def test_cache_lru_and_ttl():
+    cache = ResultCache(max_entries=2, ttl=0.05)
+    wrapped = cached("tool", lambda x: {"x": x}, cache)
+
+    for x in ["a", "b", "c"]:
+        wrapped(x)
+    assert cache.stats()["totals"]["evictions"] == 1
+
+    time.sleep(0.06)
+    wrapped("c")
+    assert cache.stats()["totals"]["expirations"] == 1
+
+
+def test_concurrent_identical_calls_are_coalesced():
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow(x):
+        calls.append(x)
+        started.set()
+        release.wait(5)
+        return {"x": x}
+
+    cache = ResultCache()
+    wrapped = cached("slow", slow, cache)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(wrapped("same"))) for _ in range(4)]
+    threads[0].start()
+    started.wait(5)
+    for t in threads[1:]:
+        t.start()
+    time.sleep(0.05)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert calls == ["same"], "Only the first call should compute"
+    assert len(results) == 4 and all(r == {"x": "same"} for r in results)
+    assert cache.stats()["totals"]["coalesced"] == 3
+
+
+def test_retryable_results_are_not_cached():
+    cache = ResultCache()
+    wrapped = cached("busy", lambda x: {"error": "busy", "retry": True}, cache)
+    wrapped("a")
+    wrapped("a")
+    assert cache.stats()["totals"]["misses"] == 2
+
+
+def test_cancelled_callers_do_not_cancel_coalesced_calls():
+    calls = []
+
+    async def slow(x):
+        calls.append(x)
+        await asyncio.sleep(0.05)
+        return {"x": x}
+
+    async def scenario(cancel_index):
+        wrapped = cached("slow", slow, ResultCache())
+        tasks = [asyncio.ensure_future(wrapped("same"))]
+        await asyncio.sleep(0.01)
+        tasks += [asyncio.ensure_future(wrapped("same")) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        tasks[cancel_index].cancel()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        return [r for i, r in enumerate(results) if i != cancel_index], results[cancel_index]
+
+    # A cancelled waiter: the leader and the other waiters still get the result.
+    others, cancelled = asyncio.run(scenario(1))
+    assert isinstance(cancelled, asyncio.CancelledError)
+    assert others == [{"x": "same"}] * 3 and calls == ["same"]
+
+    # A cancelled leader: its waiters compute the result again instead of inheriting the cancellation.
+    calls.clear()
+    others, cancelled = asyncio.run(scenario(0))
+    assert isinstance(cancelled, asyncio.CancelledError)
+    assert others == [{"x": "same"}] * 3 and calls == ["same", "same"]
@@ -0,0 +1,44 @@
+# test_retrieval_metrics.py
+
+import json
+
+from responses import decode
+from retriever_eval_tools import retrieval_metrics_evaluator
+
+RANKINGS = {"q1": ["d3", "d1", "d7"], "q2": ["d2", "d5", "d4"], "q3": ["d9"]}
+QRELS = {"q1": {"d1": 2, "d7": 1}, "q2": {"d4": 1}, "q3": {"d8": 0}}
+
+
+def test_metrics_against_hand_computed_values():
+    result = retrieval_metrics_evaluator(json.dumps(RANKINGS), json.dumps(QRELS), "1,3")
+    # q3 has no relevant document, so only q1 and q2 are evaluated.
+    assert result["queries"] == 2 and result["unlabeled_queries"] == 1
+    q1, q2 = result["per_query"]
+    assert q1["query"] == "q1" and q1["mrr"] == 0.5 and q2["mrr"] == round(1 / 3, 4)
+    assert q1["recall@3"] == 1.0 and q1["precision@3"] == round(2 / 3, 4) and q1["recall@1"] == 0.0
+    assert q1["map"] == round((1 / 2 + 2 / 3) / 2, 4)
+    # DCG = 2/log2(3) + 1/log2(4); ideal = 2 + 1/log2(3).
+    assert q1["ndcg@3"] == round((2 / 1.5849625 + 0.5) / (2 + 1 / 1.5849625), 4)
+    assert result["metrics"]["mrr"] == round((0.5 + 1 / 3) / 2, 4)
+
+
+def test_trec_formats_and_compact_columns():
+    run = "\n".join(f"{q} Q0 {d} {r + 1} {10 - r} run" for q, docs in RANKINGS.items() for r, d in enumerate(docs))
+    qrels = "\n".join(f"{q} 0 {d} {g}" for q, labels in QRELS.items() for d, g in labels.items())
+    full = retrieval_metrics_evaluator(json.dumps(RANKINGS), json.dumps(QRELS), "1,3")
+    compact = retrieval_metrics_evaluator(run, qrels, "1,3", response_format="binary")
+    assert compact["metrics"] == full["metrics"]
+    assert [round(v, 4) for v in decode(compact["per_query"]["map"]).tolist()] == [q["map"] for q in full["per_query"]]
+    assert "error" in retrieval_metrics_evaluator("{}", json.dumps(QRELS))
+    assert "error" in retrieval_metrics_evaluator(json.dumps(RANKINGS), json.dumps(QRELS), "0")
+
+
+def test_duplicate_documents_count_once():
+    rankings = {"q1": ["d1", "d1", "d3", "d7", "d7", "d1"]}
+    result = retrieval_metrics_evaluator(json.dumps(rankings), json.dumps({"q1": {"d1": 2, "d7": 1}}), "1,3,5")
+    deduped = retrieval_metrics_evaluator(json.dumps({"q1": ["d1", "d3", "d7"]}),
+                                          json.dumps({"q1": {"d1": 2, "d7": 1}}), "1,3,5")
+    assert result["per_query"] == deduped["per_query"]
+    q1 = result["per_query"][0]
+    assert q1["recall@5"] == 1.0 and q1["map"] == round((1 + 2 / 3) / 2, 4)
+    assert all(value <= 1.0 for key, value in q1.items() if key != "query")
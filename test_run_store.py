@@ -0,0 +1,77 @@
+# test_run_store.py
+
+import json
+
+import batch_eval_tools
+import run_store
+from batch_eval_tools import batch_evaluator
+from deadlines import Deadline, call_in_scope, with_deadline
+from run_store import RunStore, compare_runs
+
+ROWS = [
+    {"query": "What causes rain?", "documents": ["Rain is caused by condensation of water vapor.", "The Earth revolves around the sun."],
+     "generation": "Rain forms when water vapor condenses."},
+    {"query": "capital of France", "documents": ["Paris is the capital of France.", "Berlin is in Germany."],
+     "generation": "Paris is the capital of France. It is in Italy."},
+]
+
+
+def test_reruns_reuse_rows_and_compare(tmp_path, monkeypatch):
+    store = RunStore(str(tmp_path / "runs.sqlite"))
+    monkeypatch.setattr(run_store, "default_store", lambda: store)
+    monkeypatch.setattr(batch_eval_tools, "default_store", lambda: store)
+    dataset = "\n".join(json.dumps(row) for row in ROWS)
+    metrics = "bm25_relevance_scorer,exact_match_checker"
+
+    first = batch_evaluator(dataset, metrics, run_id="v1")
+    assert first["run_id"] == "v1" and first["reused_rows"] == 0
+
+    edited = dict(ROWS[1], query="largest city in Germany")
+    second = batch_evaluator("\n".join([json.dumps(ROWS[0]), json.dumps(edited)]), metrics, run_id="v2")
+    assert second["reused_rows"] == 1
+    assert second["results"][0]["bm25_relevance_scorer"] == first["results"][0]["bm25_relevance_scorer"]
+
+    comparison = compare_runs("v1", "v2")
+    by_tool = {m["tool"]: m for m in comparison["metrics"]}
+    assert by_tool["exact_match_checker"]["mean_a"] == first["aggregates"]["exact_match_checker"]["mean"]
+    assert by_tool["exact_match_checker"]["delta"] == round(
+        second["aggregates"]["exact_match_checker"]["mean"] - first["aggregates"]["exact_match_checker"]["mean"], 4)
+    assert "error" in compare_runs("v1", "missing")
+    assert [r["run_id"] for r in compare_runs("", "")["runs"]] == ["v2", "v1"]
+
+
+def test_partial_runs_are_flagged_and_not_stored(tmp_path, monkeypatch):
+    store = RunStore(str(tmp_path / "runs.sqlite"))
+    monkeypatch.setattr(batch_eval_tools, "default_store", lambda: store)
+    metric = dict(batch_eval_tools.METRICS["exact_match_checker"])
+    token = Deadline()
+    calls = []
+
+    def cancel_during_third_row(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 3:
+            token.cancel()
+        return batch_eval_tools.exact_match_checker(*args, **kwargs)
+
+    metric["fn"] = cancel_during_third_row
+    monkeypatch.setitem(batch_eval_tools.METRICS, "exact_match_checker", metric)
+    dataset = "\n".join(json.dumps(row) for row in ROWS * 3)
+    result = call_in_scope(token, with_deadline(batch_evaluator), dataset, "exact_match_checker,bm25_relevance_scorer",
+                           run_id="partial")
+
+    assert result["truncated"] and result["processed"] == 3 and len(result["results"]) == 3
+    assert result["aggregates"]["exact_match_checker"]["count"] == 3
+    assert "run_id" not in result and "error" in compare_runs("partial", "partial")
+
+
+def test_reruns_with_every_metric_reuse_validation_errors(tmp_path, monkeypatch):
+    store = RunStore(str(tmp_path / "runs.sqlite"))
+    monkeypatch.setattr(batch_eval_tools, "default_store", lambda: store)
+    dataset = "\n".join(json.dumps(row) for row in ROWS)
+
+    # Single generations make coverage and diversity answer with a validation error every time.
+    first = batch_evaluator(dataset)
+    assert "error" in first["results"][0]["coverage_evaluator"]
+    second = batch_evaluator(dataset)
+    assert second["reused_rows"] == len(ROWS)
+    assert second["aggregates"] == first["aggregates"]
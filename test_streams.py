@@ -0,0 +1,76 @@
+# test_streams.py
+
+import json
+
+import pytest
+
+from retriever_eval_tools import redundancy_checker, redundancy_checker_stream
+from system_eval_tools import hallucination_detector, hallucination_detector_stream
+
+DOCUMENTS = [
+    "Rain is caused by condensation of water vapor.",
+    "The Earth revolves around the sun.",
+    "Rain is caused by condensation of water vapor.",
+    "Clouds form when moist air cools.",
+    "Mount Everest is the highest mountain.",
+    "The Earth revolves around the sun.",
+    "Clouds form when moist air cools down.",
+    "Paris is the capital of France.",
+    "Rain is caused by the condensation of water vapor.",
+    "Berlin is the capital of Germany.",
+]
+GENERATION = " ".join([
+    "Rain is caused by condensation of water vapor.",
+    "The moon is made of cheese.",
+    "The Earth revolves around the sun.",
+    "Paris is the capital of France.",
+    "Dragons guard the gold of Berlin.",
+    "Clouds form when moist air cools.",
+    "Mount Everest is the highest mountain.",
+])
+
+
+def _check_progress(updates, total):
+    progress = [update["progress"] for update in updates]
+    processed = [p["processed"] for p in progress]
+    assert processed == sorted(set(processed)), "Progress only moves forward"
+    assert [p["fraction"] for p in progress] == sorted(p["fraction"] for p in progress)
+    assert [p["done"] for p in progress] == [False] * (len(updates) - 1) + [True]
+    assert processed[-1] == total and progress[-1]["fraction"] == 1.0
+    assert all(p["total"] == total for p in progress)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 64])
+def test_redundancy_stream_ends_with_the_plain_result(chunk_size):
+    documents = json.dumps(DOCUMENTS)
+    updates = list(redundancy_checker_stream("_", documents, chunk_size=chunk_size))
+    _check_progress(updates, len(DOCUMENTS))
+    assert len(updates) == -(-len(DOCUMENTS) // chunk_size)
+
+    expected = redundancy_checker("_", documents)["results"]
+    final = updates[-1]["results"]
+    assert isinstance(expected, list) and len(expected) >= 3
+    assert [(r["doc_i"], r["doc_j"]) for r in final] == [(r["doc_i"], r["doc_j"]) for r in expected]
+    # Chunked and all-pairs similarities may differ in the last float32 bit.
+    assert [r["similarity"] for r in final] == pytest.approx([r["similarity"] for r in expected], abs=1e-3)
+    streamed = sorted((r["doc_i"], r["doc_j"]) for update in updates for r in update["new_results"])
+    assert streamed == sorted((r["doc_i"], r["doc_j"]) for r in expected), "Every pair is sent once as it is found"
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 64])
+def test_hallucination_stream_ends_with_the_plain_result(chunk_size):
+    documents = json.dumps(DOCUMENTS)
+    updates = list(hallucination_detector_stream(GENERATION, documents, chunk_size=chunk_size))
+    _check_progress(updates, 7)
+    assert all("debug_scores" not in update for update in updates[:-1])
+
+    expected = hallucination_detector(GENERATION, documents)
+    final = updates[-1]
+    assert final["threshold"] == expected["threshold"]
+    assert [s["sentence"] for s in final["debug_scores"]] == [s["sentence"] for s in expected["debug_scores"]]
+    assert [s["hallucinated"] for s in final["debug_scores"]] == [s["hallucinated"] for s in expected["debug_scores"]]
+    assert [s["max_support_score"] for s in final["debug_scores"]] == pytest.approx(
+        [s["max_support_score"] for s in expected["debug_scores"]], abs=1e-3)
+    assert [s["sentence"] for s in final["results"]] == [s["sentence"] for s in expected["results"]]
+    assert 0 < len(expected["results"]) < 7
+    assert [s for update in updates for s in update["new_scores"]] == final["debug_scores"]
@@ -0,0 +1,59 @@
+# test_tokenizer.py
+
+from collections import OrderedDict
+
+import numpy as np
+from rank_bm25 import BM25Okapi
+
+import tokenizer
+from bm25 import BM25Index
+from generator_eval_tools import repeated_trigrams
+from tokenizer import simple_tokenize, token_ids, vocabulary_size, words
+
+
+def test_token_ids_are_interned_and_cached():
+    ids = token_ids("The cat sat on the mat.")
+
+    assert ids.dtype == np.int32
+    assert ids[0] == ids[4], "Both 'the' should share one id"
+    assert words(ids) == ["the", "cat", "sat", "on", "the", "mat"]
+    assert token_ids("The cat sat on the mat.") is ids
+
+
+def test_bm25_index_matches_rank_bm25():
+    docs = [
+        "The Model Scoring Protocol (MSP) defines how agents evaluate and compare tool outputs.",
+        "MSP is used to rank multiple completions from different tools based on utility.",
+        "Model Serving Platform (MSP) manages cloud deployment and versioning.",
+        "The protocol includes a scoring rubric for structured and free-form outputs.",
+        "",
+    ]
+    query = "how does the model scoring protocol work msp msp"
+
+    expected = BM25Okapi([simple_tokenize(d) for d in docs]).get_scores(simple_tokenize(query))
+    scores = BM25Index([token_ids(d) for d in docs]).get_scores(token_ids(query))
+    assert np.allclose(scores, expected)
+
+
+def test_repeated_trigrams():
+    tokens = token_ids("the cat is on the mat the cat is on the sofa")
+    assert repeated_trigrams(tokens) == ["the cat is", "cat is on", "is on the"]
+    assert repeated_trigrams(token_ids("no repeats here at all")) == []
+
+
+def test_vocabulary_is_capped(monkeypatch):
+    monkeypatch.setattr(tokenizer, "VOCAB_SIZE", 4)
+    monkeypatch.setattr(tokenizer, "_ids", {})
+    monkeypatch.setattr(tokenizer, "_vocab", [])
+    monkeypatch.setattr(tokenizer, "_overflow", OrderedDict())
+    monkeypatch.setattr(tokenizer, "_cache", OrderedDict())
+
+    ids = token_ids("alpha beta gamma delta epsilon zeta epsilon alpha")
+    assert vocabulary_size() == 4
+    assert ids[:4].tolist() == [0, 1, 2, 3]
+    assert ids[4] >= 4 and ids[4] == ids[6], "Overflow tokens still get one stable id"
+    assert words(ids) == ["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "epsilon", "alpha"]
+
+    token_ids("many more brand new tokens arrive")
+    assert vocabulary_size() == 4
+    assert repeated_trigrams(token_ids("one two three one two three")) == ["one two three"]
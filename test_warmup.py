@@ -0,0 +1,53 @@
+# test_warmup.py
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import warmup
+from warmup import Warmup
+
+
+def test_warmup_reports_warming_until_models_load(monkeypatch):
+    release = threading.Event()
+
+    def slow_encoder(model_name):
+        if model_name == "broken":
+            raise OSError("weights not found")
+        release.wait(5)
+
+    monkeypatch.setattr(warmup, "get_encoder", slow_encoder)
+    w = Warmup(["fast-path", "broken"]).start()
+    assert w.status()["state"] == "warming"
+    assert not w.wait(["fast-path"], timeout=0.05)
+    assert w.ready(["not-warmed"]), "Models outside the warmup never block a caller"
+
+    release.set()
+    assert w.wait(timeout=5)
+    status = w.status()
+    assert status["state"] == "failed" and status["models"] == {"fast-path": "ready", "broken": "failed"}
+    assert "OSError" in status["errors"]["broken"]
+    assert "load_model:fast-path" in status["phases"] and "ready" in status["phases"]
+
+
+def test_wait_async_does_not_use_executor_threads(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(warmup, "get_encoder", lambda model_name: release.wait(5))
+    w = Warmup(["slow"]).start()
+
+    class NoExecutor(ThreadPoolExecutor):
+        def submit(self, *args, **kwargs):
+            raise AssertionError("wait_async must not block an executor thread")
+
+    async def main():
+        asyncio.get_running_loop().set_default_executor(NoExecutor())
+        timed_out = await asyncio.gather(*(w.wait_async(["slow"], timeout=0.05) for _ in range(20)))
+        waiting = [asyncio.ensure_future(w.wait_async(["slow"], timeout=5)) for _ in range(20)]
+        await asyncio.sleep(0.05)
+        release.set()
+        return timed_out, await asyncio.gather(*waiting)
+
+    timed_out, released = asyncio.run(main())
+    assert timed_out == [False] * 20
+    assert released == [True] * 20
+    assert w._waiters == []
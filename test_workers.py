@@ -0,0 +1,54 @@
+# test_workers.py
+
+import json
+import os
+
+import numpy as np
+
+import corpus_registry
+import metrics
+import workers
+from corpus_registry import CorpusRegistry
+from retriever_eval_tools import bm25_relevance_scorer
+from deadlines import with_deadline
+from tool_registry import get_tool
+
+
+def test_pool_runs_tools_in_other_processes_and_reports_their_metrics(monkeypatch, tmp_path):
+    monkeypatch.setattr(corpus_registry.default_registry, "directory", str(tmp_path))
+    tool = dict(get_tool("bm25_relevance_scorer"))
+
+    def scorer_with_pid(query: str, documents: str):
+        return {**bm25_relevance_scorer(query, documents), "pid": os.getpid()}
+
+    # Patched before the fork, so the worker's registry serves it too.
+    monkeypatch.setitem(get_tool("bm25_relevance_scorer"), "fn", scorer_with_pid)
+    local = with_deadline(scorer_with_pid)
+    docs = json.dumps(["Rain is condensed water vapor.", "The sun is a star.", "Clouds bring rain."])
+    items = ("rag_eval_tool_input_items", ("tool", "bm25_relevance_scorer"))
+
+    pool = workers.WorkerPool(1).start()
+    try:
+        remote = workers.dispatch(tool, local, pool)
+        before = metrics.snapshot()["histograms"].get(items, [0])[-1]
+        result = remote("what causes rain", docs)
+        assert result["pid"] != os.getpid(), "The call must run in a worker process"
+        assert {k: v for k, v in result.items() if k != "pid"} == {
+            k: v for k, v in local("what causes rain", docs).items() if k != "pid"}
+        # The worker's items histogram (3 documents parsed) reaches this process' series.
+        assert metrics.snapshot()["histograms"][items][-1] == before + 3
+        stream = get_tool("redundancy_checker_stream")
+        assert workers.dispatch(stream, stream["fn"], pool) is stream["fn"], "Streams stay in the server process"
+    finally:
+        pool.shutdown()
+    assert remote("what causes rain", docs)["pid"] == os.getpid(), "Calls run locally once the pool is gone"
+    assert corpus_registry.default_registry.directory == str(tmp_path), "An existing corpus directory is kept"
+
+
+def test_persisted_embeddings_are_mapped_not_copied(tmp_path):
+    corpus = CorpusRegistry(directory=str(tmp_path)).register(["alpha beta", "gamma delta", "beta gamma"])
+    corpus.stored("documents")
+    reloaded = CorpusRegistry(directory=str(tmp_path)).register(corpus.documents)
+    data = reloaded.stored("documents").data
+    assert isinstance(data, np.memmap) or isinstance(data.base, np.memmap)
+    np.testing.assert_allclose(np.linalg.norm(data, axis=1), 1.0, atol=1e-5)
@@ -0,0 +1,129 @@
+"""
+Shared word tokenizer with interned token ids.
+
+Every lexical tool tokenizes with the same rule (lowercased `\\b\\w+\\b` words). Each distinct
+token is interned once and gets a stable integer id for the life of the process, and each
+text is stored as a compact np.int32 array of ids. Tokenizations are cached per text hash,
+so a document seen by BM25, the repetition checker and the length check (or by many
+requests) is run through the regex once.
+
+The interning table is capped at RAG_EVAL_TOKEN_VOCAB_SIZE tokens, so a long-running
+server fed ever-new text (ids, numbers, typos) does not grow without bound. Once it is
+full, new tokens get a hashed id above the cap instead; distinct overflow tokens can share
+an id, which only conflates rare terms. `words` maps hashed ids back through a bounded
+table of recently seen overflow tokens.
+
+    ids = token_ids("The cat sat on the mat.")   # int32 array; both "the" get the same id
+    words(ids)                                    # ['the', 'cat', 'sat', 'on', 'the', 'mat']
+"""
+from collections import OrderedDict
+from typing import List
+import hashlib
+import os
+import re
+import threading
+
+import numpy as np
+
+_TOKEN = re.compile(r"\b\w+\b")
+
+# Maximum number of texts whose token ids are cached.
+CACHE_SIZE = int(os.environ.get("RAG_EVAL_TOKEN_CACHE_SIZE", "65536"))
+# Maximum number of distinct tokens interned; later tokens are hashed into OVERFLOW_BUCKETS ids.
+VOCAB_SIZE = int(os.environ.get("RAG_EVAL_TOKEN_VOCAB_SIZE", "500000"))
+OVERFLOW_BUCKETS = 1 << 20
+
+_ids = {}  # token -> id
+_vocab: List[str] = []  # id -> token
+_overflow: "OrderedDict[int, str]" = OrderedDict()  # hashed id -> token last seen with it
+_cache: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def simple_tokenize(text: str) -> List[str]:
+    """
+    Tokenize text into lowercase word tokens using regex.
+
+    Args:
+        text (str): Input string.
+
+    Returns:
+        List[str]: List of tokens.
+    """
+    return _TOKEN.findall(text.lower())
+
+
+def _overflow_id(token: str) -> int:
+    # Called with _lock held.
+    digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+    token_id = VOCAB_SIZE + int.from_bytes(digest, "little") % OVERFLOW_BUCKETS
+    _overflow[token_id] = token
+    _overflow.move_to_end(token_id)
+    if len(_overflow) > CACHE_SIZE:
+        _overflow.popitem(last=False)
+    return token_id
+
+
+def _intern(tokens: List[str]) -> np.ndarray:
+    # Called with _lock held.
+    get = _ids.get
+    ids = [get(token) for token in tokens]
+    if None in ids:
+        for k, token in enumerate(tokens):
+            if ids[k] is None:
+                token_id = get(token)
+                if token_id is None:
+                    if len(_vocab) < VOCAB_SIZE:
+                        token_id = _ids[token] = len(_vocab)
+                        _vocab.append(token)
+                    else:
+                        token_id = _overflow_id(token)
+                ids[k] = token_id
+    return np.array(ids, dtype=np.int32)
+
+
+def token_ids(text: str) -> np.ndarray:
+    """
+    Token ids of `text`, tokenized with `simple_tokenize`.
+
+    Args:
+        text (str): Input string.
+
+    Returns:
+        np.ndarray: A read-only int32 array, shared with every other caller asking for the same text.
+    """
+    key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+    with _lock:
+        ids = _cache.get(key)
+        if ids is not None:
+            _cache.move_to_end(key)
+            return ids
+    tokens = simple_tokenize(text)
+    with _lock:
+        ids = _intern(tokens)
+        ids.flags.writeable = False
+        _cache[key] = ids
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return ids
+
+
+def words(ids: np.ndarray) -> List[str]:
+    """
+    Map token ids back to their tokens.
+
+    Args:
+        ids (np.ndarray): Ids from `token_ids`.
+
+    Returns:
+        List[str]: The tokens, in order. A hashed id maps to the last token seen with it, or
+            to "<unk>" once that has been forgotten.
+    """
+    vocab = _vocab
+    size = len(vocab)
+    return [vocab[i] if i < size else _overflow.get(i, "<unk>") for i in ids.tolist()]
+
+
+def vocabulary_size() -> int:
+    """Number of distinct tokens interned so far, at most `VOCAB_SIZE`."""
+    return len(_vocab)
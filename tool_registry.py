@@ -0,0 +1,340 @@
+from typing import Dict, List
+
+from retriever_eval_tools import (
+    bm25_relevance_scorer,
+    semantic_relevance_scorer,
+    hybrid_relevance_scorer,
+    retrieval_metrics_evaluator,
+    redundancy_checker,
+    redundancy_checker_stream,
+    exact_match_checker,
+)
+
+from generator_eval_tools import (
+    repetition_checker,
+    semantic_diversity_checker,
+    length_consistency_checker,
+)
+
+from system_eval_tools import (
+    relevance_evaluator,
+    coverage_evaluator,
+    hallucination_detector,
+    batch_hallucination_detector,
+    hallucination_detector_stream,
+)
+
+from batch_eval_tools import batch_evaluator
+from corpus_registry import register_corpus
+from result_cache import cache_stats
+from run_store import compare_runs
+from monitoring import monitor_ingest, monitor_stats
+from admission import pairwise, sentence_pairs
+from embeddings import MINILM, MPNET
+from warmup import server_status
+
+# Every tool served by the MCP server is registered here, in tab order.
+#
+#   name:              Stable tool name (used for logging and lookups).
+#   tab:               Tab title in the Gradio UI.
+#   fn:                The tool function.
+#   labels:            Input labels for the leading arguments of `fn`; further arguments
+#                      are labelled from their parameter names. Generator functions stream
+#                      partial results.
+#   model_bound:       True if the tool runs a sentence-transformer forward pass.
+#                      Model-bound tools are offloaded to the bounded model executor.
+#   models:            Models a model-bound tool needs; while they are still loading in
+#                      the background, calls wait briefly and then report "warming".
+#   concurrency_limit: Maximum number of calls of this tool running at once.
+#   max_queue:         Maximum number of calls of this tool waiting for a slot.
+#                      Calls beyond that are rejected instead of queueing.
+#   cache:             Whether results are cached (default True). Streaming tools are never cached.
+#   in_process:        Run in the server process even with RAG_EVAL_PROCESS_WORKERS set
+#                      (tools that report on or change server state); see `workers`.
+#   cost:              Optional estimate of the similarity pairs a call computes, from its
+#                      arguments by name; calls over RAG_EVAL_MAX_PAIRS are rejected up front.
+#   examples:          Example inputs shown in the UI.
+TOOLS: List[Dict] = [
+    {
+        "name": "hallucination_detector",
+        "tab": "RAG:System Hallucination",
+        "fn": hallucination_detector,
+        "labels": ["Generation (single)", "Source Documents"],
+        "model_bound": True,
+        "models": [MPNET],
+        "concurrency_limit": 1,
+        "max_queue": 8,
+        "cost": sentence_pairs("generation", "source_docs"),
+        "examples": [[
+            "Albert Einstein invented the light bulb.  Albert Einstein developed the theory of relativity.",
+            "Albert Einstein was a theoretical physicist known for the theory of relativity.\n The light bulb was invented by Thomas Edison in the late 19th century.\n Albert Einstein received the Nobel Prize in Physics in 1921 for his work on the photoelectric effect.",
+        ]],
+    },
+    {
+        "name": "batch_hallucination_detector",
+        "tab": "RAG:Batch Hallucination",
+        "fn": batch_hallucination_detector,
+        "labels": ["Generations (JSON list or one per line)", "Source Documents"],
+        "model_bound": True,
+        "models": [MPNET],
+        "concurrency_limit": 1,
+        "max_queue": 8,
+        "cost": sentence_pairs("generations", "source_docs"),
+        "examples": [[
+            '["Albert Einstein developed the theory of relativity.", "Albert Einstein invented the light bulb. He won a Nobel Prize."]',
+            "Albert Einstein was a theoretical physicist known for the theory of relativity.\n The light bulb was invented by Thomas Edison in the late 19th century.\n Albert Einstein received the Nobel Prize in Physics in 1921 for his work on the photoelectric effect.",
+        ]],
+    },
+    {
+        "name": "relevance_evaluator",
+        "tab": "RAG:System Relevance",
+        "fn": relevance_evaluator,
+        "labels": ["Query", "Generations"],
+        "model_bound": True,
+        "models": [MINILM],
+        "concurrency_limit": 2,
+        "max_queue": 16,
+        "examples": [["What are the benefits of exercise?", "1. Exercise improves cardiovascular health.\n2. Eating vegetables is healthy."]],
+    },
+    {
+        "name": "coverage_evaluator",
+        "tab": "RAG:System Coverage",
+        "fn": coverage_evaluator,
+        "labels": ["Unused", "Generations"],
+        "model_bound": True,
+        "models": [MINILM],
+        "concurrency_limit": 2,
+        "max_queue": 16,
+        "cost": pairwise("generations"),
+        "examples": [["_", "1. Apples are good for health.\n2. Apples can be red or green.\n3. Eating apples helps digestion."]],
+    },
+    {
+        "name": "bm25_relevance_scorer",
+        "tab": "Retriever:BM25 relevance",
+        "fn": bm25_relevance_scorer,
+        "labels": ["Query", "Documents"],
+        "model_bound": False,
+        "concurrency_limit": 8,
+        "max_queue": 64,
+        "examples": [["What is the capital of France?", "1. Paris is the capital of France.\n2. Berlin is in Germany.\n3. Madrid is in Spain."]],
+    },
+    {
+        "name": "semantic_relevance_scorer",
+        "tab": "Retriever:Semantic relevance",
+        "fn": semantic_relevance_scorer,
+        "labels": ["Query", "Documents"],
+        "model_bound": True,
+        "models": [MINILM],
+        "concurrency_limit": 2,
+        "max_queue": 16,
+        "examples": [["What causes rain?", "1. Rain is caused by condensation of water vapor.\n2. The Earth revolves around the sun.\n3. Water evaporates and returns as rain."]],
+    },
+    {
+        "name": "hybrid_relevance_scorer",
+        "tab": "Retriever:Hybrid relevance",
+        "fn": hybrid_relevance_scorer,
+        "labels": ["Query (one per line)", "Documents"],
+        "model_bound": True,
+        "models": [MINILM],
+        "concurrency_limit": 2,
+        "max_queue": 16,
+        "examples": [["What causes rain?\nWhere is Paris?", "1. Rain is caused by condensation of water vapor.\n2. The Earth revolves around the sun.\n3. Paris is the capital of France."]],
+    },
+    {
+        "name": "retrieval_metrics_evaluator",
+        "tab": "Retriever: Labeled Metrics",
+        "fn": retrieval_metrics_evaluator,
+        "labels": ["Ranked Results", "Relevance Labels (qrels)", "Cutoffs k"],
+        "model_bound": False,
+        "concurrency_limit": 2,
+        "max_queue": 16,
+        "examples": [[
+            '{"q1": ["d3", "d1", "d7"], "q2": ["d2", "d5", "d4"]}',
+            '{"q1": {"d1": 2, "d7": 1}, "q2": {"d4": 1}}',
+            "1,3",
+        ]],
+    },
+    {
+        "name": "redundancy_checker",
+        "tab": "Retriever: Redundancy",
+        "fn": redundancy_checker,
+        "labels": ["Unused", "Documents"],
+        "model_bound": True,
+        "models": [MINILM],
+        "concurrency_limit": 1,
+        "max_queue": 8,
+        "cost": pairwise("documents"),
+        "examples": [["_", "1. Apples are red.\n2. Apples are red and juicy.\n3. Oranges are orange in color."]],
+    },
+    {
+        "name": "exact_match_checker",
+        "tab": "Retriever:Exact Match",
+        "fn": exact_match_checker,
+        "labels": ["Query", "Documents"],
+        "model_bound": False,
+        "concurrency_limit": 8,
+        "max_queue": 64,
+        "examples": [["capital of France", "1. Paris is the capital of France.\n2. Berlin is in Germany.\n3. The Eiffel Tower is in Paris."]],
+    },
+    {
+        "name": "repetition_checker",
+        "tab": "Generator:Repetition",
+        "fn": repetition_checker,
+        "labels": ["Unused", "Generations"],
+        "model_bound": False,
+        "concurrency_limit": 8,
+        "max_queue": 64,
+        "examples": [["_", "The cat is on the mat. The cat is on the mat.\nDogs bark loudly."]],
+    },
+    {
+        "name": "semantic_diversity_checker",
+        "tab": "Generator:Semantic Diversity",
+        "fn": semantic_diversity_checker,
+        "labels": ["Unused", "Generations"],
+        "model_bound": True,
+        "models": [MINILM],
+        "concurrency_limit": 2,
+        "max_queue": 16,
+        "cost": pairwise("generations"),
+        "examples": [["_", "1. The sky is blue.\n2. It is sunny today.\n3. The sky is blue."]],
+    },
+    {
+        "name": "length_consistency_checker",
+        "tab": "Generator:Length Consistency",
+        "fn": length_consistency_checker,
+        "labels": ["Unused", "Generations"],
+        "model_bound": False,
+        "concurrency_limit": 8,
+        "max_queue": 64,
+        "examples": [["_", "1. The dog barks.\n2. Cats are quiet and sleep often.\n3. Birds sing."]],
+    },
+    {
+        "name": "hallucination_detector_stream",
+        "tab": "RAG:System Hallucination (streaming)",
+        "fn": hallucination_detector_stream,
+        "labels": ["Generation", "Source Documents", "Sentences per update"],
+        "model_bound": True,
+        "models": [MPNET],
+        "concurrency_limit": 1,
+        "max_queue": 8,
+        "cost": sentence_pairs("generation", "source_docs"),
+    },
+    {
+        "name": "redundancy_checker_stream",
+        "tab": "Retriever: Redundancy (streaming)",
+        "fn": redundancy_checker_stream,
+        "labels": ["Unused", "Documents", "Documents per update"],
+        "model_bound": True,
+        "models": [MINILM],
+        "concurrency_limit": 1,
+        "max_queue": 8,
+        "cost": pairwise("documents"),
+    },
+    {
+        "name": "batch_evaluator",
+        "tab": "RAG:Batch Evaluation",
+        "fn": batch_evaluator,
+        "labels": ["Dataset (JSONL)", "Metrics (comma-separated, empty for all)", "Run id (empty to generate)"],
+        "model_bound": True,
+        "models": [MINILM, MPNET],
+        "concurrency_limit": 1,
+        "max_queue": 2,
+        # Every call is recorded as a run; the run store already reuses unchanged rows.
+        "cache": False,
+        "examples": [[
+            '{"query": "What causes rain?", "documents": ["Rain is caused by condensation of water vapor.", "The Earth revolves around the sun."], "generation": "Rain forms when water vapor condenses."}\n'
+            '{"query": "capital of France", "documents": ["Paris is the capital of France.", "Berlin is in Germany."], "generation": "Paris is the capital of France. It is in Italy."}',
+            "",
+        ]],
+    },
+    {
+        "name": "compare_runs",
+        "tab": "RAG:Compare Runs",
+        "fn": compare_runs,
+        "labels": ["Baseline run id", "Run id"],
+        "model_bound": False,
+        "concurrency_limit": 4,
+        "max_queue": 16,
+        # Runs can be replaced under the same id.
+        "cache": False,
+        "in_process": True,
+    },
+    {
+        "name": "monitor_ingest",
+        "tab": "Monitor:Ingest",
+        "fn": monitor_ingest,
+        "labels": ["Trace records (JSONL or JSON list)"],
+        # Only queues records; the monitor's own thread runs the models.
+        "model_bound": False,
+        "concurrency_limit": 4,
+        "max_queue": 32,
+        "cache": False,
+        "in_process": True,
+        "examples": [[
+            '{"query": "What causes rain?", "documents": ["Rain is caused by condensation of water vapor."], "generation": "Rain forms when water vapor condenses."}'
+        ]],
+    },
+    {
+        "name": "monitor_stats",
+        "tab": "Monitor:Stats",
+        "fn": monitor_stats,
+        "labels": ["Window (seconds)"],
+        "model_bound": False,
+        "concurrency_limit": 4,
+        "max_queue": 16,
+        "cache": False,
+        "in_process": True,
+    },
+    {
+        "name": "register_corpus",
+        "tab": "Server:Register Corpus",
+        "fn": register_corpus,
+        "labels": ["Documents", "Build index and embeddings now"],
+        "model_bound": True,
+        "models": [MINILM],
+        "concurrency_limit": 1,
+        "max_queue": 8,
+        # Registration has side effects; a cached response could name a corpus that has since been evicted.
+        "cache": False,
+        # Registered where admission can see the corpus size; workers reload it from the corpus directory.
+        "in_process": True,
+    },
+    {
+        "name": "server_status",
+        "tab": "Server:Status",
+        "fn": server_status,
+        "labels": [],
+        "model_bound": False,
+        "concurrency_limit": 4,
+        "max_queue": 32,
+        "cache": False,
+        "in_process": True,
+    },
+    {
+        "name": "cache_stats",
+        "tab": "Server:Cache Stats",
+        "fn": cache_stats,
+        "labels": ["Clear cache after reporting"],
+        "model_bound": False,
+        "concurrency_limit": 4,
+        "max_queue": 16,
+        "cache": False,
+        "in_process": True,
+    },
+]
+
+
+def get_tool(name: str) -> Dict:
+    """
+    Look up a registered tool by name.
+
+    Args:
+        name (str): The tool name, e.g. "bm25_relevance_scorer".
+
+    Returns:
+        Dict: The tool's registry entry.
+    """
+    for tool in TOOLS:
+        if tool["name"] == name:
+            return tool
+    raise KeyError(f"Unknown tool: {name}")
@@ -0,0 +1,202 @@
+"""
+Background model warmup and startup phase timings.
+
+The server starts accepting calls before any model is loaded. `Warmup` loads the encoders
+in a background thread, one model after another. Model-free tools are served right away.
+A model-bound tool waits up to RAG_EVAL_WARMUP_WAIT_S for the models it needs, then
+answers with a "warming" status the client can retry, instead of holding an executor slot
+while weights load.
+
+Startup phases (imports, interface build, each model load) are timed with `phase` and
+exported as the `rag_eval_startup_seconds` gauge.
+"""
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+import asyncio
+import os
+import threading
+import time
+
+from embeddings import MINILM, MPNET, get_backend, get_encoder, is_loaded
+from metrics import set_max
+
+WARMUP = os.environ.get("RAG_EVAL_WARMUP", "1") == "1"
+WARMUP_WAIT_S = float(os.environ.get("RAG_EVAL_WARMUP_WAIT_S", "5"))
+MODELS = (MINILM, MPNET)
+
+# Process start as seen by this module, so phases can be reported as time-to-ready too.
+STARTED = time.monotonic()
+
+_phases: Dict[str, float] = {}
+_phases_lock = threading.Lock()
+
+
+@contextmanager
+def phase(name: str):
+    """Time a startup phase and record it under `name`."""
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        elapsed = time.monotonic() - started
+        with _phases_lock:
+            _phases[name] = round(elapsed, 3)
+        set_max("rag_eval_startup_seconds", {"phase": name}, elapsed)
+
+
+def phases() -> Dict[str, float]:
+    """Seconds spent in each startup phase recorded so far."""
+    with _phases_lock:
+        return dict(_phases)
+
+
+class Warmup:
+    """
+    Loads encoders in a background thread and lets callers wait for the ones they need.
+
+    Args:
+        models (Iterable[str]): Model names to load, in order.
+    """
+
+    def __init__(self, models: Iterable[str] = MODELS):
+        self.models: List[str] = list(models)
+        self.backend = get_backend()
+        self._ready = {model: threading.Event() for model in self.models}
+        self.errors: Dict[str, str] = {}
+        self._thread: Optional[threading.Thread] = None
+        # Async callers waiting for a model: woken on their own loop whenever one finishes loading.
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+        self._lock = threading.Lock()
+
+    def start(self) -> "Warmup":
+        """Start loading in a daemon thread; returns self."""
+        self._thread = threading.Thread(target=self._run, name="rag-eval-warmup", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        for model in self.models:
+            try:
+                with phase(f"load_model:{model}"):
+                    get_encoder(model)
+            except Exception as e:  # surfaced through status(); tools then load on demand and report the error
+                self.errors[model] = f"{type(e).__name__}: {e}"
+            finally:
+                self._ready[model].set()
+                self._notify()
+        with _phases_lock:
+            _phases["ready"] = round(time.monotonic() - STARTED, 3)
+        set_max("rag_eval_startup_seconds", {"phase": "ready"}, time.monotonic() - STARTED)
+
+    def join(self) -> None:
+        """Block until every model has loaded or failed to load."""
+        if self._thread is not None:
+            self._thread.join()
+
+    def ready(self, models: Optional[Iterable[str]] = None) -> bool:
+        """True once every one of `models` (default: all) has loaded or failed to load."""
+        return all(m not in self._ready or self._ready[m].is_set() for m in (models or self.models))
+
+    def wait(self, models: Optional[Iterable[str]] = None, timeout: float = WARMUP_WAIT_S) -> bool:
+        """Block until `models` are ready or `timeout` seconds pass; True if they are ready."""
+        deadline = time.monotonic() + timeout
+        for model in models or self.models:
+            event = self._ready.get(model)
+            if event is not None and not event.wait(max(deadline - time.monotonic(), 0)):
+                return False
+        return True
+
+    def _notify(self) -> None:
+        with self._lock:
+            waiters = list(self._waiters)
+        for loop, changed in waiters:
+            try:
+                loop.call_soon_threadsafe(changed.set)
+            except RuntimeError:
+                pass  # that caller's loop is closed
+
+    async def wait_async(self, models: Optional[Iterable[str]] = None, timeout: float = WARMUP_WAIT_S) -> bool:
+        """`wait` without blocking the event loop or holding an executor thread."""
+        if self.ready(models):
+            return True
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        waiter = (loop, asyncio.Event())
+        with self._lock:
+            self._waiters.append(waiter)
+        try:
+            while True:
+                # Cleared before checking, so a model finishing in between still wakes us.
+                waiter[1].clear()
+                if self.ready(models):
+                    return True
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return False
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), remaining)
+                except asyncio.TimeoutError:
+                    return self.ready(models)
+        finally:
+            with self._lock:
+                self._waiters.remove(waiter)
+
+    def status(self) -> Dict:
+        """
+        Warmup state for status endpoints and "warming" responses.
+
+        Returns:
+            Dict: 'state' ("warming", "ready" or "failed"), per-model 'models' states,
+            'errors' for models that failed to load, and the startup 'phases' in seconds.
+        """
+        models = {
+            model: "failed" if model in self.errors else "ready" if self._ready[model].is_set() else "loading"
+            for model in self.models
+        }
+        state = "warming" if "loading" in models.values() else "failed" if self.errors else "ready"
+        return {"state": state, "backend": self.backend, "models": models, "errors": dict(self.errors), "phases": phases()}
+
+
+class _NoWarmup(Warmup):
+    """Stand-in when warmup is disabled: models load lazily on first use, callers never wait."""
+
+    def __init__(self):
+        super().__init__([])
+
+    def start(self) -> "Warmup":
+        return self
+
+    def status(self) -> Dict:
+        models = {model: "ready" if is_loaded(model) else "lazy" for model in MODELS}
+        return {"state": "ready", "backend": get_backend(), "models": models, "errors": {}, "phases": phases()}
+
+
+_default: Warmup = _NoWarmup()
+
+
+def start(models: Iterable[str] = MODELS) -> Warmup:
+    """Start the process-wide warmup (a no-op with RAG_EVAL_WARMUP=0) and return it."""
+    global _default
+    _default = (Warmup(models) if WARMUP else _NoWarmup()).start()
+    return _default
+
+
+def default_warmup() -> Warmup:
+    """The process-wide warmup; before `start` it never makes callers wait."""
+    return _default
+
+
+def server_status() -> Dict:
+    """
+    Report whether the server's models are loaded and how long startup took.
+
+    Returns:
+        Dict: A dictionary containing:
+            - 'tool': The name of the tool ("Server Status").
+            - 'state': "warming" while models are loading, "ready" once they are, "failed" if one failed to load.
+            - 'backend': The encoder backend.
+            - 'models': Per model, "loading", "ready", "failed" or "lazy" (loaded on first use).
+            - 'errors': Load errors by model.
+            - 'phases': Seconds spent in each startup phase; 'ready' is the time from start until all models loaded.
+    """
+    return {"tool": "Server Status", **default_warmup().status()}
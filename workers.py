@@ -0,0 +1,167 @@
+"""
+Multi-process tool workers.
+
+With RAG_EVAL_PROCESS_WORKERS=N the server forks N worker processes and runs plain
+(non-streaming) tool calls in them, so tokenization, parsing and pairwise post-processing
+are no longer serialized by one interpreter's GIL. The Gradio / MCP front end, the result
+cache, metrics, admission and warmup stay in the parent process. Each call is sent to a
+worker as (tool name, arguments) and runs there under the tool's deadline.
+
+Sharing instead of copying:
+
+  - Models are loaded in the parent before the workers are forked, and the workers use
+    them copy-on-write: inference only reads the weights, so their pages stay shared.
+  - Registered corpora live in a directory every process sees (RAG_EVAL_CORPUS_DIR, or a
+    scratch directory created at startup). Embeddings are stored there unit-normalized and
+    memory-mapped read-only, so all processes share one copy through the page cache. A
+    corpus registered in any process is found by the others on their next lookup.
+
+Each worker rebuilds a corpus' BM25 index on first use, since token ids are interned per
+process. Cancellation on client disconnect does not reach a worker; `deadline_s` does.
+If a worker dies, the pool is shut down and later calls run in the server process again.
+"""
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Optional, Tuple
+import functools
+import inspect
+import multiprocessing
+import os
+import sys
+import tempfile
+
+import metrics
+
+PROCESS_WORKERS = int(os.environ.get("RAG_EVAL_PROCESS_WORKERS", "0"))
+
+_scratch: Optional[tempfile.TemporaryDirectory] = None
+
+
+def _init_worker() -> None:
+    # The pool provides the parallelism: one intra-op thread per worker.
+    os.environ["OMP_NUM_THREADS"] = "1"
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(1)
+
+
+@functools.lru_cache(maxsize=None)
+def _worker_tool(tool_name: str) -> Callable:
+    from deadlines import with_deadline
+    from tool_registry import get_tool
+
+    return with_deadline(get_tool(tool_name)["fn"])
+
+
+def _call(tool_name: str, args: tuple, kwargs: Dict) -> Tuple[object, Dict]:
+    """
+    Run one tool call inside a worker process.
+
+    Returns the result with the metrics the call recorded here (items parsed, encoder
+    batches), for the server process to merge into its /metrics series. A worker runs
+    one call at a time, so the difference of two snapshots is exactly this call's.
+    """
+    before = metrics.snapshot()
+    token = metrics.current_tool.set(tool_name)
+    try:
+        result = _worker_tool(tool_name)(*args, **kwargs)
+    finally:
+        metrics.current_tool.reset(token)
+    return result, metrics.changes(before)
+
+
+def _ping(_: int = 0) -> int:
+    return os.getpid()
+
+
+class WorkerPool:
+    """
+    A fork-based process pool for tool calls.
+
+    Args:
+        processes (int): Number of worker processes.
+    """
+
+    def __init__(self, processes: int = PROCESS_WORKERS):
+        self.processes = processes
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def started(self) -> bool:
+        return self._executor is not None
+
+    def start(self) -> "WorkerPool":
+        """
+        Fork the workers now.
+
+        Call this after the models are loaded and before the server starts handling
+        requests, so the children inherit the weights and no lock is held mid-request.
+        """
+        global _scratch
+        from corpus_registry import default_registry
+
+        if not default_registry.directory:
+            # Workers find each other's corpora on disk, so the registry needs a shared directory.
+            _scratch = tempfile.TemporaryDirectory(prefix="rag-eval-corpora-")
+            default_registry.directory = _scratch.name
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_worker,
+        )
+        # Fork every worker up front rather than on the first requests.
+        list(self._executor.map(_ping, range(self.processes)))
+        return self
+
+    def submit(self, tool_name: str, args: tuple, kwargs: Dict) -> Future:
+        executor = self._executor
+        if executor is None:
+            raise BrokenProcessPool("The worker pool was shut down.")
+        return executor.submit(_call, tool_name, args, kwargs)
+
+    def shutdown(self) -> None:
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+default_pool = WorkerPool()
+
+
+def dispatch(tool: Dict, fn: Callable, pool: Optional[WorkerPool] = None) -> Callable:
+    """
+    Run a tool in a worker process once the pool is started, or locally otherwise.
+
+    The returned function blocks until the worker answers, so it runs on one of the
+    parent's executor threads like any local tool, and the parent's instrumentation
+    still times it. Metrics the worker records during the call are merged into the
+    parent's series.
+
+    Args:
+        tool (Dict): A registry entry from `tool_registry.TOOLS`; entries with 'in_process'
+            set, and streaming tools, always run locally.
+        fn (Callable): The locally wrapped tool, with the same signature the worker uses.
+        pool (Optional[WorkerPool]): Pool to use; defaults to the process-wide pool.
+
+    Returns:
+        Callable: The dispatching tool, with `fn`'s signature.
+    """
+    pool = pool or default_pool
+    if tool.get("in_process") or inspect.isgeneratorfunction(fn):
+        # Streams stay on the server's threads: their updates are forwarded as they are produced.
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not pool.started:
+            return fn(*args, **kwargs)
+        try:
+            result, recorded = pool.submit(tool["name"], args, kwargs).result()
+        except BrokenProcessPool:
+            # Forking replacements from a server that is already handling requests is not safe.
+            pool.shutdown()
+            return {"error": f"A worker process running {tool['name']} exited, please retry.", "retry": True}
+        metrics.merge(recorded)
+        return result
+
+    return wrapper